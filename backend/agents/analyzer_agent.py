@@ -2,142 +2,123 @@
 Analyzer Agent
 ==============
 Parses raw test output / error logs into structured failure objects.
+Structured runner reports are converted directly, without scanning the log;
+raw logs are tokenized in a single pass by the formats registered in
+utils.log_parsers, either whole or incrementally while the run is going.
 """
 
 import re
-from typing import Any
+
+from utils import log_parsers
+from utils.failures import Failure, LogBuffer
+from utils.report_parser import TestReport
+
+
+MAX_FAILURES = 10  # Failures handled per iteration
+MAX_STREAM_FAILURES = 200  # Failures retained while a noisy run is still streaming
+STREAM_TAIL_LINES = 4
+STREAM_TAIL_CHARS = 8192
 
 
 class AnalyzerAgent:
     """Parses raw error logs into structured failure records."""
 
-    # Patterns for common error formats (Python pytest, Node jest)
-    PYTHON_ERROR_PATTERN = re.compile(
-        r"(?:ERROR|FAILED|Error)\s+(.+?)(?::(\d+))?(?::|\s+)(.+?)(?:\n|$)",
-        re.MULTILINE,
-    )
-    NODE_ERROR_PATTERN = re.compile(
-        r"at .+? \((.+?):(\d+):\d+\)|(?:Error|TypeError|SyntaxError):\s+(.+?)(?:\n|$)",
-        re.MULTILINE,
-    )
-    # Enhanced Node.js patterns
-    NODE_JEST_PATTERN = re.compile(
-        r"●\s+(.+?)\s+›\s+(.+?)\n\s+(.+?):(\d+):(\d+)",
-        re.MULTILINE,
-    )
-    ESLINT_PATTERN = re.compile(
-        r"(.+?):(\d+):(\d+):\s+(error|warning)\s+(.+)",
-        re.MULTILINE,
-    )
-    TYPESCRIPT_PATTERN = re.compile(
-        r"(.+?)\((\d+),(\d+)\):\s+error\s+TS\d+:\s+(.+)",
-        re.MULTILINE,
-    )
-    TRACEBACK_FILE_PATTERN = re.compile(r'File "(.+?)", line (\d+)')
     IMPORT_ERROR_PATTERN = re.compile(r"ImportError|ModuleNotFoundError|Cannot find module")
     SYNTAX_ERROR_PATTERN = re.compile(r"SyntaxError|IndentationError")
     TYPE_ERROR_PATTERN = re.compile(r"TypeError|AttributeError")
 
-    def analyze(self, error_log: str) -> list[dict[str, Any]]:
-        """Parse error log into list of failure dicts."""
+    def analyze_report(self, report: TestReport) -> list[Failure]:
+        """Convert the failed cases of a structured test report into failure records."""
         failures = []
         seen = set()
-
-        # ESLint parsing
-        for match in self.ESLINT_PATTERN.finditer(error_log):
-            file_path = match.group(1)
-            line_num = int(match.group(2))
-            error_msg = match.group(5)
-            key = (file_path, line_num)
-
-            if key not in seen:
-                seen.add(key)
-                failures.append({
-                    "file": file_path,
-                    "line": line_num,
-                    "error_context": error_msg.strip(),
-                    "raw_log": error_log,
-                })
-
-        # TypeScript error parsing
-        if not failures:
-            for match in self.TYPESCRIPT_PATTERN.finditer(error_log):
-                file_path = match.group(1)
-                line_num = int(match.group(2))
-                error_msg = match.group(4)
-                key = (file_path, line_num)
-
-                if key not in seen:
-                    seen.add(key)
-                    failures.append({
-                        "file": file_path,
-                        "line": line_num,
-                        "error_context": error_msg.strip(),
-                        "raw_log": error_log,
-                    })
-
-        # Jest error parsing
-        if not failures:
-            for match in self.NODE_JEST_PATTERN.finditer(error_log):
-                file_path = match.group(3)
-                line_num = int(match.group(4))
-                key = (file_path, line_num)
-
-                if key not in seen:
-                    seen.add(key)
-                    failures.append({
-                        "file": file_path,
-                        "line": line_num,
-                        "error_context": f"{match.group(1)} › {match.group(2)}",
-                        "raw_log": error_log,
-                    })
-
-        # Python traceback parsing
-        if not failures:
-            for match in self.TRACEBACK_FILE_PATTERN.finditer(error_log):
-                file_path = match.group(1)
-                line_num = int(match.group(2))
-                key = (file_path, line_num)
-
-                if key not in seen:
-                    seen.add(key)
-                    # Extract the error message around this point
-                    start = max(0, match.start() - 50)
-                    end = min(len(error_log), match.end() + 200)
-                    context = error_log[start:end]
-
-                    failures.append({
-                        "file": file_path,
-                        "line": line_num,
-                        "error_context": context.strip(),
-                        "raw_log": error_log,
-                    })
-
-        # Node.js error parsing
-        if not failures:
-            for match in self.NODE_ERROR_PATTERN.finditer(error_log):
-                if match.group(1) and match.group(2):
-                    file_path = match.group(1)
-                    line_num = int(match.group(2))
-                    key = (file_path, line_num)
-                    if key not in seen:
-                        seen.add(key)
-                        failures.append({
-                            "file": file_path,
-                            "line": line_num,
-                            "error_context": match.group(0),
-                            "raw_log": error_log,
-                        })
+        for case in report.failures:
+            key = (case.file, case.line)
+            if key in seen:
+                continue
+            seen.add(key)
+            failures.append(Failure(
+                file=case.file or "unknown",
+                line=case.line,
+                error_context=(case.message or case.details[:500]).strip(),
+                log=LogBuffer(case.details),
+                end=len(case.details),
+                test_id=case.test_id,
+                duration=case.duration,
+            ))
+        return failures[:MAX_FAILURES]
+
+    def stream(self, stop_after: int = 0) -> "LogStream":
+        """Analyzer for output that is still being produced (see LogStream)."""
+        return LogStream(stop_after)
+
+    def analyze(self, error_log: str) -> list[Failure]:
+        """Parse error log into list of failure records sharing one log buffer."""
+        stream = LogStream()
+        stream.feed(error_log)
+        failures = stream.results()
 
         # Fallback: generic line-by-line scan
         if not failures:
-            for i, line in enumerate(error_log.splitlines()):
+            log = LogBuffer(error_log)
+            offset = 0
+            for i, line in enumerate(error_log.splitlines(keepends=True)):
                 if any(kw in line for kw in ["Error:", "FAILED", "FAIL:", "error TS", "✕", "✗"]):
-                    failures.append({
-                        "file": "unknown",
-                        "line": i + 1,
-                        "error_context": line.strip(),
-                        "raw_log": error_log,
-                    })
-
-        return failures[:10]  # Cap to 10 failures per iteration
+                    failures.append(Failure(
+                        file="unknown", line=i + 1, error_context=line.strip(),
+                        log=log, start=offset, end=offset + len(line),
+                    ))
+                offset += len(line)
+
+        return failures[:MAX_FAILURES]
+
+
+class LogStream:
+    """
+    Incremental log analysis. Output is fed in batches of complete lines as
+    the test run produces them; each batch is scanned once (plus a few lines
+    of the previous batch, for formats that span lines) and then only
+    referenced by the failures found in it, so nothing else is retained.
+    """
+
+    def __init__(self, stop_after: int = 0):
+        self.stop_after = stop_after
+        self.failures: list[Failure] = []
+        self._seen: set[tuple[str, int]] = set()
+        self._tails: dict[int, str] = {}
+
+    @property
+    def should_stop(self) -> bool:
+        """Fail-fast: enough failures were seen to stop the run."""
+        return bool(self.stop_after) and len(self.failures) >= self.stop_after
+
+    def feed(self, text: str, source: int = 0) -> list[Failure]:
+        """
+        Scan the next batch of output of `source` (one per concurrently running
+        shard). Returns the failures first seen in it.
+        """
+        tail = self._tails.get(source, "")
+        block = tail + text
+        log = LogBuffer(block)
+        new = []
+        for _, file_path, line_num, context, start, end in log_parsers.scan(block):
+            key = (file_path, line_num)
+            if key in self._seen or len(self.failures) >= MAX_STREAM_FAILURES:
+                continue
+            self._seen.add(key)
+            failure = Failure(
+                file=file_path, line=line_num, error_context=context.strip(),
+                log=log, start=start, end=end,
+            )
+            self.failures.append(failure)
+            new.append(failure)
+        tail = "".join(block.splitlines(keepends=True)[-STREAM_TAIL_LINES:])
+        self._tails[source] = tail[-STREAM_TAIL_CHARS:]
+        return new
+
+    def results(self) -> list[Failure]:
+        """The failures found so far, capped like a regular analysis."""
+        # A summary line without a line number adds nothing once the same
+        # file was located more precisely
+        located = {f.file for f in self.failures if f.line}
+        failures = [f for f in self.failures if f.line or not any(l.endswith(f.file) for l in located)]
+        return failures[:MAX_FAILURES]
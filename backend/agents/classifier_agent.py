@@ -2,14 +2,27 @@
 Classifier Agent
 ================
 Classifies a parsed failure into one of 6 exact bug types.
+All rules are compiled once into a single automaton; a batch of failures is
+classified in one scan, and per-rule hit counters show which patterns
+drive the decisions.
 """
 
 import re
-from typing import Any
+from bisect import bisect_right
+from collections import Counter
+
+from utils.failures import Failure
 
 BUG_TYPES = ["LINTING", "SYNTAX", "LOGIC", "TYPE_ERROR", "IMPORT", "INDENTATION"]
 
 
+def _lower_pattern(pattern: str) -> str:
+    """Lower-case the literal characters of a pattern, leaving escape sequences intact."""
+    return re.sub(
+        r"\\.|[A-Z]", lambda m: m.group() if len(m.group()) > 1 else m.group().lower(), pattern
+    )
+
+
 class ClassifierAgent:
     """
     Identifies the exact bug type from a failure record.
@@ -31,13 +44,64 @@ class ClassifierAgent:
                           r"FAILED.*assert", r"not equal", r"expected.*but got"]),
     ]
 
-    def classify(self, failure: dict[str, Any]) -> str:
-        context = failure.get("error_context", "") + failure.get("raw_log", "")
-        context = context[:2000]  # Limit context size
+    # Every pattern of every rule in priority order, matched against lower-cased
+    # text (cheaper than IGNORECASE). The combined, group-free lookahead finds
+    # every position where some pattern starts in one scan; only at those
+    # positions are the individual patterns tried, highest priority first.
+    _PATTERNS = [(bug_type, pattern) for bug_type, patterns in RULES for pattern in patterns]
+    _COMPILED = [re.compile(_lower_pattern(pattern)) for _, pattern in _PATTERNS]
+    _AUTOMATON = re.compile(
+        "(?=" + "|".join(f"(?:{compiled.pattern})" for compiled in _COMPILED) + ")"
+    )
+
+    def __init__(self):
+        self.hits: Counter[str] = Counter()
+
+    def classify(self, failure: Failure) -> str:
+        return self.classify_batch([failure])[0]
+
+    def classify_batch(self, failures: list[Failure]) -> list[str]:
+        """
+        Classify many failures with a single scan: their contexts are joined
+        (no pattern spans a newline) and each match is attributed back to its
+        failure by offset.
+        """
+        contexts = [self._context(failure).lower() for failure in failures]
+        starts, offset = [], 0
+        for context in contexts:
+            starts.append(offset)
+            offset += len(context) + 1
+
+        text = "\n".join(contexts)
+        best = [len(self._PATTERNS)] * len(failures)
+        for match in self._AUTOMATON.finditer(text):
+            owner = bisect_right(starts, match.start()) - 1
+            for index in range(best[owner]):
+                if self._COMPILED[index].match(text, match.start()):
+                    best[owner] = index
+                    break
+
+        results = []
+        for index in best:
+            if index < len(self._PATTERNS):
+                bug_type, pattern = self._PATTERNS[index]
+                key = f"{bug_type}:{pattern}"
+            else:
+                bug_type, key = "LOGIC", "LOGIC:<default>"  # Default fallback
+            self.hits[key] += 1
+            _total_hits[key] += 1
+            results.append(bug_type)
+        return results
+
+    @staticmethod
+    def _context(failure: Failure) -> str:
+        context = failure.error_context + failure.raw_log
+        return context[:2000]  # Limit context size
+
+
+_total_hits: Counter[str] = Counter()
 
-        for bug_type, patterns in self.RULES:
-            for pattern in patterns:
-                if re.search(pattern, context, re.IGNORECASE):
-                    return bug_type
 
-        return "LOGIC"  # Default fallback
+def rule_hits() -> dict[str, int]:
+    """How often each "BUG_TYPE:pattern" rule decided a classification, process-wide."""
+    return dict(_total_hits.most_common())
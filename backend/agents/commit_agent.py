@@ -4,8 +4,14 @@ Commit Agent
 Handles git staging, committing, and pushing.
 """
 
-import subprocess
 import os
+from typing import Optional
+
+from utils.process_runner import run_process
+
+
+# Identity for automated commits, passed per command instead of written with `git config`
+GIT_IDENTITY = ["-c", "user.email=ci-healer@ai-agent.dev", "-c", "user.name=CI/CD Healing Agent"]
 
 
 class CommitAgent:
@@ -13,45 +19,38 @@ class CommitAgent:
 
     def __init__(self, repo_path: str):
         self.repo_path = repo_path
-        self._configure_git()
-
-    def _configure_git(self):
-        """Set git identity for automated commits."""
-        subprocess.run(
-            ["git", "config", "user.email", "ci-healer@ai-agent.dev"],
-            cwd=self.repo_path, capture_output=True
-        )
-        subprocess.run(
-            ["git", "config", "user.name", "CI/CD Healing Agent"],
-            cwd=self.repo_path, capture_output=True
-        )
-
-    def commit(self, message: str) -> bool:
-        """Stage all changes and commit."""
+
+    async def commit(self, message: str, paths: Optional[list[str]] = None) -> bool:
+        """
+        Stage and commit. With `paths`, only those files are staged, so git
+        does not have to scan the whole working tree; otherwise all changes.
+        """
         try:
-            # Stage all changes
-            result = subprocess.run(
-                ["git", "add", "-A"],
-                cwd=self.repo_path, capture_output=True
-            )
-            if result.returncode != 0:
-                print(f"[Commit] git add failed: {result.stderr.decode()}")
+            if paths is None:
+                add_cmd = ["git", "add", "-A"]
+            else:
+                add_cmd = ["git", "add", "--"] + [
+                    os.path.relpath(path, self.repo_path) for path in paths
+                ]
+            result = await run_process(add_cmd, cwd=self.repo_path, timeout=120)
+            if not result.ok:
+                print(f"[Commit] git add failed: {result.stderr}")
                 return False
 
             # Commit
-            result = subprocess.run(
-                ["git", "commit", "-m", message],
-                cwd=self.repo_path, capture_output=True
+            result = await run_process(
+                ["git", *GIT_IDENTITY, "commit", "-m", message],
+                cwd=self.repo_path, timeout=120
             )
-            if result.returncode != 0:
-                stderr = result.stderr.decode()
-                if "nothing to commit" in stderr:
+            if not result.ok:
+                output = result.stdout + result.stderr
+                if "nothing to commit" in output:
                     print("[Commit] Nothing to commit")
                     return True
-                print(f"[Commit] git commit failed: {stderr}")
+                print(f"[Commit] git commit failed: {result.stderr}")
                 return False
 
-            print(f"[Commit] ✓ {message}")
+            print(f"[Commit] ✓ {message.splitlines()[0]}")
             return True
         except Exception as e:
             print(f"[Commit] Exception: {e}")
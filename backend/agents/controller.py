@@ -8,23 +8,32 @@ Production-ready with comprehensive error handling.
 import os
 import shutil
 import tempfile
-import subprocess
 from datetime import datetime
-from typing import Any
+from typing import Any, Optional
 
-from .analyzer_agent import AnalyzerAgent
+from .analyzer_agent import MAX_FAILURES, AnalyzerAgent
 from .classifier_agent import ClassifierAgent
 from .fix_generator_agent import FixGeneratorAgent
 from .executor_agent import ExecutorAgent
 from .commit_agent import CommitAgent
 from .ci_tracker_agent import CITrackerAgent
 from utils.git_helper import clone_repo, push_branch
-from utils.project_detector import detect_project_type, install_dependencies, discover_test_files
+from utils.project_detector import detect_project_type, discover_test_files
+from utils.repo_manifest import scan_repo
+from utils.static_analysis import basic_scan, run_linters_incremental
+from utils.deps_cache import prepare_dependencies
+from utils.file_index import FileIndex
+from utils.impact_analysis import ImpactAnalyzer, parse_failed_tests
+from utils.metrics import PhaseTimer, job_seconds, span
+from utils.mirror_cache import mirror_key
+from utils.overlay import WorkingTreeOverlay
 from utils.scoring import calculate_score
 import time
 
 
 MAX_ITERATIONS = 5
+INCREMENTAL_TESTS = os.getenv("AGENT_INCREMENTAL_TESTS", "1") != "0"
+EARLY_FIXES = os.getenv("AGENT_EARLY_FIXES", "1") != "0"
 
 
 class AgentController:
@@ -38,38 +47,61 @@ class AgentController:
         self.timeline: list = []
         self.total_failures = 0
         self.total_fixes = 0
+        self.start_time: float = 0.0
+        self.env: Optional[dict[str, str]] = None
+        self.timer = PhaseTimer()
+        # Bug types of the failures classified for early fixes, so they are classified once
+        self._early_types: dict[tuple[str, int, str], str] = {}
 
     async def run(self) -> dict[str, Any]:
+        """Run the pipeline, timing its phases. The result includes the per-phase breakdown."""
+        with self.timer.active():
+            result = await self._run()
+        job_seconds.observe(result["ci_status"], time.time() - self.start_time)
+        result["phases"] = self.timer.breakdown()
+        return result
+
+    async def _run(self) -> dict[str, Any]:
         """Main pipeline execution with comprehensive error handling."""
         self.work_dir = tempfile.mkdtemp(prefix="ci_healer_")
-        start_time = time.time()
+        self.start_time = time.time()
+        executor = None
 
         try:
             # PHASE 1: Clone repository
             print(f"[Pipeline] Cloning {self.repo_url} ...")
             try:
-                repo_path = clone_repo(self.repo_url, self.work_dir, self.branch_name)
+                with span("clone"):
+                    repo_path = await clone_repo(self.repo_url, self.work_dir, self.branch_name)
             except Exception as e:
                 print(f"[Pipeline] Clone failed: {e}")
                 return self._error_result(f"Failed to clone repository: {str(e)}")
 
+            # One pruned walk of the checkout, shared by detection, discovery,
+            # the static scan and path resolution
+            with span("scan"):
+                manifest = scan_repo(repo_path)
+
             # PHASE 2: Detect project type
             try:
-                project_type = detect_project_type(repo_path)
+                with span("detect"):
+                    project_type = detect_project_type(repo_path, manifest)
                 print(f"[Pipeline] Detected: {project_type}")
             except Exception as e:
                 print(f"[Pipeline] Detection failed: {e}")
                 project_type = "python"  # Default fallback
 
-            # PHASE 3: Install dependencies (non-blocking)
+            # PHASE 3: Install dependencies (non-blocking, cached by manifest hash)
             try:
-                install_dependencies(repo_path, project_type)
+                with span("install"):
+                    self.env = await prepare_dependencies(repo_path, project_type, self.work_dir)
             except Exception as e:
                 print(f"[Pipeline] Dependency installation failed (continuing): {e}")
 
             # PHASE 4: Discover test files
             try:
-                test_files = discover_test_files(repo_path, project_type)
+                with span("discover"):
+                    test_files = discover_test_files(repo_path, project_type, manifest)
                 print(f"[Pipeline] Found test files: {test_files}")
             except Exception as e:
                 print(f"[Pipeline] Test discovery failed: {e}")
@@ -78,13 +110,18 @@ class AgentController:
             # Initialize agents
             analyzer = AnalyzerAgent()
             classifier = ClassifierAgent()
-            fix_gen = FixGeneratorAgent()
-            executor = ExecutorAgent(repo_path, project_type)
+            fix_gen = FixGeneratorAgent(
+                overlay=WorkingTreeOverlay(), file_index=FileIndex(repo_path, manifest)
+            )
+            executor = ExecutorAgent(
+                repo_path, project_type, env=self.env, timings_key=mirror_key(self.repo_url)
+            )
             commit_agent = CommitAgent(repo_path)
             tracker = CITrackerAgent()
 
             # PHASE 5: Execute pipeline
             if test_files:
+                executor.warm_up(test_files)
                 return await self._run_test_pipeline(
                     repo_path, test_files, analyzer, classifier, 
                     fix_gen, executor, commit_agent, tracker
@@ -92,7 +129,7 @@ class AgentController:
             else:
                 return await self._run_static_analysis(
                     repo_path, project_type, analyzer, classifier, 
-                    fix_gen, commit_agent
+                    fix_gen, commit_agent, manifest
                 )
 
         except Exception as e:
@@ -102,6 +139,8 @@ class AgentController:
             return self._error_result(f"Pipeline error: {str(e)}")
         finally:
             # Cleanup
+            if executor:
+                await executor.close()
             try:
                 shutil.rmtree(self.work_dir, ignore_errors=True)
             except:
@@ -110,16 +149,33 @@ class AgentController:
     async def _run_test_pipeline(self, repo_path, test_files, analyzer, 
                                   classifier, fix_gen, executor, commit_agent, tracker) -> dict:
         """Run the test-based healing pipeline."""
+        impact = ImpactAnalyzer(repo_path, executor.project_type, test_files)
+        selected = None  # Targeted test IDs for the next iteration; None = full suite
+        applied_fixes = []  # Fixes from the previous iteration, checked against new failures
+
         for iteration in range(1, MAX_ITERATIONS + 1):
             timestamp = datetime.utcnow().isoformat()
             print(f"\n[Pipeline] ─── Iteration {iteration}/{MAX_ITERATIONS} ───")
 
             try:
-                # Run tests
-                test_output = await executor.run_tests(test_files)
+                # Run tests (only the affected ones after a fix, when possible)
+                if selected:
+                    print(f"[Pipeline] Targeted run of {len(selected)} tests")
+                test_output, stream = await self._stream_tests(
+                    executor, test_files, selected, analyzer, classifier, fix_gen, repo_path
+                )
                 passed, error_log = executor.parse_test_output(test_output)
 
+                if passed and selected:
+                    print("[Pipeline] Targeted tests passed, running full suite to confirm")
+                    test_output, stream = await self._stream_tests(
+                        executor, test_files, None, analyzer, classifier, fix_gen, repo_path
+                    )
+                    passed, error_log = executor.parse_test_output(test_output)
+                selected = None
+
                 if passed:
+                    fix_gen.discard_prefetched()
                     print("[Pipeline] ✓ All tests PASSED!")
                     self.timeline.append({
                         "iteration": iteration,
@@ -131,12 +187,13 @@ class AgentController:
                     # Push fixes
                     if self.fixes:
                         try:
-                            push_branch(repo_path, self.branch_name, self.repo_url)
+                            with span("push"):
+                                await push_branch(repo_path, self.branch_name)
                         except Exception as e:
                             print(f"[Pipeline] Push failed: {e}")
                     
                     # Calculate score
-                    time_elapsed = time.time() - start_time
+                    time_elapsed = time.time() - self.start_time
                     score = calculate_score(
                         "PASSED",
                         iteration,
@@ -164,43 +221,42 @@ class AgentController:
                 })
                 tracker.record(iteration, "FAIL")
 
-                # Analyze failures
-                failures = analyzer.analyze(error_log)
+                # Analyze failures (from the structured report when the runner produced
+                # one, else from what was found while the output streamed in)
+                report = executor.last_report
+                with span("analyze"):
+                    if report is not None and report.failures:
+                        failures = analyzer.analyze_report(report)
+                    else:
+                        failures = stream.results() or analyzer.analyze(error_log)
                 print(f"[Pipeline] Found {len(failures)} failures")
                 self.total_failures = max(self.total_failures, len(failures))
 
+                # A file that still fails after its fix: don't serve that fix from cache again
+                still_failing = {
+                    os.path.normpath(os.path.join(repo_path, f.file)) for f in failures
+                }
+                for fix in applied_fixes:
+                    if os.path.normpath(fix["full_path"]) in still_failing:
+                        fix_gen.reject_fix(fix)
+
                 if not failures:
                     print("[Pipeline] No failures detected, but tests failed")
+                    fix_gen.discard_prefetched()
                     break
 
-                # Fix each failure
-                for failure in failures:
-                    try:
-                        bug_type = classifier.classify(failure)
-                        fix = await fix_gen.generate_fix(failure, bug_type, repo_path)
-
-                        if fix:
-                            applied = fix_gen.apply_fix(fix, repo_path)
-                            commit_msg = f"[AI-AGENT] Fixed {bug_type} in {fix['file']} line {fix['line']}"
-
-                            fix_record = {
-                                "file": fix["file"],
-                                "bug_type": bug_type,
-                                "line": fix["line"],
-                                "commit_message": commit_msg,
-                                "status": "Fixed" if applied else "Failed",
-                            }
-                            self.fixes.append(fix_record)
-
-                            if applied:
-                                try:
-                                    commit_agent.commit(commit_msg)
-                                    self.total_fixes += 1
-                                except Exception as e:
-                                    print(f"[Pipeline] Commit failed: {e}")
-                    except Exception as e:
-                        print(f"[Pipeline] Fix error: {e}")
-                        continue
+                # Fix all failures (LLM calls for different files run concurrently)
+                applied_fixes = await self._fix_failures(
+                    failures, repo_path, classifier, fix_gen, commit_agent, "Pipeline"
+                )
+                modified = [fix["full_path"] for fix in applied_fixes]
+
+                if INCREMENTAL_TESTS and modified:
+                    if report is not None and report.failures:
+                        failed_ids = report.failed_ids(files_only=executor.project_type != "python")
+                    else:
+                        failed_ids = parse_failed_tests(test_output, executor.project_type)
+                    selected = impact.select(failed_ids, modified)
 
             except Exception as e:
                 print(f"[Pipeline] Iteration {iteration} error: {e}")
@@ -212,12 +268,13 @@ class AgentController:
         # Push whatever fixes we have
         if self.fixes:
             try:
-                push_branch(repo_path, self.branch_name, self.repo_url)
+                with span("push"):
+                    await push_branch(repo_path, self.branch_name)
             except Exception as e:
                 print(f"[Pipeline] Push failed: {e}")
         
         # Calculate score (will be 0 for FAILED)
-        time_elapsed = time.time() - start_time
+        time_elapsed = time.time() - self.start_time
         score = calculate_score(
             "FAILED",
             MAX_ITERATIONS,
@@ -238,66 +295,47 @@ class AgentController:
         }
 
     async def _run_static_analysis(self, repo_path, project_type, analyzer, 
-                                     classifier, fix_gen, commit_agent) -> dict:
+                                     classifier, fix_gen, commit_agent, manifest) -> dict:
         """Run static code analysis when no tests are found."""
         print("[Pipeline] No tests found. Running static analysis...")
         
-        issues_found = []
-        
-        # Try multiple analysis tools
-        if project_type == "python":
-            issues_found = await self._analyze_python(repo_path, analyzer)
-        elif project_type in ("node", "node_yarn"):
-            issues_found = await self._analyze_node(repo_path, analyzer)
-        
-        # Fallback: basic code scan
-        if not issues_found:
-            print("[Static] Running basic code scan...")
-            issues_found = self._basic_code_scan(repo_path, project_type)
+        # Every available linter at once, over the project's own sources that
+        # changed since this repo was last analyzed
+        files = [
+            rel_path for rel_path in manifest.sources(project_type)
+            if not {"dist", "build"} & set(rel_path.split("/")[:-1])  # Build output
+        ]
+        with span("lint"):
+            diagnostics = await run_linters_incremental(
+                repo_path, project_type, files, mirror_key(self.repo_url), env=self.env
+            )
+
+            # Fallback: basic code scan
+            if not diagnostics:
+                print("[Static] Running basic code scan...")
+                diagnostics = await basic_scan(repo_path, project_type, files)
+        issues_found = [diagnostic.to_failure() for diagnostic in diagnostics]
         
         print(f"[Static] Found {len(issues_found)} issues")
         self.total_failures = len(issues_found)
         
         # Fix issues
-        for failure in issues_found[:5]:
-            try:
-                bug_type = classifier.classify(failure)
-                fix = await fix_gen.generate_fix(failure, bug_type, repo_path)
-                
-                if fix:
-                    applied = fix_gen.apply_fix(fix, repo_path)
-                    commit_msg = f"[AI-AGENT] Fixed {bug_type} in {fix['file']} line {fix['line']}"
-                    
-                    fix_record = {
-                        "file": fix["file"],
-                        "bug_type": bug_type,
-                        "line": fix["line"],
-                        "commit_message": commit_msg,
-                        "status": "Fixed" if applied else "Failed",
-                    }
-                    self.fixes.append(fix_record)
-                    
-                    if applied:
-                        try:
-                            commit_agent.commit(commit_msg)
-                            self.total_fixes += 1
-                        except Exception as e:
-                            print(f"[Static] Commit failed: {e}")
-            except Exception as e:
-                print(f"[Static] Fix error: {e}")
-                continue
+        await self._fix_failures(
+            issues_found[:5], repo_path, classifier, fix_gen, commit_agent, "Static"
+        )
         
         # Push fixes
         if self.fixes:
             try:
-                push_branch(repo_path, self.branch_name, self.repo_url)
+                with span("push"):
+                    await push_branch(repo_path, self.branch_name)
             except Exception as e:
                 print(f"[Static] Push failed: {e}")
         
         status = "PASSED" if self.total_fixes > 0 else "NO_ISSUES"
         
         # Calculate score
-        time_elapsed = time.time() - start_time
+        time_elapsed = time.time() - self.start_time
         score = calculate_score(
             status,
             1,
@@ -321,184 +359,102 @@ class AgentController:
             "time_elapsed": time_elapsed,
         }
 
-    async def _analyze_python(self, repo_path, analyzer) -> list:
-        """Analyze Python code with multiple tools."""
-        issues = []
-        
-        # Try flake8 first (faster)
-        try:
-            result = subprocess.run(
-                ["python", "-m", "flake8", ".", "--exit-zero", "--max-line-length=120"],
-                cwd=repo_path,
-                capture_output=True,
-                timeout=60,
-                text=True
-            )
-            if result.stdout and len(result.stdout) > 50:
-                print("[Static] flake8 found issues")
-                issues = analyzer.analyze(result.stdout)
-                return issues
-        except:
-            pass
-        
-        # Try pylint
-        try:
-            result = subprocess.run(
-                ["python", "-m", "pylint", ".", "--output-format=text", "--exit-zero"],
-                cwd=repo_path,
-                capture_output=True,
-                timeout=60,
-                text=True
-            )
-            if result.stdout and len(result.stdout) > 50:
-                print("[Static] pylint found issues")
-                issues = analyzer.analyze(result.stdout)
-                return issues
-        except:
-            pass
-        
-        return issues
+    async def _stream_tests(self, executor, test_files, selected, analyzer,
+                            classifier, fix_gen, repo_path):
+        """
+        Run the tests while analyzing their output as it arrives. Fixes for
+        failures reported early are generated while the rest of the suite is
+        still running, and with fail-fast the run stops after enough failures.
+        Returns (test output, log stream).
+        """
+        fix_gen.discard_prefetched()
+        self._early_types.clear()
+        stream = analyzer.stream(stop_after=executor.stream_fail_fast)
 
-    async def _analyze_node(self, repo_path, analyzer) -> list:
-        """Analyze Node.js code with multiple tools."""
-        issues = []
-        
-        # Try ESLint first
-        try:
-            result = subprocess.run(
-                ["npx", "eslint", ".", "--format=compact", "--no-error-on-unmatched-pattern"],
-                cwd=repo_path,
-                capture_output=True,
-                timeout=60,
-                text=True
-            )
-            if result.stdout and len(result.stdout) > 50:
-                print("[Static] ESLint found issues")
-                issues = analyzer.analyze(result.stdout)
-                return issues
-        except FileNotFoundError:
-            print("[Static] ESLint not available, trying TypeScript compiler...")
-        except Exception as e:
-            print(f"[Static] ESLint error: {e}")
-        
-        # Try TypeScript compiler
-        try:
-            result = subprocess.run(
-                ["npx", "tsc", "--noEmit", "--pretty", "false"],
-                cwd=repo_path,
-                capture_output=True,
-                timeout=60,
-                text=True
-            )
-            if result.stdout and len(result.stdout) > 50:
-                print("[Static] TypeScript compiler found issues")
-                issues = analyzer.analyze(result.stdout)
-                return issues
-        except Exception as e:
-            print(f"[Static] TypeScript check error: {e}")
-        
-        # Try running npm test in check mode
+        def on_output(text: str, shard: int) -> bool:
+            for failure in stream.feed(text, shard):
+                # Only as many as one iteration handles; the rest wait for the final pass
+                if EARLY_FIXES and len(self._early_types) < MAX_FAILURES:
+                    try:
+                        bug_type = classifier.classify(failure)
+                        self._early_types[_failure_key(failure)] = bug_type
+                        fix_gen.prefetch(failure, bug_type, repo_path)
+                    except Exception as e:
+                        print(f"[Pipeline] Early fix error: {e}")
+            return stream.should_stop
+
+        with span("test"):
+            test_output = await executor.run_tests(test_files, selected, on_output)
+        return test_output, stream
+
+    async def _fix_failures(self, failures, repo_path, classifier, fix_gen,
+                            commit_agent, tag) -> list[dict]:
+        """
+        Classify failures, generate their fixes concurrently (one request per
+        file), then apply them and commit them as one commit of exactly the
+        fixed files. Returns the applied fixes.
+        """
         try:
-            result = subprocess.run(
-                ["npm", "run", "lint"],
-                cwd=repo_path,
-                capture_output=True,
-                timeout=60,
-                text=True
-            )
-            if result.stdout and len(result.stdout) > 50:
-                print("[Static] npm lint found issues")
-                issues = analyzer.analyze(result.stdout)
-                return issues
+            with span("classify"):
+                # Failures classified while the tests streamed keep their bug type
+                known = [self._early_types.get(_failure_key(failure)) for failure in failures]
+                fresh = iter(classifier.classify_batch(
+                    [failure for failure, bug_type in zip(failures, known) if bug_type is None]
+                ))
+                classified = [
+                    (failure, bug_type or next(fresh)) for failure, bug_type in zip(failures, known)
+                ]
         except Exception as e:
-            print(f"[Static] npm lint error: {e}")
-        
-        return issues
+            print(f"[{tag}] Classification error: {e}")
+            classified = []
 
-    def _basic_code_scan(self, repo_path, project_type) -> list:
-        """Basic code scanning without external tools."""
-        issues = []
-        
-        if project_type == "python":
-            for root, dirs, files in os.walk(repo_path):
-                dirs[:] = [d for d in dirs if d not in ['.git', '__pycache__', '.venv', 'venv', 'node_modules']]
-                
-                for file in files:
-                    if file.endswith('.py'):
-                        filepath = os.path.join(root, file)
-                        try:
-                            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                                lines = f.readlines()
-                                for i, line in enumerate(lines, 1):
-                                    # Trailing whitespace
-                                    if line.rstrip() != line.rstrip('\n'):
-                                        issues.append({
-                                            "file": os.path.relpath(filepath, repo_path),
-                                            "line": i,
-                                            "error_context": f"Trailing whitespace",
-                                            "raw_log": "LINTING: Trailing whitespace"
-                                        })
-                                        break
-                        except:
-                            pass
-                        
-                        if len(issues) >= 10:
-                            break
-                if len(issues) >= 10:
-                    break
-        
-        elif project_type in ("node", "node_yarn"):
-            for root, dirs, files in os.walk(repo_path):
-                dirs[:] = [d for d in dirs if d not in ['.git', 'node_modules', 'dist', 'build', '.next']]
-                
-                for file in files:
-                    if file.endswith(('.js', '.ts', '.jsx', '.tsx')):
-                        filepath = os.path.join(root, file)
-                        try:
-                            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                                content = f.read()
-                                lines = content.splitlines()
-                                
-                                for i, line in enumerate(lines, 1):
-                                    # Check for common issues
-                                    # Unused variables (var keyword)
-                                    if 'var ' in line and not line.strip().startswith('//'):
-                                        issues.append({
-                                            "file": os.path.relpath(filepath, repo_path),
-                                            "line": i,
-                                            "error_context": "Use 'let' or 'const' instead of 'var'",
-                                            "raw_log": "LINTING: var keyword usage"
-                                        })
-                                        break
-                                    
-                                    # Console.log statements
-                                    if 'console.log' in line and not line.strip().startswith('//'):
-                                        issues.append({
-                                            "file": os.path.relpath(filepath, repo_path),
-                                            "line": i,
-                                            "error_context": "Remove console.log statement",
-                                            "raw_log": "LINTING: console.log found"
-                                        })
-                                        break
-                                    
-                                    # Trailing whitespace
-                                    if line.endswith(' ') or line.endswith('\t'):
-                                        issues.append({
-                                            "file": os.path.relpath(filepath, repo_path),
-                                            "line": i,
-                                            "error_context": "Trailing whitespace",
-                                            "raw_log": "LINTING: Trailing whitespace"
-                                        })
-                                        break
-                        except:
-                            pass
-                        
-                        if len(issues) >= 10:
-                            break
-                if len(issues) >= 10:
-                    break
-        
-        return issues
+        # Layer every fix of the iteration in memory (syntax-checked), write them
+        # out in one batch and commit them together; each fixed failure is
+        # still recorded on its own, as Fixed only once the commit went through
+        applied_fixes, records = [], []
+        for fix in await fix_gen.generate_fixes(classified, repo_path):
+            try:
+                with span("apply"):
+                    applied = fix_gen.apply_fix(fix, repo_path)
+                fix_records = [
+                    {
+                        "file": fix["file"],
+                        "bug_type": item["bug_type"],
+                        "line": item["line"],
+                        "commit_message": f"[AI-AGENT] Fixed {item['bug_type']} in {fix['file']} line {item['line']}",
+                        "status": "Failed",
+                    }
+                    for item in fix["failures"]
+                ]
+                if applied:
+                    applied_fixes.append(fix)
+                    records.extend(fix_records)
+                else:
+                    self.fixes.extend(fix_records)
+            except Exception as e:
+                print(f"[{tag}] Fix error: {e}")
+
+        if applied_fixes:
+            messages = [r["commit_message"] for r in records]
+            if len(messages) == 1:
+                message = messages[0]
+            else:
+                files = len(applied_fixes)
+                message = (f"[AI-AGENT] Fixed {len(messages)} issues in {files} "
+                           f"file{'s' if files > 1 else ''}\n\n" + "\n".join(messages))
+            committed = False
+            try:
+                with span("commit"):
+                    written = fix_gen.overlay.flush()
+                    committed = bool(written) and await commit_agent.commit(message, written)
+            except Exception as e:
+                print(f"[{tag}] Commit failed: {e}")
+            if committed:
+                self.total_fixes += len(records)
+                for record in records:
+                    record["status"] = "Fixed"
+            self.fixes.extend(records)
+        return applied_fixes
 
     def _error_result(self, error_msg: str) -> dict:
         """Return error result structure."""
@@ -511,3 +467,7 @@ class AgentController:
             "timeline": [],
             "error": error_msg,
         }
+
+
+def _failure_key(failure) -> tuple[str, int, str]:
+    return (failure.file, failure.line, failure.error_context)
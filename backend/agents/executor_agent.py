@@ -1,52 +1,292 @@
 """
 Executor Agent
 ==============
-Runs tests in a subprocess (or Docker container) and parses results.
+Runs tests and parses results. Python suites run on warm sandbox workers
+(`utils.sandbox`: pytest already imported, optionally in Docker), split
+into shards that run in parallel, one per core; other runners, or a
+sandbox that cannot start, use a plain subprocess per run.
+Runners are asked for machine-readable reports (JUnit XML / JSON), which
+decide the verdict exactly; stdout heuristics are only the fallback.
+Output can be streamed to a callback while the run is still going.
 """
 
 import asyncio
-import subprocess
-from typing import Any
+import json
+import os
+import re
+import tempfile
+from typing import Any, Callable, Optional
+
+from utils.cache_paths import cache_dir
+from utils.process_runner import run_process
+from utils.sandbox import SandboxError, SandboxPool, sandbox_available
+from utils.report_parser import (
+    TestReport, parse_jest_json, parse_junit_xml, parse_mocha_json,
+)
+
+TEST_TIMEOUT = 120
+PYTEST_MODULE = ["python", "-m", "pytest"]
+PYTEST_COMMAND = PYTEST_MODULE + ["--tb=short", "-v", "--durations=0"]
+PYTEST_DURATION_LINE = re.compile(r"^\s*([\d.]+)s (?:setup|call|teardown)\s+(\S+?)::", re.MULTILINE)
+
+
+def _available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+TEST_SHARDS = int(os.getenv("AGENT_TEST_SHARDS", "0")) or _available_cores()
+FAIL_FAST = int(os.getenv("AGENT_FAIL_FAST", "0"))  # Stop a run after N failures; 0 = off
+
+# Receives (batch of output lines, shard index); returning True stops the run
+OutputCallback = Callable[[str, int], bool]
 
 
 class ExecutorAgent:
     """Runs test suite and parses pass/fail results."""
 
-    def __init__(self, repo_path: str, project_type: str):
+    def __init__(
+        self,
+        repo_path: str,
+        project_type: str,
+        env: Optional[dict[str, str]] = None,
+        timings_key: Optional[str] = None,
+        shards: int = TEST_SHARDS,
+        fail_fast: int = FAIL_FAST,
+    ):
         self.repo_path = repo_path
         self.project_type = project_type
+        self.env = env
+        self.shards = max(1, shards)
+        self.fail_fast = max(0, fail_fast)
+        self.timings_path = (
+            os.path.join(cache_dir("timings"), f"{timings_key}.json") if timings_key else None
+        )
+        self.timings: dict[str, float] = self._load_timings()
+        self.node_runner = self._detect_node_runner()
+        self.last_report: Optional[TestReport] = None
+        self.last_killed = False  # The last run timed out or was stopped early
+        self.sandbox = (
+            SandboxPool(repo_path, env) if project_type == "python" and sandbox_available() else None
+        )
+
+    def warm_up(self, test_files: list[str]) -> None:
+        """Start one sandbox worker per shard of a full run, in the background."""
+        if self.sandbox:
+            self.sandbox.prestart(max(1, len(self._plan_shards(test_files))))
+
+    async def close(self) -> None:
+        if self.sandbox:
+            await self.sandbox.close()
+            self.sandbox = None
+
+    @property
+    def stream_fail_fast(self) -> int:
+        """
+        Failures after which the output stream should stop the run, for
+        runners that cannot stop by themselves (0 when they can, or when off).
+        """
+        if self.project_type == "python" or self.node_runner in ("jest", "vitest"):
+            return 0
+        return self.fail_fast
+
+    async def run_tests(
+        self,
+        test_files: list[str],
+        selected: Optional[list[str]] = None,
+        on_output: Optional[OutputCallback] = None,
+    ) -> str:
+        """
+        Execute the test suite asynchronously. `selected` restricts the run to
+        specific test IDs / files (targeted re-run after a fix).
 
-    async def run_tests(self, test_files: list[str]) -> str:
-        """Execute the test suite asynchronously."""
-        cmd = self._build_test_command(test_files)
-        print(f"[Executor] Running: {' '.join(cmd)}")
+        Python test lists are split into shards balanced by previous timings and
+        run concurrently; their outputs are merged into one log. `on_output`
+        sees every shard's output as it is produced and can stop the run.
+        """
+        items = selected or test_files
+        shards = self._plan_shards(items) if self.project_type == "python" else []
+        if len(shards) <= 1:
+            output, self.last_report, self.last_killed = await self._run_command(
+                test_files, selected, on_output
+            )
+            return output
 
-        proc = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.STDOUT,
-            cwd=self.repo_path,
+        print(f"[Executor] Running {len(items)} tests in {len(shards)} shards")
+        results = await asyncio.gather(
+            *(self._run_command(test_files, shard, on_output, i) for i, shard in enumerate(shards))
         )
-        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=120)
-        return stdout.decode(errors="ignore")
+        self.last_report = TestReport.merge([report for _, report, _ in results])
+        self.last_killed = any(killed for _, _, killed in results)
+        return "\n".join(output for output, _, _ in results)
+
+    async def _run_command(
+        self,
+        test_files: list[str],
+        selected: Optional[list[str]],
+        on_output: Optional[OutputCallback] = None,
+        shard: int = 0,
+    ) -> tuple[str, Optional[TestReport], bool]:
+        """(output, structured report if any, whether the run was killed before it finished)"""
+        fd, report_path = tempfile.mkstemp(prefix="ci_healer_report_")
+        os.close(fd)
+        os.remove(report_path)  # Runners only write it if they support the option
+        try:
+            cmd = self._build_test_command(test_files, selected, report_path)
+            print(f"[Executor] Running: {' '.join(cmd)}")
+            callback = (lambda text: on_output(text, shard)) if on_output else None
+            result = None
+            if self.sandbox and cmd[:len(PYTEST_MODULE)] == PYTEST_MODULE:
+                try:
+                    result = await self.sandbox.run(cmd[len(PYTEST_MODULE):], TEST_TIMEOUT, callback)
+                except SandboxError as e:
+                    print(f"[Executor] Sandbox unavailable, running pytest directly: {e}")
+                    await self.close()
+            if result is None:
+                result = await run_process(
+                    cmd, cwd=self.repo_path, timeout=TEST_TIMEOUT, merge_stderr=True, env=self.env,
+                    on_output=callback,
+                )
+            if result.stopped:
+                print(f"[Executor] Stopped early after {self.stream_fail_fast} failures")
+            self._record_timings(result.stdout)
+            output = result.stdout
+            if result.timed_out:
+                print(f"[Executor] Test run timed out after {TEST_TIMEOUT}s")
+                output += f"\nERROR: test run timed out after {TEST_TIMEOUT}s and was killed\n"
+            # A killed runner leaves no report, or a partial one
+            killed = result.timed_out or result.stopped
+            report = None if killed else self._parse_report(report_path)
+            return output, report, killed
+        finally:
+            if os.path.exists(report_path):
+                os.remove(report_path)
+
+    def _parse_report(self, report_path: str) -> Optional[TestReport]:
+        if self.project_type == "python":
+            return parse_junit_xml(report_path)
+        if self.node_runner == "mocha":
+            return parse_mocha_json(report_path)
+        if self.node_runner in ("jest", "vitest"):
+            return parse_jest_json(report_path)
+        return None
+
+    def _detect_node_runner(self) -> Optional[str]:
+        """Which runner `npm test` invokes (jest, vitest, mocha), from package.json."""
+        if self.project_type not in ("node", "node_yarn"):
+            return None
+        try:
+            with open(os.path.join(self.repo_path, "package.json")) as f:
+                script = json.load(f).get("scripts", {}).get("test", "")
+        except (OSError, ValueError, AttributeError):
+            return None
+        for runner in ("vitest", "jest", "mocha"):
+            if runner in script:
+                return runner
+        return None
+
+    def _plan_shards(self, items: list[str]) -> list[list[str]]:
+        """Greedy longest-first assignment of test files / IDs to the least loaded shard."""
+        count = min(self.shards, len(items))
+        if count <= 1:
+            return [items] if items else []
+
+        def weight(item: str) -> float:
+            path = item.split("::", 1)[0]
+            if path in self.timings:
+                return self.timings[path]
+            try:
+                # No history yet: larger test files tend to take longer
+                return os.path.getsize(os.path.join(self.repo_path, path)) / 10_000
+            except OSError:
+                return 1.0
+
+        shards: list[list[str]] = [[] for _ in range(count)]
+        loads = [0.0] * count
+        for item in sorted(items, key=weight, reverse=True):
+            i = loads.index(min(loads))
+            shards[i].append(item)
+            loads[i] += weight(item)
+        return [shard for shard in shards if shard]
 
-    def _build_test_command(self, test_files: list[str]) -> list[str]:
+    def _record_timings(self, output: str) -> None:
+        """Collect per-file durations from pytest's --durations report."""
+        durations: dict[str, float] = {}
+        for seconds, path in PYTEST_DURATION_LINE.findall(output):
+            durations[path] = durations.get(path, 0.0) + float(seconds)
+        if not durations:
+            return
+        self.timings.update(durations)
+        if self.timings_path:
+            try:
+                with open(self.timings_path, "w") as f:
+                    json.dump(self.timings, f)
+            except OSError as e:
+                print(f"[Executor] Could not save test timings: {e}")
+
+    def _load_timings(self) -> dict[str, float]:
+        if not self.timings_path or not os.path.exists(self.timings_path):
+            return {}
+        try:
+            with open(self.timings_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _build_test_command(
+        self,
+        test_files: list[str],
+        selected: Optional[list[str]] = None,
+        report_path: Optional[str] = None,
+    ) -> list[str]:
         """Build the appropriate test command."""
         if self.project_type == "python":
-            if test_files:
-                return ["python", "-m", "pytest", "--tb=short", "-v"] + test_files
-            return ["python", "-m", "pytest", "--tb=short", "-v"]
+            cmd = list(PYTEST_COMMAND)
+            if self.fail_fast:
+                cmd.append(f"--maxfail={self.fail_fast}")
+            if report_path:
+                cmd += [f"--junitxml={report_path}", "-o", "junit_family=xunit1"]
+            return cmd + (selected or test_files)
         elif self.project_type == "node":
             # Try to run npm test with verbose output
-            return ["npm", "test", "--", "--verbose", "--no-coverage"]
+            return (["npm", "test", "--", "--verbose", "--no-coverage"]
+                    + self._node_report_args(report_path) + (selected or []))
         elif self.project_type == "node_yarn":
-            return ["yarn", "test", "--verbose", "--no-coverage"]
+            return (["yarn", "test", "--verbose", "--no-coverage"]
+                    + self._node_report_args(report_path) + (selected or []))
         return ["echo", "No test runner configured"]
 
+    def _node_report_args(self, report_path: Optional[str]) -> list[str]:
+        args = []
+        if self.fail_fast and self.node_runner in ("jest", "vitest"):
+            args.append(f"--bail={self.fail_fast}")
+        if not report_path:
+            return args
+        if self.node_runner == "jest":
+            return args + ["--json", f"--outputFile={report_path}"]
+        if self.node_runner == "vitest":
+            return args + ["--reporter=json", f"--outputFile={report_path}"]
+        if self.node_runner == "mocha":
+            return args + ["--reporter", "json", "--reporter-option", f"output={report_path}"]
+        return args
+
     def parse_test_output(self, output: str) -> tuple[bool, str]:
         """
         Returns (passed: bool, error_log: str)
+
+        A run that timed out or was stopped early always failed, whatever
+        its partial output says. Otherwise the structured report of the last
+        run decides when there is one, and failing that the output text is
+        scanned for runner summaries.
         """
+        if self.last_killed:
+            return False, output
+        if self.last_report is not None and self.last_report.cases:
+            if self.last_report.passed:
+                return True, ""
+            return False, output
+
         lower = output.lower()
 
         # Python pytest
@@ -1,100 +1,313 @@
 """
 Fix Generator Agent
 ===================
-Uses an LLM (OpenAI GPT-4 or local Ollama) to generate minimal code fixes.
-Falls back to rule-based fixes when LLM is unavailable.
+Fixes what deterministic rules can (utils/fix_rules.py: lint findings,
+unused / missing imports, ...) without a model, and uses an LLM (OpenAI, a
+local OpenAI-compatible server such as Ollama, or a recording replayed from
+disk; see utils/fix_providers.py) to generate minimal code fixes for the
+rest. Falls back to heuristic fixes when LLM is unavailable.
 """
 
+import asyncio
 import os
 import re
 import ast
 import textwrap
+from collections import Counter
 from typing import Any, Optional
 
-try:
-    from openai import AsyncOpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+from utils.failures import Failure
+from utils.file_index import FileIndex
+from utils.fix_cache import FixCache, get_fix_cache
+from utils.fix_providers import FixProvider, RecordingProvider, get_provider
+from utils.fix_rules import RuleFixes, apply_rules
+from utils.line_patch import (
+    apply_line_patch, fix_windows, parse_line_patch, render_windows, shift_line,
+)
+from utils.llm_scheduler import LLMScheduler, default_scheduler, estimate_tokens
+from utils.metrics import span
+from utils.overlay import WorkingTreeOverlay
+
+
+LLM_MAX_TOKENS = 4000
+LLM_PATCH_MAX_TOKENS = 1024
+LLM_FIX_MODE = os.getenv("AGENT_LLM_FIX_MODE", "window")  # "window" (line patch) | "file"
+FIX_RULES_ENABLED = os.getenv("AGENT_FIX_RULES", "1") != "0"
 
 
 class FixGeneratorAgent:
     """Generates minimal diffs to fix a classified bug."""
 
-    def __init__(self):
-        self.llm_client = None
-        if OPENAI_AVAILABLE and os.getenv("OPENAI_API_KEY"):
-            self.llm_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(
+        self,
+        scheduler: Optional[LLMScheduler] = None,
+        cache: Optional[FixCache] = None,
+        overlay: Optional[WorkingTreeOverlay] = None,
+        file_index: Optional[FileIndex] = None,
+        provider: Optional[FixProvider] = None,
+    ):
+        self.provider = provider or get_provider()
+        self.scheduler = scheduler or default_scheduler
+        self.cache = cache or get_fix_cache()
+        self.overlay = overlay or WorkingTreeOverlay()
+        self.file_index = file_index
+        # Fixes started while the test run was still streaming, by file
+        self._prefetched: dict[str, tuple[list[tuple[Failure, str]], asyncio.Task]] = {}
+        # Rules whose fix left a file failing, by file: its next failures go to the LLM
+        self._rejected_rules: dict[str, set[str]] = {}
+
+    async def generate_fixes(
+        self, classified: list[tuple[Failure, str]], repo_path: str
+    ) -> list[dict[str, Any]]:
+        """
+        Generate fixes for (failure, bug_type) pairs concurrently.
+
+        Failures in the same file are merged into a single request, so their
+        fixes are produced together and cannot overwrite each other. A fix
+        prefetched for some of a file's failures is reused, and the file's
+        other failures are then fixed on top of it.
+        """
+        groups: dict[str, list[tuple[Failure, str]]] = {}
+        for failure, bug_type in classified:
+            full_path = self._resolve_path(repo_path, failure.file)
+            if full_path:
+                groups.setdefault(full_path, []).append((failure, bug_type))
+
+        async def fix_group(full_path: str, group: list[tuple[Failure, str]]):
+            prefetched = self._prefetched.pop(full_path, None)
+            if prefetched:
+                early_group, task = prefetched
+                rest = _remaining(group, early_group)
+                if rest is not None:
+                    print(f"[FixGen] Using fix generated during the test run for {group[0][0].file}")
+                    fix = await task
+                    if not rest:
+                        return fix
+                    return await self._fix_file(full_path, rest, repo_path, base=fix) or fix
+                task.cancel()
+            return await self._fix_file(full_path, group, repo_path)
+
+        try:
+            results = await asyncio.gather(
+                *(fix_group(full_path, group) for full_path, group in groups.items()),
+                return_exceptions=True,
+            )
+        finally:
+            self.discard_prefetched()
+        fixes = []
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"[FixGen] Fix error: {result}")
+            elif result:
+                fixes.append(result)
+        return fixes
+
+    def prefetch(self, failure: Failure, bug_type: str, repo_path: str) -> None:
+        """
+        Start generating the fix for a failure reported while the tests are
+        still running. A request already running for the file is left alone:
+        the file's later failures wait for generate_fixes, which fixes them on
+        top of this one if the prefetched failure is among the final ones.
+        """
+        full_path = self._resolve_path(repo_path, failure.file)
+        if not full_path or full_path in self._prefetched:
+            return
+        group = [(failure, bug_type)]
+        task = asyncio.ensure_future(self._fix_file(full_path, group, repo_path))
+        # Mark errors as retrieved; they resurface when the task is awaited
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._prefetched[full_path] = (group, task)
+
+    def discard_prefetched(self) -> None:
+        """Cancel prefetched fixes nobody asked for (the run passed, or the file no longer fails)."""
+        for _, task in self._prefetched.values():
+            task.cancel()
+        self._prefetched.clear()
 
     async def generate_fix(
-        self, failure: dict[str, Any], bug_type: str, repo_path: str
+        self, failure: Failure, bug_type: str, repo_path: str
     ) -> Optional[dict[str, Any]]:
         """Generate a fix for the given failure."""
-        file_path = failure.get("file", "")
-        line_num = failure.get("line", 0)
-        error_context = failure.get("error_context", "")
+        full_path = self._resolve_path(repo_path, failure.file)
+        if not full_path:
+            return None
+        return await self._fix_file(full_path, [(failure, bug_type)], repo_path)
 
-        # Try to read the actual file
-        full_path = os.path.join(repo_path, file_path)
-        if not os.path.exists(full_path):
-            full_path = self._find_file(repo_path, file_path)
-            if not full_path:
-                return None
-
-        with open(full_path, "r", errors="ignore") as f:
-            content = f.read()
-
-        # Try LLM first
-        if self.llm_client:
-            fixed = await self._llm_fix(content, error_context, bug_type, line_num)
-            if fixed and fixed != content:
-                return {
-                    "file": file_path,
-                    "full_path": full_path,
-                    "line": line_num,
-                    "original_content": content,
-                    "fixed_content": fixed,
-                }
-
-        # Rule-based fallback
-        fixed = self._rule_based_fix(content, bug_type, line_num, error_context)
-        if fixed and fixed != content:
-            return {
-                "file": file_path,
-                "full_path": full_path,
-                "line": line_num,
-                "original_content": content,
-                "fixed_content": fixed,
-            }
+    async def _fix_file(
+        self,
+        full_path: str,
+        group: list[tuple[Failure, str]],
+        repo_path: str,
+        base: Optional[dict[str, Any]] = None,
+    ) -> Optional[dict[str, Any]]:
+        """
+        Produce one fix covering every failure reported in `full_path`, or,
+        given the fix of some of its failures as `base`, one fix covering
+        those and `group` (None if nothing more could be fixed).
+        """
+        content = base["fixed_content"] if base else self.overlay.read(full_path)
+
+        first = group[0][0]
+        fix = {
+            "file": first.file,
+            "full_path": full_path,
+            "line": first.line,
+            "original_content": base["original_content"] if base else content,
+            "failures": (base["failures"] if base else []) + [
+                {"bug_type": bug_type, "line": failure.line}
+                for failure, bug_type in group
+            ],
+            "cache_keys": list(base.get("cache_keys", [])) if base else [],
+        }
+        if base and base.get("rules"):
+            fix["rules"] = list(base["rules"])
+        # Lines of the failures in `content` (the base fix may have moved them)
+        base_hunks = (base.get("hunks") or []) if base else []
+        lines = [shift_line(base_hunks, failure.line) for failure, _ in group]
+
+        # Deterministic rules first: only failures no rule fixes go to the LLM
+        ruled = RuleFixes(unresolved=list(range(len(group))))
+        if FIX_RULES_ENABLED:
+            with span("rules"):
+                ruled = apply_rules(
+                    content, full_path,
+                    [(line, failure.error_context) for line, (failure, _) in zip(lines, group)],
+                    self._rejected_rules.get(full_path, ()),
+                )
+        fixed = apply_line_patch(content, ruled.hunks) if ruled.hunks else content
+        # Hunks are relative to `content`, which is not the file's content under a base fix
+        hunks = None if base else ruled.hunks or None
+        if ruled.rules:
+            print(f"[Rules] {first.file}: {', '.join(ruled.rules)}")
+            fix["rules"] = fix.get("rules", []) + ruled.rules
+        # Lines of the remaining failures, as they are after the rule fixes
+        remaining = [
+            (group[i][0], group[i][1], shift_line(ruled.hunks, lines[i]))
+            for i in ruled.unresolved
+        ]
+
+        if remaining and self.provider:
+            # Strip the per-run checkout path so identical requests hash identically
+            prefix = os.path.join(repo_path, "")
+            errors = [
+                (bug_type, line, failure.error_context.replace(prefix, ""))
+                for failure, bug_type, line in remaining
+            ]
+            llm_fixed, cache_key, llm_hunks = await self._llm_fix(fixed, errors, full_path)
+            if llm_fixed and llm_fixed != fixed:
+                # Patch hunks are against the rule-fixed text: only usable on their own
+                return {**fix, "fixed_content": llm_fixed, "cache_keys": fix["cache_keys"] + [cache_key],
+                        "hunks": None if base or ruled.hunks else llm_hunks}
+
+        # Rule-based fallback, applied failure by failure
+        fallback = fixed
+        for failure, bug_type, line in remaining:
+            candidate = self._rule_based_fix(fallback, bug_type, line, failure.error_context)
+            if candidate:
+                fallback = candidate
+        if fallback != fixed:
+            fixed, hunks = fallback, None
+        if fixed != content:
+            return {**fix, "fixed_content": fixed, "hunks": hunks}
 
         return None
 
     async def _llm_fix(
-        self, content: str, error_context: str, bug_type: str, line_num: int
-    ) -> Optional[str]:
-        """Use GPT-4 to generate a minimal fix."""
-        prompt = f"""You are an expert code repair agent. Fix the following {bug_type} bug.
+        self, content: str, errors: list[tuple[str, int, str]], path: str = ""
+    ) -> tuple[Optional[str], Optional[str], Optional[list]]:
+        """
+        Use the LLM to generate a minimal fix for one or more errors in a file.
+
+        In "window" mode only the regions around the failing lines are sent and
+        a line-range patch is requested; "file" mode asks for the whole file.
+        Returns (fixed content, cache key, patch hunks or None).
+        """
+        bug_types = ", ".join(dict.fromkeys(bug_type for bug_type, _, _ in errors))
+        error_context = "\n\n".join(
+            f"{bug_type} at line {line_num}:\n{context}" for bug_type, line_num, context in errors
+        )
+        lines = ", ".join(str(line_num) for _, line_num, _ in errors)
+
+        if LLM_FIX_MODE == "file":
+            prompt = f"""You are an expert code repair agent. Fix the following {bug_types} bug(s).
 
 ERROR CONTEXT:
 {error_context}
 
-FILE CONTENT (around line {line_num}):
+FILE CONTENT (around line {lines}):
 {content[:3000]}
 
 Return ONLY the complete fixed file content. No explanations. No markdown code blocks.
-The fix should be minimal - change only what's necessary to fix the {bug_type} error."""
+The fix should be minimal - change only what's necessary to fix the {bug_types} error(s)."""
+            fixed, cache_key = await self._complete(prompt, LLM_MAX_TOKENS)
+            return fixed, cache_key, None
+
+        windows = fix_windows(content, [line_num for _, line_num, _ in errors], path)
+        prompt = f"""You are an expert code repair agent. Fix the following {bug_types} bug(s) in {os.path.basename(path)}.
+
+ERROR CONTEXT:
+{error_context}
+
+CODE (line numbers on the left; only the relevant regions of the file, around line {lines}):
+{render_windows(content, windows)}
+
+Return ONLY a line-range patch in this exact format, one block per changed region:
+@@ replace START-END
+<replacement for original lines START..END, without line numbers>
+@@ end
+Replace only lines shown above. An empty block deletes the lines; to insert, repeat
+the neighbouring line in the replacement. No explanations. No markdown code blocks.
+The fix should be minimal - change only what's necessary to fix the {bug_types} error(s)."""
+
+        completion, cache_key = await self._complete(prompt, LLM_PATCH_MAX_TOKENS)
+        if not completion:
+            return None, None, None
+        hunks = parse_line_patch(completion, windows)
+        if not hunks:
+            print("[LLM] Could not parse a valid line patch")
+            if self.cache:
+                self.cache.reject(cache_key)
+            return None, None, None
+        return apply_line_patch(content, hunks), cache_key, hunks
+
+    async def _complete(self, prompt: str, max_tokens: int) -> tuple[Optional[str], str]:
+        """Run one completion through the fix cache and the rate-limited scheduler."""
+        model = self.provider.model
+        cache_key = FixCache.key(model, prompt)
+        # While recording, every prompt must reach the provider so the recording is complete
+        if self.cache and not isinstance(self.provider, RecordingProvider):
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print("[LLM] Fix cache hit")
+                return cached, cache_key
 
         try:
-            response = await self.llm_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=4000,
-            )
-            return response.choices[0].message.content.strip()
+            with span("llm"):
+                completion = await self.scheduler.run(
+                    lambda: self.provider.complete(prompt, max_tokens),
+                    estimate_tokens(prompt, max_tokens),
+                )
+            completion = completion.strip()
         except Exception as e:
             print(f"[LLM] Error: {e}")
-            return None
+            return None, cache_key
+
+        if self.cache and completion:
+            self.cache.put(cache_key, model, completion)
+        return completion, cache_key
+
+    def reject_fix(self, fix: dict[str, Any]) -> None:
+        """
+        Stop serving a cached completion whose fix did not resolve the
+        failure, and stop applying the rules it used to its file.
+        """
+        if fix.get("rules"):
+            self._rejected_rules.setdefault(fix["full_path"], set()).update(fix["rules"])
+            print(f"[Rules] Not applying {', '.join(sorted(set(fix['rules'])))} to {fix['file']} again")
+        if self.cache and fix.get("cache_keys"):
+            for cache_key in fix["cache_keys"]:
+                self.cache.reject(cache_key)
+            print(f"[LLM] Rejected cached fix for {fix['file']}")
 
     def _rule_based_fix(
         self, content: str, bug_type: str, line_num: int, error_context: str
@@ -133,19 +346,70 @@ The fix should be minimal - change only what's necessary to fix the {bug_type} e
         return None
 
     def apply_fix(self, fix: dict[str, Any], repo_path: str) -> bool:
-        """Write the fixed content to disk."""
+        """
+        Layer the fix onto the file in the overlay (written to disk by
+        `overlay.flush()`). A fix that leaves the file with a syntax error is
+        rejected, as is one whose file changed underneath it, unless its patch
+        hunks cover only lines the earlier edits did not touch.
+        """
         try:
-            with open(fix["full_path"], "w") as f:
-                f.write(fix["fixed_content"])
+            path = fix["full_path"]
+            current = self.overlay.read(path)
+            original = fix["original_content"]
+            if current == original:
+                fixed = fix["fixed_content"]
+            elif fix.get("hunks") and _hunks_untouched(original, current, fix["hunks"]):
+                fixed = apply_line_patch(current, fix["hunks"])
+            else:
+                print(f"[FixGen] {fix['file']} changed since its fix was generated, skipping")
+                return False
+
+            error = self.overlay.write(path, fixed)
+            if error:
+                print(f"[FixGen] Rejected fix for {fix['file']}: {error}")
+                self.reject_fix(fix)
+                return False
             return True
         except Exception as e:
             print(f"[FixGen] Failed to apply fix: {e}")
             return False
 
-    def _find_file(self, repo_path: str, file_path: str) -> Optional[str]:
-        """Search for a file by name in the repo."""
-        filename = os.path.basename(file_path)
-        for root, _, files in os.walk(repo_path):
-            if filename in files:
-                return os.path.join(root, filename)
-        return None
+    def _resolve_path(self, repo_path: str, file_path: str) -> Optional[str]:
+        """
+        Absolute path of a failure's file, looked up in the repo's file index
+        if it does not resolve. Files outside the repo (installed packages,
+        the interpreter) are never returned.
+        """
+        full_path = os.path.join(repo_path, file_path)
+        if os.path.isfile(full_path) and _inside(repo_path, full_path):
+            return full_path
+        if self.file_index is None or self.file_index.repo_path != repo_path:
+            self.file_index = FileIndex(repo_path)
+        return self.file_index.find(file_path)
+
+
+def _remaining(
+    group: list[tuple[Failure, str]], early_group: list[tuple[Failure, str]]
+) -> Optional[list[tuple[Failure, str]]]:
+    """The failures of `group` not in `early_group`, or None if `early_group` is not part of it."""
+    early = Counter((failure.line, bug_type) for failure, bug_type in early_group)
+    rest = []
+    for failure, bug_type in group:
+        if early[(failure.line, bug_type)]:
+            early[(failure.line, bug_type)] -= 1
+        else:
+            rest.append((failure, bug_type))
+    return None if +early else rest
+
+
+def _inside(repo_path: str, path: str) -> bool:
+    root = os.path.realpath(repo_path)
+    return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+
+def _hunks_untouched(original: str, current: str, hunks: list) -> bool:
+    """Whether earlier edits left the line count and every hunk's lines as they were."""
+    before, after = original.splitlines(), current.splitlines()
+    if len(before) != len(after):
+        return False
+    return all(before[start - 1:end] == after[start - 1:end] for start, end, _ in hunks)
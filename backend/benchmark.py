@@ -0,0 +1,484 @@
+"""
+Pipeline Benchmark
+==================
+Measures the healing pipeline end to end without GitHub or a real LLM.
+
+Synthetic repositories (Python and Node, from a handful of modules to
+thousands) are generated as local bare git repos with failures seeded
+across all six bug types, and `AgentController` is run against them
+through `file://` URLs. The LLM is a stub fix provider: every seeded line
+carries its own fix in a `seeded-fix|` comment, which the stub returns as a
+line patch (after an optional simulated latency), so the fix loop, the
+executor and the analyzer do real work while the model costs nothing.
+`--provider` runs the cases against a configured provider instead, e.g. a
+local model, or a replayed recording (see utils/fix_providers.py).
+
+Every case runs in a fresh interpreter with its own cache directory (cold
+caches unless --warm), and reports wall time, per-phase time, fixes/sec,
+iterations to green and peak RSS of the agent and of its child processes.
+Results are written as JSON; --compare checks them against an earlier
+results file and exits non-zero when a case got slower than allowed.
+
+    python benchmark.py --sizes small,medium --output bench.json
+    python benchmark.py --compare bench.json --max-regression 0.25
+    AGENT_LLM_PROVIDER=replay AGENT_LLM_RECORDING=llm.jsonl python benchmark.py --provider env
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_VERSION = 1
+
+SIZES = {"small": 10, "medium": 100, "large": 1000, "xlarge": 5000}  # Modules per repo
+SCENARIOS = {
+    # Test pipeline: the suite fails until the seeded bugs are fixed
+    "python": ["SYNTAX", "INDENTATION", "IMPORT", "TYPE_ERROR", "LOGIC"],
+    "node": ["SYNTAX", "IMPORT", "TYPE_ERROR", "LOGIC"],
+    # No tests: the static analysis path
+    "python-lint": ["LINTING"],
+    "node-lint": ["LINTING"],
+}
+
+SEEDED_FIX = re.compile(r"(?:#|//) seeded-fix\|(.*)$")
+PATCH_LINE = re.compile(r"^\s*(\d+)\| (.*)$", re.MULTILINE)
+
+
+# ── Synthetic repositories ──────────────────────────────────────────────────
+
+def _python_module(i: int, bug: Optional[str]) -> str:
+    body = "    total = x * 2\n"
+    head = ""
+    if bug == "SYNTAX":
+        body = "    total = x *  # seeded-fix|    total = x * 2\n"
+    elif bug == "INDENTATION":
+        body = "        total = x * 2  # seeded-fix|    total = x * 2\n"
+    elif bug == "IMPORT":
+        head = f"import missing_dependency_{i}  # seeded-fix|import os\n\n\n"
+    elif bug == "TYPE_ERROR":
+        body = '    total = "x" + x  # seeded-fix|    total = x * 2\n'
+    elif bug == "LOGIC":
+        body = "    total = x * 3  # seeded-fix|    total = x * 2\n"
+    elif bug == "LINTING":
+        body = "    total = x * 2  # seeded-fix|    total = x * 2   \n"
+    return (
+        f"{head}def compute_{i}(x):\n"
+        f"{body}"
+        f'    assert total == x * 2, "total must be twice x"\n'
+        f"    return total + {i}\n"
+    )
+
+
+def _python_test(i: int) -> str:
+    return (
+        f"from pkg.mod_{i} import compute_{i}\n\n\n"
+        f"def test_compute_{i}():\n"
+        f"    assert compute_{i}(3) == {6 + i}\n"
+    )
+
+
+def _node_module(i: int, bug: Optional[str]) -> str:
+    body = "  const total = x * 2;\n"
+    head = 'const assert = require("assert");\n'
+    if bug == "SYNTAX":
+        body = "  const total = x * ; // seeded-fix|  const total = x * 2;\n"
+    elif bug == "IMPORT":
+        head += f'const helper = require("./missing_helper_{i}"); // seeded-fix|const helper = null;\n'
+    elif bug == "TYPE_ERROR":
+        body = "  const total = x.double(); // seeded-fix|  const total = x * 2;\n"
+    elif bug == "LOGIC":
+        body = "  const total = x * 3; // seeded-fix|  const total = x * 2;\n"
+    elif bug == "LINTING":
+        body = "  var total = x * 2; // seeded-fix|  const total = x * 2;\n"
+    return (
+        f"{head}\n"
+        f"function compute{i}(x) {{\n"
+        f"{body}"
+        f"  assert.strictEqual(total, x * 2);\n"
+        f"  return total + {i};\n"
+        f"}}\n\n"
+        f"module.exports = {{ compute{i} }};\n"
+    )
+
+
+def _node_test(i: int) -> str:
+    return (
+        'const assert = require("assert");\n'
+        f'const {{ compute{i} }} = require("../src/mod_{i}");\n\n'
+        f"assert.strictEqual(compute{i}(3), {6 + i});\n"
+    )
+
+
+# Minimal runner: one line per failing test module, in the "FAILED path:line: message"
+# form the analyzer understands, pointing at the innermost frame in src/
+NODE_RUNNER = r"""const fs = require("fs");
+const path = require("path");
+
+const root = path.resolve(__dirname, "..");
+
+function location(err) {
+  const stack = String(err && err.stack);
+  const syntax = stack.match(/^(.+?\.js):(\d+)/);
+  if (err instanceof SyntaxError && syntax) return [syntax[1], syntax[2]];
+  for (const m of stack.matchAll(/\((.+?\.js):(\d+):\d+\)/g)) {
+    if (m[1].startsWith(path.join(root, "src"))) return [m[1], m[2]];
+  }
+  return null;
+}
+
+let failed = 0;
+const tests = fs.readdirSync(__dirname).filter((f) => f.endsWith(".test.js")).sort();
+for (const file of tests) {
+  try {
+    require(path.join(__dirname, file));
+  } catch (err) {
+    failed++;
+    const where = location(err);
+    const at = where ? `${path.relative(root, where[0])}:${where[1]}` : `test/${file}`;
+    console.log(`FAILED ${at}: ${err.name}: ${String(err.message).split("\n")[0]}`);
+  }
+}
+console.log(failed ? `Failures: ${failed}/${tests.length}` : `All tests passed (${tests.length})`);
+process.exit(failed ? 1 : 0);
+"""
+
+
+def generate_repo(path: str, scenario: str, modules: int, bugs_per_type: int, seed: int) -> dict:
+    """Write a synthetic repository with seeded bugs. Returns {relative path: bug type}."""
+    bug_types = SCENARIOS[scenario]
+    rng = random.Random(seed)
+    count = max(modules, len(bug_types) * bugs_per_type)
+    picked = rng.sample(range(count), len(bug_types) * bugs_per_type)
+    bugs = {index: bug_types[n % len(bug_types)] for n, index in enumerate(picked)}
+    with_tests = not scenario.endswith("-lint")
+    python = scenario.startswith("python")
+
+    def write(rel_path: str, content: str) -> None:
+        full = os.path.join(path, rel_path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as f:
+            f.write(content)
+
+    seeded = {}
+    for i in range(count):
+        if python:
+            rel_path = f"pkg/mod_{i}.py"
+            write(rel_path, _python_module(i, bugs.get(i)))
+            if with_tests:
+                write(f"tests/test_mod_{i}.py", _python_test(i))
+        else:
+            rel_path = f"src/mod_{i}.js"
+            write(rel_path, _node_module(i, bugs.get(i)))
+            if with_tests:
+                write(f"test/mod_{i}.test.js", _node_test(i))
+        if i in bugs:
+            seeded[rel_path] = bugs[i]
+
+    if python:
+        write("pkg/__init__.py", "")
+    else:
+        scripts = {"test": "node test/run.js"} if with_tests else {}
+        write("package.json", json.dumps({"name": "bench", "version": "1.0.0", "scripts": scripts}, indent=2))
+        if with_tests:
+            write("test/run.js", NODE_RUNNER)
+    return seeded
+
+
+def _git(*args: str, cwd: Optional[str] = None) -> str:
+    env = dict(os.environ, GIT_AUTHOR_NAME="bench", GIT_AUTHOR_EMAIL="bench@example.com",
+               GIT_COMMITTER_NAME="bench", GIT_COMMITTER_EMAIL="bench@example.com")
+    return subprocess.run(
+        ["git", *args], cwd=cwd, env=env, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def create_origin(root: str, scenario: str, size: str, bugs_per_type: int, seed: int) -> tuple[str, dict]:
+    """Generate the repository, commit it and publish it as a bare repo. Returns (file:// URL, seeded)."""
+    work = os.path.join(root, f"{scenario}-{size}-src")
+    origin = os.path.join(root, f"{scenario}-{size}.git")
+    shutil.rmtree(work, ignore_errors=True)
+    shutil.rmtree(origin, ignore_errors=True)
+    seeded = generate_repo(work, scenario, SIZES[size], bugs_per_type, seed)
+    _git("init", "-q", "-b", "main", cwd=work)
+    _git("add", "-A", cwd=work)
+    _git("commit", "-q", "-m", "Synthetic benchmark repository", cwd=work)
+    _git("clone", "-q", "--bare", work, origin)
+    shutil.rmtree(work, ignore_errors=True)
+    return f"file://{origin}", seeded
+
+
+# ── Stub LLM ────────────────────────────────────────────────────────────────
+
+STUB_PROVIDER = "benchmark-stub"
+
+
+class StubProvider:
+    """
+    Fix provider answering line-patch prompts (and whole-file prompts) by
+    applying the `seeded-fix|` comments of the code it was shown; code
+    without them gets an empty answer.
+    """
+
+    model = STUB_PROVIDER
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    async def complete(self, prompt: str, max_tokens: int) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._whole_file(prompt) if "FILE CONTENT" in prompt else self._patch(prompt)
+
+    @staticmethod
+    def _patch(prompt: str) -> str:
+        blocks = []
+        for number, line in PATCH_LINE.findall(prompt):
+            fix = SEEDED_FIX.search(line)
+            if fix:
+                blocks.append(f"@@ replace {number}-{number}\n{fix.group(1).rstrip()}\n@@ end")
+        return "\n".join(blocks)
+
+    @staticmethod
+    def _whole_file(prompt: str) -> str:
+        content = prompt.split("FILE CONTENT", 1)[1].split(":\n", 1)[1].split("\n\nReturn ONLY", 1)[0]
+        lines = []
+        for line in content.splitlines():
+            fix = SEEDED_FIX.search(line)
+            lines.append(fix.group(1).rstrip() if fix else line)
+        return "\n".join(lines) + "\n"
+
+
+# ── One case (runs in its own interpreter) ──────────────────────────────────
+
+async def _run_case(repo_url: str, latency: float) -> dict:
+    # Imported here: the agent's configuration is read from the environment at import
+    from agents.controller import AgentController
+    from utils.fix_providers import PROVIDERS
+
+    PROVIDERS[STUB_PROVIDER] = lambda: StubProvider(latency)
+
+    controller = AgentController(repo_url, "BENCH_RUN_AI_Fix", "bench", "run")
+    start = time.perf_counter()
+    result = await controller.run()
+    wall = time.perf_counter() - start
+    return {
+        "ci_status": result["ci_status"],
+        "wall_seconds": round(wall, 3),
+        "iterations_used": result["iterations_used"],
+        "iterations_to_green": result["iterations_used"] if result["ci_status"] == "PASSED" else None,
+        "total_failures": result["total_failures"],
+        "total_fixes": result["total_fixes"],
+        "fixes_per_second": round(result["total_fixes"] / wall, 3) if wall else 0.0,
+        "llm_calls": result.get("phases", {}).get("llm", {}).get("count", 0),
+        "phases": result.get("phases", {}),
+        "error": result.get("error"),
+    }
+
+
+def _peak_rss_mb() -> tuple[float, float]:
+    """Peak RSS of this process and of its largest child, in MB."""
+    import resource
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # ru_maxrss: bytes on macOS, KB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(own * scale / 2**20, 1), round(children * scale / 2**20, 1)
+
+
+def case_main(repo_url: str, latency: float, output: str) -> None:
+    sys.path.insert(0, BACKEND_DIR)
+    try:
+        case = asyncio.run(_run_case(repo_url, latency))
+    except Exception as e:
+        case = {"ci_status": "ERROR", "error": f"{type(e).__name__}: {e}"}
+    case["peak_rss_mb"], case["peak_child_rss_mb"] = _peak_rss_mb()
+    with open(output, "w") as f:
+        json.dump(case, f)
+
+
+# ── Driver ──────────────────────────────────────────────────────────────────
+
+def _code_version() -> dict:
+    try:
+        commit = _git("rev-parse", "HEAD", cwd=BACKEND_DIR)
+        dirty = bool(_git("status", "--porcelain", "--", ".", cwd=BACKEND_DIR))
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        commit, dirty = None, None
+    return {"commit": commit, "dirty": dirty}
+
+
+def _keep_log(log_path: str, output: str) -> str:
+    """Copy a failed run's log next to the results file, outside the work directory that gets removed."""
+    logs_dir = os.path.splitext(output)[0] + "-logs"
+    os.makedirs(logs_dir, exist_ok=True)
+    kept = os.path.join(logs_dir, os.path.basename(log_path))
+    shutil.copyfile(log_path, kept)
+    return kept
+
+
+def run_case(root: str, scenario: str, size: str, repeat: int, args: argparse.Namespace) -> dict:
+    repo_url, seeded = create_origin(root, scenario, size, args.bugs_per_type, args.seed)
+    cache_dir = os.path.join(root, f"cache-{scenario}-{size}")
+    runs = []
+    for n in range(repeat):
+        if not args.warm:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        output = os.path.join(root, f"{scenario}-{size}-{n}.json")
+        log_path = os.path.join(root, f"{scenario}-{size}-{n}.log")
+        env = dict(os.environ, AGENT_CACHE_DIR=cache_dir)
+        if args.provider == "stub":
+            env["AGENT_LLM_PROVIDER"] = STUB_PROVIDER
+        timed_out = False
+        with open(log_path, "w") as log:
+            try:
+                subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--case", repo_url,
+                     "--llm-latency", str(args.llm_latency), "--case-output", output],
+                    cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+                    timeout=args.case_timeout,
+                )
+            except subprocess.TimeoutExpired:
+                timed_out = True
+        try:
+            with open(output) as f:
+                run = json.load(f)
+        except (OSError, ValueError):
+            reason = f"timed out after {args.case_timeout:g}s" if timed_out else "no result"
+            run = {"ci_status": "ERROR", "error": reason}
+        if args.keep:
+            run["log"] = log_path
+        elif run.get("ci_status") != "PASSED":
+            run["log"] = _keep_log(log_path, args.output)
+        else:
+            run["log"] = None
+        runs.append(run)
+
+    walls = [r["wall_seconds"] for r in runs if "wall_seconds" in r]
+    return {
+        "scenario": scenario,
+        "size": size,
+        "modules": SIZES[size],
+        "seeded_bugs": seeded,
+        "runs": runs,
+        "median_wall_seconds": round(statistics.median(walls), 3) if walls else None,
+    }
+
+
+def compare(results: dict, baseline_path: str, max_regression: float) -> bool:
+    """Print per-case changes against a baseline. Returns False if any case regressed."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(c["scenario"], c["size"]): c for c in baseline.get("cases", [])}
+    ok = True
+    print(f"\nCompared with {baseline_path} ({(baseline.get('code') or {}).get('commit')}):")
+    for case in results["cases"]:
+        old = before.get((case["scenario"], case["size"]))
+        if not old or not old.get("median_wall_seconds") or not case["median_wall_seconds"]:
+            continue
+        change = case["median_wall_seconds"] / old["median_wall_seconds"] - 1
+        regressed = change > max_regression
+        ok = ok and not regressed
+        print(f"  {case['scenario']:<12} {case['size']:<7} {old['median_wall_seconds']:>8.2f}s -> "
+              f"{case['median_wall_seconds']:>8.2f}s  {change:+.1%}{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def _print_summary(results: dict) -> None:
+    print(f"\n{'scenario':<12} {'size':<7} {'status':<9} {'wall':>8} {'iters':>5} "
+          f"{'fixes':>5} {'fix/s':>6} {'rss MB':>7}  slowest phases")
+    for case in results["cases"]:
+        for run in case["runs"]:
+            phases = sorted(run.get("phases", {}).items(), key=lambda p: -p[1]["seconds"])[:3]
+            print(f"{case['scenario']:<12} {case['size']:<7} {run.get('ci_status', '?'):<9} "
+                  f"{run.get('wall_seconds', 0):>7.2f}s {run.get('iterations_used', 0):>5} "
+                  f"{run.get('total_fixes', 0):>5} {run.get('fixes_per_second', 0):>6.2f} "
+                  f"{max(run.get('peak_rss_mb', 0), run.get('peak_child_rss_mb', 0)):>7.1f}  "
+                  + ", ".join(f"{name} {p['seconds']:.2f}s" for name, p in phases))
+            if run.get("error"):
+                print(f"{'':<12} error: {run['error']}")
+            if run.get("ci_status") != "PASSED" and run.get("log"):
+                print(f"{'':<12} log: {run['log']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--sizes", default="small,medium", help=f"Comma-separated, from: {', '.join(SIZES)}")
+    parser.add_argument("--bugs-per-type", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case (the median is compared)")
+    parser.add_argument("--warm", action="store_true", help="Keep each case's caches between repeats")
+    parser.add_argument("--provider", default="stub", choices=["stub", "env"],
+                        help='"stub", or "env" to use the fix provider AGENT_LLM_PROVIDER configures')
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per stub LLM call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--case-timeout", type=float, default=1800)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="Earlier results file to check for regressions")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed relative wall-time increase per case with --compare")
+    parser.add_argument("--workdir", help="Where repos, caches and logs go (default: a temp dir)")
+    parser.add_argument("--keep", action="store_true", help="Keep the work directory and all logs (logs of failed runs are always kept)")
+    # Internal: run one case in this interpreter
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--case-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        case_main(args.case, args.llm_latency, args.case_output)
+        return 0
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    sizes = [s for s in args.sizes.split(",") if s]
+    unknown = [s for s in scenarios if s not in SCENARIOS] + [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown scenario/size: {', '.join(unknown)}")
+    if any(s.startswith("node") for s in scenarios) and not shutil.which("node"):
+        print("[Bench] node not found, skipping Node scenarios")
+        scenarios = [s for s in scenarios if not s.startswith("node")]
+
+    root = args.workdir or tempfile.mkdtemp(prefix="ci_healer_bench_")
+    os.makedirs(root, exist_ok=True)
+    results = {
+        "version": RESULTS_VERSION,
+        "code": _code_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "settings": {k: v for k, v in vars(args).items() if not k.startswith("case")},
+        "cases": [],
+    }
+    try:
+        for scenario in scenarios:
+            for size in sizes:
+                print(f"[Bench] {scenario} / {size} ({SIZES[size]} modules)")
+                results["cases"].append(run_case(root, scenario, size, max(1, args.repeat), args))
+    finally:
+        if not args.keep and not args.workdir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    _print_summary(results)
+    print(f"\n[Bench] Results written to {args.output}")
+
+    if args.compare and not compare(results, args.compare, args.max_regression):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,21 +6,35 @@ Entry point for the multi-agent repair pipeline.
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from pydantic import BaseModel, HttpUrl
+from contextlib import asynccontextmanager
 import json
 import os
 import time
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 
+from agents.classifier_agent import rule_hits
 from agents.controller import AgentController
+from utils.fix_cache import get_fix_cache
+from utils.job_queue import JobQueue, QueueFullError, JOB_COMPLETED, JOB_FAILED
+from utils.metrics import render_metrics
 from utils.scoring import calculate_score
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+
+
 app = FastAPI(
     title="CI/CD Healing Agent API",
     description="Autonomous multi-agent pipeline for detecting and fixing CI/CD failures",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Allow all origins for hackathon demo
@@ -52,18 +66,103 @@ class AgentResponse(BaseModel):
     score: dict
     fixes: list
     timeline: list
+    phases: dict = {}  # phase -> {"count", "seconds"}
+
+
+class JobSubmitted(BaseModel):
+    job_id: str
+    status: str
+    created_at: str
+    queue_depth: int
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str
+    repo_url: str
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
 
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "agent": "online", "timestamp": datetime.utcnow().isoformat()}
+    fix_cache = get_fix_cache()
+    return {
+        "status": "ok",
+        "agent": "online",
+        "timestamp": datetime.utcnow().isoformat(),
+        "jobs": job_queue.stats(),
+        "llm_cache": fix_cache.stats() if fix_cache else None,
+        "classifier_rule_hits": rule_hits(),
+    }
+
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Phase and job duration histograms in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
-@app.post("/run-agent", response_model=AgentResponse)
+
+@app.post("/run-agent", response_model=JobSubmitted, status_code=202)
 async def run_agent(request: AgentRequest):
     """
-    Main endpoint: Runs the autonomous CI/CD healing pipeline.
-    
+    Main endpoint: Queues a run of the autonomous CI/CD healing pipeline.
+
+    Returns a job ID immediately; poll `/jobs/{job_id}` for status and fetch
+    `/jobs/{job_id}/result` once it has completed.
+    """
+    if not request.repo_url.startswith("https://github.com/"):
+        raise HTTPException(status_code=400, detail="Only GitHub repositories are supported")
+
+    try:
+        job = job_queue.submit(request.model_dump())
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "queue_depth": job_queue.stats()["queue_depth"],
+    }
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Return the status of a queued, running or finished job."""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "repo_url": job["payload"]["repo_url"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"],
+    }
+
+
+@app.get("/jobs/{job_id}/result", response_model=AgentResponse)
+async def get_job_result(job_id: str):
+    """Return the pipeline result of a completed job."""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == JOB_FAILED:
+        raise HTTPException(status_code=500, detail=f"Agent pipeline failed: {job['error']}")
+    if job["status"] != JOB_COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Job is still {job['status']}")
+    return job["result"]
+
+
+async def run_pipeline(payload: dict[str, Any]) -> dict[str, Any]:
+    """
+    Runs the autonomous CI/CD healing pipeline for one queued job.
+
     1. Creates branch (TEAMNAME_LEADERNAME_AI_Fix)
     2. Clones repo into Docker sandbox
     3. Installs deps (Python / Node auto-detection)
@@ -72,8 +171,7 @@ async def run_agent(request: AgentRequest):
     6. Commits all fixes with [AI-AGENT] prefix
     7. Returns structured results.json
     """
-    if not request.repo_url.startswith("https://github.com/"):
-        raise HTTPException(status_code=400, detail="Only GitHub repositories are supported")
+    request = AgentRequest(**payload)
 
     # Create branch name: TEAMNAME_LEADERNAME_AI_Fix
     branch_name = (
@@ -90,10 +188,7 @@ async def run_agent(request: AgentRequest):
         leader_name=request.leader_name,
     )
 
-    try:
-        result = await controller.run()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Agent pipeline failed: {str(e)}")
+    result = await controller.run()
 
     elapsed = time.time() - start_time
     minutes = int(elapsed // 60)
@@ -119,6 +214,7 @@ async def run_agent(request: AgentRequest):
         "score": score,
         "fixes": result["fixes"],
         "timeline": result["timeline"],
+        "phases": result.get("phases", {}),
     }
 
     # Save results.json
@@ -136,6 +232,9 @@ async def get_results():
     return FileResponse("results.json", media_type="application/json")
 
 
+job_queue = JobQueue(run_pipeline)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
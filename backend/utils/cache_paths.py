@@ -0,0 +1,82 @@
+"""
+Cache Paths
+===========
+Location and size management of the agent's persistent on-disk caches.
+
+Every cache lives in its own subdirectory of AGENT_CACHE_DIR. Entries are
+directories (or files) whose mtime is bumped on use, so eviction can drop
+the least recently used ones first.
+"""
+
+import os
+import shutil
+import tempfile
+from typing import Iterable
+
+
+CACHE_ROOT = os.getenv(
+    "AGENT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ci_healer_cache")
+)
+
+
+def cache_dir(name: str) -> str:
+    """Return (and create) the directory for the named cache."""
+    path = os.path.join(CACHE_ROOT, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def touch(path: str) -> None:
+    """Mark a cache entry as recently used."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def entry_size(path: str) -> int:
+    """Total size in bytes of a file or directory tree (symlinks not followed)."""
+    if not os.path.isdir(path):
+        return os.path.getsize(path) if os.path.exists(path) else 0
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def evict_lru(parent: str, max_bytes: int, protected: Iterable[str] = ()) -> list[str]:
+    """
+    Delete least recently used entries of `parent` until it fits in `max_bytes`.
+    Entries named in `protected` are never removed. Returns the evicted names.
+    """
+    protected = set(protected)
+    entries = []
+    for name in os.listdir(parent):
+        path = os.path.join(parent, name)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            continue
+        entries.append((mtime, name, path, entry_size(path)))
+
+    total = sum(e[3] for e in entries)
+    evicted = []
+    for _, name, path, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if name in protected:
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+        total -= size
+        evicted.append(name)
+    return evicted
@@ -0,0 +1,252 @@
+"""
+Dependency Cache
+================
+Content-addressed cache of prepared dependency environments.
+
+The key is a hash of the project's dependency manifests (requirements.txt,
+setup.py, pyproject.toml, package.json, package-lock.json, yarn.lock) plus
+the interpreter / Node version. A cached entry holds either a virtualenv
+(Python) or a node_modules tree (Node). Runs hard-link the entry into place,
+so a cache hit skips the install completely. Linked files are read-only
+(they are the cache's own copies), and files tools rewrite at run time are
+copied instead; venv scripts are re-pointed at the venv they were linked to.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import uuid
+from typing import Optional
+
+from utils.cache_paths import cache_dir, evict_lru, touch
+from utils.process_runner import run_process
+from utils.project_detector import install_dependencies
+
+
+DEPS_CACHE_ENABLED = os.getenv("AGENT_DEPS_CACHE", "1") != "0"
+DEPS_MAX_BYTES = int(os.getenv("AGENT_DEPS_MAX_MB", "10240")) * 1024 * 1024
+
+PYTHON_MANIFESTS = ["requirements.txt", "setup.py", "pyproject.toml"]
+NODE_MANIFESTS = ["package.json", "package-lock.json", "yarn.lock"]
+
+_BIN_DIR = "Scripts" if os.name == "nt" else "bin"
+# Copied rather than linked: tool caches written at run time (babel, eslint,
+# vite, ...) and .pth files that editable installs rewrite in place
+_WRITABLE_DIRS = {".cache", ".vite", ".vitest"}
+_WRITABLE_SUFFIXES = (".pth",)
+_MAX_SCRIPT_BYTES = 1024 * 1024
+_tool_versions: dict[str, str] = {}
+
+
+async def prepare_dependencies(
+    repo_path: str, project_type: str, work_dir: str
+) -> Optional[dict[str, str]]:
+    """
+    Make the project's dependencies available, from cache when possible.
+
+    Returns environment variables to run project tools with (a venv on PATH
+    for Python), or None when the default environment should be used.
+    """
+    if not DEPS_CACHE_ENABLED:
+        await install_dependencies(repo_path, project_type)
+        return None
+
+    key = await dependency_key(repo_path, project_type)
+    if not key:
+        await install_dependencies(repo_path, project_type)
+        return None
+
+    if project_type == "python":
+        return await _prepare_python(repo_path, work_dir, key)
+    await _prepare_node(repo_path, project_type, key)
+    return None
+
+
+async def dependency_key(repo_path: str, project_type: str) -> Optional[str]:
+    """Hash of the dependency manifests and toolchain version, or None if there are none."""
+    manifests = PYTHON_MANIFESTS if project_type == "python" else NODE_MANIFESTS
+    digest = hashlib.sha256(project_type.encode())
+    found = False
+    for name in manifests:
+        path = os.path.join(repo_path, name)
+        if not os.path.isfile(path):
+            continue
+        found = True
+        digest.update(name.encode() + b"\0")
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    if not found:
+        return None
+
+    tool = ["python", "--version"] if project_type == "python" else ["node", "--version"]
+    digest.update((await _tool_version(tool)).encode())
+    return digest.hexdigest()[:32]
+
+
+async def _prepare_python(repo_path: str, work_dir: str, key: str) -> Optional[dict[str, str]]:
+    deps_dir = cache_dir("deps")
+    entry = os.path.join(deps_dir, key)
+    venv_path = os.path.join(work_dir, "venv")
+
+    if os.path.isdir(entry):
+        print(f"[Deps] Cache hit {key[:12]}, skipping install")
+        touch(entry)
+        await asyncio.to_thread(link_venv, os.path.join(entry, "venv"), venv_path)
+        python = _venv_python(venv_path)
+        # Editable installs point at the checkout that built the entry; re-point them
+        if _installs_editable(repo_path):
+            await run_process(
+                [python, "-m", "pip", "install", "-e", ".", "--no-deps", "--quiet"],
+                cwd=repo_path, timeout=300
+            )
+        return venv_env(venv_path)
+
+    print(f"[Deps] Cache miss {key[:12]}, building environment")
+    staging = os.path.join(deps_dir, f"{key}.tmp-{uuid.uuid4().hex[:8]}")
+    staging_venv = os.path.join(staging, "venv")
+    result = await run_process(
+        ["python", "-m", "venv", "--system-site-packages", staging_venv], timeout=300
+    )
+    if not result.ok:
+        print(f"[Deps] venv creation failed, installing globally: {result.stderr.strip()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        await install_dependencies(repo_path, "python")
+        return None
+
+    ok = await install_dependencies(repo_path, "python", python=_venv_python(staging_venv))
+    await asyncio.to_thread(link_venv, staging_venv, venv_path)
+    if ok:
+        # Scripts in the entry must run the entry's interpreter, not the staging one
+        await asyncio.to_thread(relocate_venv, staging_venv, os.path.join(entry, "venv"))
+        await _publish(staging, entry, key)
+    else:
+        shutil.rmtree(staging, ignore_errors=True)
+    return venv_env(venv_path)
+
+
+async def _prepare_node(repo_path: str, project_type: str, key: str) -> None:
+    deps_dir = cache_dir("deps")
+    entry = os.path.join(deps_dir, key)
+    node_modules = os.path.join(repo_path, "node_modules")
+
+    if os.path.isdir(entry) and not os.path.exists(node_modules):
+        print(f"[Deps] Cache hit {key[:12]}, skipping install")
+        touch(entry)
+        await asyncio.to_thread(link_tree, os.path.join(entry, "node_modules"), node_modules)
+        return
+
+    print(f"[Deps] Cache miss {key[:12]}, installing")
+    if not await install_dependencies(repo_path, project_type):
+        return
+    if not os.path.isdir(node_modules):
+        return
+
+    staging = os.path.join(deps_dir, f"{key}.tmp-{uuid.uuid4().hex[:8]}")
+    await asyncio.to_thread(link_tree, node_modules, os.path.join(staging, "node_modules"))
+    await _publish(staging, entry, key)
+
+
+async def _publish(staging: str, entry: str, key: str) -> None:
+    """Atomically move a finished staging directory into the cache, then evict."""
+    try:
+        os.rename(staging, entry)
+    except OSError:
+        # A concurrent job published the same key first
+        shutil.rmtree(staging, ignore_errors=True)
+    evicted = await asyncio.to_thread(evict_lru, cache_dir("deps"), DEPS_MAX_BYTES, [key])
+    for name in evicted:
+        print(f"[Deps] Evicted {name}")
+
+
+def link_tree(src: str, dst: str) -> None:
+    """
+    Copy a directory tree using hard links, falling back to real copies.
+
+    A linked file shares its inode with the cache entry, so it is made
+    read-only: a tool rewriting it in place would otherwise change the copy
+    of every later job. Files tools are known to write are copied instead.
+    """
+
+    def link_or_copy(s: str, d: str) -> None:
+        relative = os.path.relpath(s, src).split(os.sep)
+        if s.endswith(_WRITABLE_SUFFIXES) or not _WRITABLE_DIRS.isdisjoint(relative[:-1]):
+            _copy_writable(s, d)
+            return
+        try:
+            mode = os.stat(s).st_mode
+            if mode & 0o222:
+                os.chmod(s, mode & ~0o222)
+            os.link(s, d)
+        except OSError:
+            _copy_writable(s, d)
+
+    shutil.copytree(src, dst, symlinks=True, copy_function=link_or_copy)
+
+
+def link_venv(src: str, dst: str) -> None:
+    """link_tree for a virtualenv, with its scripts re-pointed at `dst`."""
+    link_tree(src, dst)
+    relocate_venv(dst, dst, src)
+
+
+def relocate_venv(venv_path: str, new_path: str, old_path: Optional[str] = None) -> None:
+    """
+    Rewrite the absolute venv path (`old_path`, default `venv_path`) that
+    console-script shebangs and activate scripts in `venv_path` embed, so
+    that `pytest`, `flake8`, ... run the interpreter at `new_path`.
+    """
+    old, new = (old_path or venv_path).encode(), new_path.encode()
+    if old == new:
+        return
+    bin_dir = os.path.join(venv_path, _BIN_DIR)
+    for name in os.listdir(bin_dir):
+        path = os.path.join(bin_dir, name)
+        if os.path.islink(path) or not os.path.isfile(path) or os.path.getsize(path) > _MAX_SCRIPT_BYTES:
+            continue
+        with open(path, "rb") as f:
+            content = f.read()
+        if old not in content:
+            continue
+        mode = os.stat(path).st_mode
+        os.remove(path)  # A new file: the old one may be linked into the cache
+        with open(path, "wb") as f:
+            f.write(content.replace(old, new))
+        os.chmod(path, mode | 0o200)
+
+
+def _copy_writable(src: str, dst: str) -> None:
+    shutil.copy2(src, dst)
+    os.chmod(dst, os.stat(dst).st_mode | 0o200)
+
+
+def venv_env(venv_path: str) -> dict[str, str]:
+    """Environment that resolves `python` and console scripts to the venv."""
+    env = dict(os.environ)
+    env["VIRTUAL_ENV"] = venv_path
+    env["PATH"] = os.path.join(venv_path, _BIN_DIR) + os.pathsep + env.get("PATH", "")
+    env.pop("PYTHONHOME", None)
+    return env
+
+
+def _venv_python(venv_path: str) -> str:
+    return os.path.join(venv_path, _BIN_DIR, "python")
+
+
+def _installs_editable(repo_path: str) -> bool:
+    """Mirrors install_dependencies: setup.py is installed editable when there is no requirements.txt."""
+    return (
+        not os.path.exists(os.path.join(repo_path, "requirements.txt"))
+        and os.path.exists(os.path.join(repo_path, "setup.py"))
+    )
+
+
+async def _tool_version(cmd: list[str]) -> str:
+    key = " ".join(cmd)
+    if key not in _tool_versions:
+        try:
+            result = await run_process(cmd, timeout=30)
+            _tool_versions[key] = (result.stdout + result.stderr).strip()
+        except FileNotFoundError:
+            _tool_versions[key] = "missing"
+    return _tool_versions[key]
@@ -0,0 +1,50 @@
+"""
+Failure Records
+===============
+Compact failure type shared by the analyzer, classifier and fix generator.
+
+A failure does not own a copy of the log it was parsed from. All failures
+of one analysis point into a single shared LogBuffer by offset range, and
+the surrounding context is only sliced out when someone asks for it, so
+memory per job no longer grows with the number of failures found.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+CONTEXT_BEFORE = 1000
+CONTEXT_AFTER = 1000
+
+
+class LogBuffer:
+    """One log (test output, linter output, report details) shared by many failures."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+
+@dataclass(slots=True)
+class Failure:
+    """A parsed failure: location, short message and a reference into its log."""
+
+    file: str
+    line: int
+    error_context: str
+    log: Optional[LogBuffer] = None
+    start: int = 0
+    end: int = 0
+    test_id: str = ""
+    duration: float = 0.0
+
+    @property
+    def raw_log(self) -> str:
+        """The part of the shared log around this failure, sliced on demand."""
+        if self.log is None:
+            return ""
+        return self.log.text[max(0, self.start - CONTEXT_BEFORE):self.end + CONTEXT_AFTER]
@@ -0,0 +1,60 @@
+"""
+File Index
+==========
+Per-job index of the files in a checkout, for resolving the paths that
+show up in CI logs and tracebacks (absolute paths from another machine,
+paths relative to some other directory, bare file names).
+
+The index is built from the job's repo manifest (or a scan on the first
+lookup). A lookup then only looks at the files sharing the basename and
+picks the one whose path has the longest common suffix with the reported
+path.
+"""
+
+import os
+from typing import Optional
+
+from utils.repo_manifest import RepoManifest, scan_repo
+
+
+class FileIndex:
+    """Basename → repo-relative paths, with longest-suffix matching."""
+
+    def __init__(self, repo_path: str, manifest: Optional[RepoManifest] = None):
+        self.repo_path = repo_path
+        self.manifest = manifest
+        self._by_name: Optional[dict[str, list[tuple[str, ...]]]] = None
+
+    def _build(self) -> dict[str, list[tuple[str, ...]]]:
+        by_name: dict[str, list[tuple[str, ...]]] = {}
+        for rel_path in (self.manifest or scan_repo(self.repo_path)).files:
+            parts = tuple(rel_path.split("/"))
+            by_name.setdefault(parts[-1], []).append(parts)
+        for candidates in by_name.values():
+            candidates.sort()
+        return by_name
+
+    def find(self, file_path: str) -> Optional[str]:
+        """
+        Absolute path of the indexed file that best matches `file_path`, or
+        None. Ties (e.g. only the basename matches) go to the shallowest file.
+        """
+        if self._by_name is None:
+            self._by_name = self._build()
+        parts = [p for p in file_path.replace("\\", "/").split("/") if p not in ("", ".")]
+        if not parts:
+            return None
+        candidates = self._by_name.get(parts[-1])
+        if not candidates:
+            return None
+
+        def score(candidate: tuple[str, ...]) -> tuple[int, int]:
+            common = 0
+            for a, b in zip(reversed(candidate), reversed(parts)):
+                if a != b:
+                    break
+                common += 1
+            return common, -len(candidate)
+
+        best = max(candidates, key=score)
+        return os.path.join(self.repo_path, *best)
@@ -0,0 +1,147 @@
+"""
+Fix Cache
+=========
+Persistent, content-addressed cache of LLM fix completions (SQLite).
+
+The key is a hash of the model name and the full prompt (file content,
+error context and bug types), so an identical repair request never pays for
+a second completion. Entries expire after a TTL, the least recently used
+ones are dropped beyond a size cap, and a fix that was later shown to fail
+its tests is marked rejected and never served again.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from utils.cache_paths import cache_dir
+
+
+FIX_CACHE_ENABLED = os.getenv("AGENT_LLM_CACHE", "1") != "0"
+FIX_CACHE_TTL = float(os.getenv("AGENT_LLM_CACHE_TTL_DAYS", "30")) * 86400
+FIX_CACHE_MAX_ENTRIES = int(os.getenv("AGENT_LLM_CACHE_MAX_ENTRIES", "10000"))
+_EVICT_EVERY = 100
+
+
+class FixCache:
+    """Thread-safe SQLite store of prompt-hash → completion."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = FIX_CACHE_TTL,
+        max_entries: int = FIX_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path or os.path.join(cache_dir("llm"), "fixes.sqlite3")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.rejected_skips = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS fixes (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                completion TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                rejected INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS fixes_last_used ON fixes (last_used)")
+        self._db.commit()
+        self.evict()
+
+    @staticmethod
+    def key(model: str, prompt: str) -> str:
+        return hashlib.sha256(f"{model}\0{prompt}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached completion, or None on a miss / expired / rejected entry."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT completion, created_at, rejected FROM fixes WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            if row[2]:
+                self.rejected_skips += 1
+                return None
+            self._db.execute(
+                "UPDATE fixes SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            self._db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, completion: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                """INSERT OR REPLACE INTO fixes (key, model, completion, created_at, last_used)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (key, model, completion, now, now),
+            )
+            self._db.commit()
+            self._puts += 1
+        if self._puts % _EVICT_EVERY == 0:
+            self.evict()
+
+    def reject(self, key: str) -> None:
+        """Mark a completion whose fix did not make the failure go away."""
+        with self._lock:
+            self._db.execute("UPDATE fixes SET rejected = 1 WHERE key = ?", (key,))
+            self._db.commit()
+
+    def evict(self) -> None:
+        """Drop expired entries, then the least recently used beyond max_entries."""
+        with self._lock:
+            self._db.execute("DELETE FROM fixes WHERE created_at < ?", (time.time() - self.ttl,))
+            self._db.execute(
+                """DELETE FROM fixes WHERE key IN (
+                       SELECT key FROM fixes ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            entries, rejected = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(rejected), 0) FROM fixes"
+            ).fetchone()
+        lookups = self.hits + self.misses + self.rejected_skips
+        return {
+            "entries": entries,
+            "rejected_entries": rejected,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected_skips": self.rejected_skips,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+_default_cache: Optional[FixCache] = None
+
+
+def get_fix_cache() -> Optional[FixCache]:
+    """Process-wide cache instance, or None when disabled / unavailable."""
+    global _default_cache
+    if not FIX_CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        try:
+            _default_cache = FixCache()
+        except sqlite3.Error as e:
+            print(f"[FixCache] Disabled, could not open database: {e}")
+            return None
+    return _default_cache
@@ -0,0 +1,239 @@
+"""
+Fix Providers
+=============
+Where `FixGeneratorAgent` gets its completions from, chosen with
+AGENT_LLM_PROVIDER:
+
+- "openai" (default): the OpenAI API, with OPENAI_API_KEY.
+- "local": an OpenAI-compatible chat completions server (Ollama,
+  llama.cpp, vLLM, ...) at AGENT_LLM_BASE_URL; no API key involved.
+- "replay": completions from a recording file, served with the latency
+  they originally took, so load tests and benchmarks drive the real fix
+  loop (scheduler, concurrency, patch parsing) without network or API spend.
+
+With AGENT_LLM_RECORDING set, every prompt → completion pair the
+"openai" or "local" provider serves is appended to that file (JSON lines),
+which "replay" then reads; fix cache lookups are skipped while recording
+so that every prompt of a run ends up in the file. Without a usable provider the agent falls back
+to rule-based fixes.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional, Protocol
+
+import httpx
+
+try:
+    from openai import AsyncOpenAI
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+
+LLM_PROVIDER = os.getenv("AGENT_LLM_PROVIDER", "openai")
+LLM_MODEL = os.getenv("AGENT_LLM_MODEL", "")  # Default: gpt-4o-mini (openai), llama3.1 (local)
+LLM_BASE_URL = os.getenv("AGENT_LLM_BASE_URL", "http://localhost:11434/v1")
+LLM_RECORDING = os.getenv("AGENT_LLM_RECORDING", "")
+LLM_REPLAY_LATENCY = os.getenv("AGENT_LLM_REPLAY_LATENCY", "1") != "0"
+LOCAL_TIMEOUT = 300  # Local models on CPU can take minutes per completion
+TEMPERATURE = 0.1
+
+
+class ProviderError(Exception):
+    """A completion could not be produced. `status_code` is set for HTTP errors (retryable ones are retried)."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FixProvider(Protocol):
+    """A source of completions for repair prompts."""
+
+    model: str
+
+    async def complete(self, prompt: str, max_tokens: int) -> str:
+        ...
+
+
+class OpenAIProvider(FixProvider):
+    def __init__(self, api_key: str, model: str = ""):
+        self.model = model or "gpt-4o-mini"
+        self.client = AsyncOpenAI(api_key=api_key)
+
+    async def complete(self, prompt: str, max_tokens: int) -> str:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=TEMPERATURE,
+            max_tokens=max_tokens,
+        )
+        return response.choices[0].message.content or ""
+
+
+class LocalProvider(FixProvider):
+    """OpenAI-compatible `/chat/completions` endpoint, e.g. Ollama's `/v1`."""
+
+    def __init__(self, base_url: str = LLM_BASE_URL, model: str = "", timeout: float = LOCAL_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.model = model or "llama3.1"
+        self.timeout = timeout
+
+    async def complete(self, prompt: str, max_tokens: int) -> str:
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": TEMPERATURE,
+            "max_tokens": max_tokens,
+            "stream": False,
+        }
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.post(f"{self.base_url}/chat/completions", json=payload)
+        if response.status_code != 200:
+            raise ProviderError(
+                f"{self.base_url} answered {response.status_code}: {response.text[:200]}",
+                response.status_code,
+            )
+        try:
+            return response.json()["choices"][0]["message"]["content"] or ""
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise ProviderError(f"unexpected response from {self.base_url}: {e}") from e
+
+
+class Recording:
+    """Append-only JSON-lines file of prompt → completion pairs; the last one recorded for a prompt wins."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = (entry["completion"], float(entry.get("latency", 0)))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            pass
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(prompt: str) -> str:
+        return hashlib.sha256(prompt.encode()).hexdigest()
+
+    def get(self, prompt: str) -> Optional[tuple[str, float]]:
+        """(completion, seconds it took) recorded for the prompt."""
+        return self._entries.get(self.key(prompt))
+
+    def add(self, prompt: str, completion: str, latency: float, model: str) -> None:
+        key = self.key(prompt)
+        line = json.dumps({
+            "key": key, "model": model, "latency": round(latency, 3),
+            "prompt": prompt, "completion": completion,
+        })
+        with self._lock:
+            self._entries[key] = (completion, latency)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+
+class RecordingProvider(FixProvider):
+    """Passes prompts to another provider and records what it answered."""
+
+    def __init__(self, inner: FixProvider, recording: Recording):
+        self.inner = inner
+        self.model = inner.model
+        self.recording = recording
+
+    async def complete(self, prompt: str, max_tokens: int) -> str:
+        start = time.perf_counter()
+        completion = await self.inner.complete(prompt, max_tokens)
+        self.recording.add(prompt, completion, time.perf_counter() - start, self.model)
+        return completion
+
+
+class ReplayProvider(FixProvider):
+    """Serves recorded completions; a prompt that was never recorded is an error."""
+
+    model = "replay"
+
+    def __init__(self, recording: Recording, latency: bool = LLM_REPLAY_LATENCY):
+        self.recording = recording
+        self.latency = latency
+
+    async def complete(self, prompt: str, max_tokens: int) -> str:
+        entry = self.recording.get(prompt)
+        if entry is None:
+            raise ProviderError(f"no completion recorded for this prompt in {self.recording.path}")
+        completion, seconds = entry
+        if self.latency and seconds > 0:
+            await asyncio.sleep(seconds)
+        return completion
+
+
+def _openai() -> Optional[FixProvider]:
+    if not OPENAI_AVAILABLE:
+        print("[LLM] openai package not installed, using rule-based fixes only")
+        return None
+    if not os.getenv("OPENAI_API_KEY"):
+        print("[LLM] OPENAI_API_KEY not set, using rule-based fixes only")
+        return None
+    return OpenAIProvider(os.environ["OPENAI_API_KEY"], LLM_MODEL)
+
+
+def _local() -> Optional[FixProvider]:
+    return LocalProvider(LLM_BASE_URL, LLM_MODEL)
+
+
+def _replay() -> Optional[FixProvider]:
+    if not LLM_RECORDING:
+        print("[LLM] AGENT_LLM_PROVIDER=replay needs AGENT_LLM_RECORDING, using rule-based fixes only")
+        return None
+    recording = Recording(LLM_RECORDING)
+    print(f"[LLM] Replaying {len(recording)} recorded completions from {LLM_RECORDING}")
+    return ReplayProvider(recording)
+
+
+# Provider name → factory (None when the provider cannot be used here)
+PROVIDERS: dict[str, Callable[[], Optional[FixProvider]]] = {
+    "openai": _openai,
+    "local": _local,
+    "replay": _replay,
+}
+
+_default_provider: Optional[FixProvider] = None
+_default_resolved = False
+
+
+def create_provider(name: str = LLM_PROVIDER) -> Optional[FixProvider]:
+    """The named provider (recording if AGENT_LLM_RECORDING is set), or None for rule-based fixes only."""
+    factory = PROVIDERS.get(name)
+    if factory is None:
+        print(f"[LLM] Unknown provider {name!r}, using rule-based fixes only")
+        return None
+    provider = factory()
+    if provider is not None and LLM_RECORDING and not isinstance(provider, ReplayProvider):
+        print(f"[LLM] Recording completions to {LLM_RECORDING}")
+        provider = RecordingProvider(provider, Recording(LLM_RECORDING))
+    return provider
+
+
+def get_provider() -> Optional[FixProvider]:
+    """Process-wide provider from the environment, created on first use."""
+    global _default_provider, _default_resolved
+    if not _default_resolved:
+        _default_provider = create_provider()
+        _default_resolved = True
+    return _default_provider
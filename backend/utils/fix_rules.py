@@ -0,0 +1,1003 @@
+"""
+Rule-Based Fixes
+================
+Deterministic fixes for failures that do not need a model: flake8 / pylint
+/ eslint findings (and those of the basic scan), unused imports, missing
+imports of standard-library names, a missing colon, brackets left open at
+the end of a file, stray `console.log` calls, `var`, ...
+
+Python sources are inspected with `ast` and `tokenize`; JavaScript and
+TypeScript with a small tokenizer that knows comments, strings, template
+and regex literals, which is enough to edit single statements safely. Each
+rule answers with line-range hunks against the file as it is (the format
+of LLM patches, see utils/line_patch.py), so the fixes of several failures
+in one file combine, and a rule whose edit would overlap another's is left
+to the LLM. `FixGeneratorAgent` runs the rules before asking the LLM.
+"""
+
+import ast
+import io
+import re
+import sys
+import tokenize
+from dataclasses import dataclass, field
+from typing import Callable, Collection, NamedTuple, Optional
+
+from utils.line_patch import Hunk, apply_line_patch
+
+
+PYTHON_EXTENSIONS = (".py", ".pyi")
+JS_EXTENSIONS = (".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".mts", ".cts")
+
+# Names that are almost always an import away, beyond the stdlib module names themselves
+KNOWN_IMPORTS = {
+    **{name: "typing" for name in (
+        "Any", "Callable", "ClassVar", "Dict", "Generator", "Iterable", "Iterator", "List",
+        "Literal", "Mapping", "NamedTuple", "Optional", "Sequence", "Set", "Tuple", "Type",
+        "TypeVar", "Union", "cast",
+    )},
+    **{name: "collections" for name in ("Counter", "OrderedDict", "defaultdict", "deque", "namedtuple")},
+    **{name: "functools" for name in ("lru_cache", "partial", "reduce", "wraps")},
+    **{name: "datetime" for name in ("date", "timedelta", "timezone")},
+    "dataclass": "dataclasses", "field": "dataclasses", "Path": "pathlib",
+    "Enum": "enum", "ABC": "abc", "abstractmethod": "abc", "contextmanager": "contextlib",
+    "deepcopy": "copy", "Decimal": "decimal", "Fraction": "fractions", "pprint": "pprint",
+}
+# Stdlib modules too easily confused with an undefined local of the same name
+AMBIGUOUS_MODULES = {"antigravity", "code", "cmd", "keyword", "parser", "site", "symbol",
+                     "test", "this", "token", "turtle"}
+STDLIB_MODULES = {
+    name for name in getattr(sys, "stdlib_module_names", ())
+    if not name.startswith("_") and name not in AMBIGUOUS_MODULES
+}
+
+
+@dataclass
+class RuleFixes:
+    """Outcome of running the rules over the failures of one file."""
+
+    hunks: list[Hunk] = field(default_factory=list)
+    rules: list[str] = field(default_factory=list)  # Rule applied, per fixed failure
+    unresolved: list[int] = field(default_factory=list)  # Indexes of failures no rule fixed
+
+
+class JsToken(NamedTuple):
+    kind: str  # name | number | string | template | regex | comment | punct | other
+    text: str
+    line: int
+    col: int
+
+
+class Source:
+    """One file's content with its parse trees / token streams, built on first use."""
+
+    def __init__(self, path: str, content: str):
+        self.path = path
+        self.content = content
+        self.lines = content.splitlines()
+        if path.endswith(PYTHON_EXTENSIONS):
+            self.language = "python"
+        elif path.endswith(JS_EXTENSIONS):
+            self.language = "js"
+        else:
+            self.language = ""
+        self._tree: Optional[ast.Module] = None
+        self._tree_parsed = False
+        self._py_tokens: Optional[list[tokenize.TokenInfo]] = None
+        self._py_tokenized = False
+        self._js_tokens: Optional[list[JsToken]] = None
+
+    def line(self, number: int) -> Optional[str]:
+        return self.lines[number - 1] if 0 < number <= len(self.lines) else None
+
+    @property
+    def tree(self) -> Optional[ast.Module]:
+        if not self._tree_parsed:
+            self._tree_parsed = True
+            try:
+                self._tree = ast.parse(self.content)
+            except (SyntaxError, ValueError):
+                self._tree = None
+        return self._tree
+
+    @property
+    def py_tokens(self) -> Optional[list[tokenize.TokenInfo]]:
+        if not self._py_tokenized:
+            self._py_tokenized = True
+            try:
+                self._py_tokens = list(tokenize.generate_tokens(io.StringIO(self.content).readline))
+            except (tokenize.TokenError, SyntaxError):
+                self._py_tokens = None
+        return self._py_tokens
+
+    @property
+    def js_tokens(self) -> list[JsToken]:
+        if self._js_tokens is None:
+            self._js_tokens = _js_tokenize(self.content)
+        return self._js_tokens
+
+
+RuleFn = Callable[[Source, int, str], Optional[list[Hunk]]]
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    languages: tuple[str, ...]
+    trigger: re.Pattern  # Searched in the failure's error context
+    fix: RuleFn  # (source, failing line, error context) -> hunks, or None if it does not apply
+
+
+def apply_rules(
+    content: str, path: str, failures: list[tuple[int, str]], skip: Collection[str] = ()
+) -> RuleFixes:
+    """
+    Fix what the rules can of `failures` ((line, error context) pairs) in one
+    file. Rules named in `skip` are not tried.
+    """
+    source = Source(path, content)
+    result = RuleFixes()
+    for index, (line, context) in enumerate(failures):
+        for rule in RULES:
+            if source.language not in rule.languages or rule.name in skip:
+                continue
+            if not rule.trigger.search(context):
+                continue
+            try:
+                hunks = rule.fix(source, line, context)
+            except Exception as e:  # A rule bug must never cost the fix its LLM attempt
+                print(f"[Rules] {rule.name} failed on {path}:{line}: {type(e).__name__}: {e}")
+                continue
+            merged = _merge_hunks(result.hunks, hunks) if hunks else None
+            if merged is not None:
+                result.hunks = merged
+                result.rules.append(rule.name)
+                break
+        else:
+            result.unresolved.append(index)
+    return result
+
+
+def _merge_hunks(existing: list[Hunk], new: list[Hunk]) -> Optional[list[Hunk]]:
+    """Both sets of hunks, or None if a new one overlaps a different existing one."""
+    merged = list(existing)
+    for hunk in new:
+        if hunk in merged:
+            continue  # The same edit, found for another failure
+        start, end, _ = hunk
+        if any(start <= other_end and other_start <= end for other_start, other_end, _ in merged):
+            return None
+        merged.append(hunk)
+    return sorted(merged)
+
+
+def _replace_line(source: Source, number: int, new: str) -> Optional[list[Hunk]]:
+    old = source.line(number)
+    if old is None or old == new:
+        return None
+    return [(number, number, [new])]
+
+
+def _edit_line(source: Source, number: int, edits: list[tuple[int, int, str]]) -> Optional[list[Hunk]]:
+    """Apply (start col, end col, text) edits to one line."""
+    text = source.line(number)
+    if text is None or not edits:
+        return None
+    for start, end, new in sorted(edits, reverse=True):
+        text = text[:start] + new + text[end:]
+    return _replace_line(source, number, text)
+
+
+def _indent(text: str) -> str:
+    return text[:len(text) - len(text.lstrip())]
+
+
+def _compiles(source: Source, hunks: list[Hunk]) -> bool:
+    try:
+        compile(apply_line_patch(source.content, hunks), source.path, "exec", dont_inherit=True)
+        return True
+    except (SyntaxError, ValueError):
+        return False
+
+
+# ── Both languages ──────────────────────────────────────────────────────────
+
+def _trailing_whitespace(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    text = source.line(line)
+    return _replace_line(source, line, text.rstrip()) if text is not None else None
+
+
+def _blank_lines_at_eof(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    last = len(source.lines)
+    while last and not source.lines[last - 1].strip():
+        last -= 1
+    if not last or last == len(source.lines):
+        return None
+    return [(last, len(source.lines), [source.lines[last - 1]])]
+
+
+_PY_STRING = re.compile(
+    r"""(?P<comment>\#[^\n]*)"""
+    r"""|(?P<string>'''.*?'''|\"\"\".*?\"\"\"|'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*")"""
+    r"""|(?P<bracket>[()\[\]{}])|(?P<quote>['"])""",
+    re.S,
+)
+_CLOSERS = {"(": ")", "[": "]", "{": "}"}
+
+
+def _open_brackets(source: Source) -> Optional[list[tuple[str, int]]]:
+    """Brackets still open at the end of the file, as (bracket, line); None if any closer mismatched."""
+    stack: list[tuple[str, int]] = []
+    if source.language == "python":
+        brackets = []
+        for match in _PY_STRING.finditer(source.content):
+            if match.lastgroup == "quote":
+                return None  # Unterminated string: the brackets cannot be trusted
+            if match.lastgroup == "bracket":
+                brackets.append((match.group(), source.content.count("\n", 0, match.start()) + 1))
+    else:
+        brackets = [(t.text, t.line) for t in source.js_tokens if t.kind == "punct" and t.text in "()[]{}"]
+    for bracket, line in brackets:
+        if bracket in _CLOSERS:
+            stack.append((bracket, line))
+        elif not stack or _CLOSERS[stack.pop()[0]] != bracket:
+            return None
+    return stack
+
+
+def _unclosed_brackets(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    stack = _open_brackets(source)
+    if not stack:
+        return None
+    last = len(source.lines)
+    while last and not source.lines[last - 1].strip():
+        last -= 1
+    if not last:
+        return None
+    closers = "".join(_CLOSERS[bracket] for bracket, _ in reversed(stack))
+
+    if source.language == "python":
+        # Close at the end of the first line (from the opener on) where the file then compiles
+        first = stack[0][1]
+        for number in [*range(first, min(first + 20, last)), last]:
+            text = source.lines[number - 1]
+            if not text.strip() or "#" in text:
+                continue
+            hunks = [(number, number, [text.rstrip() + closers])]
+            if _compiles(source, hunks):
+                return hunks
+        return None
+
+    # JS: only brackets missing at the very end, one closing line per opening line
+    if line < last and not re.search(r"end of (?:input|file)", context, re.I):
+        return None
+    closing, group, group_line = [], "", None
+    for bracket, opened in reversed(stack):
+        if group and opened != group_line:
+            closing.append(_indent(source.lines[group_line - 1]) + group)
+            group = ""
+        group, group_line = group + _CLOSERS[bracket], opened
+    closing.append(_indent(source.lines[group_line - 1]) + group)
+    return [(last, last, [source.lines[last - 1], *closing])]
+
+
+# ── Python ──────────────────────────────────────────────────────────────────
+
+def _row_tokens(source: Source, line: int) -> Optional[list[tokenize.TokenInfo]]:
+    tokens = source.py_tokens
+    if tokens is None:
+        return None
+    return [t for t in tokens if t.start[0] == line and t.type not in (tokenize.NL, tokenize.NEWLINE,
+                                                                         tokenize.INDENT, tokenize.DEDENT)]
+
+
+def _tabs(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    """Tab indentation, expanded throughout the file (a partial fix leaves it inconsistent)."""
+    hunks = []
+    for number, text in enumerate(source.lines, 1):
+        indent = _indent(text)
+        if "\t" in indent:
+            hunks.append((number, number, [indent.expandtabs(4) + text[len(indent):]]))
+    return hunks or None
+
+
+_EXPECTED_BLANK = re.compile(r"expected (\d+) blank lines?\b.*?found (\d+)")
+_TOO_MANY_BLANK = re.compile(r"too many blank lines")
+
+
+def _blank_lines(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    text = source.line(line)
+    if text is None:
+        return None
+    blanks = 0
+    while line - blanks > 1 and not source.lines[line - blanks - 2].strip():
+        blanks += 1
+
+    expected = _EXPECTED_BLANK.search(context)
+    if expected:
+        # Blank lines go above the comments attached to the definition
+        top = line
+        while top > 1 and source.lines[top - 2].lstrip().startswith("#"):
+            top -= 1
+        before = 0
+        while top - before > 1 and not source.lines[top - before - 2].strip():
+            before += 1
+        missing = int(expected.group(1)) - before
+        if missing <= 0:
+            return None
+        return [(top, top, [""] * missing + [source.lines[top - 1]])]
+
+    if "E304" in context or "after function decorator" in context:
+        allowed = 0
+    elif _TOO_MANY_BLANK.search(context):
+        allowed = 1 if _indent(text) else 2
+    else:
+        return None
+    if blanks <= allowed:
+        return None
+    return [(line - blanks, line - 1, [""] * allowed)]
+
+
+_ASSIGN_COMPARE_OPS = {
+    "=", "==", "!=", "<", ">", "<=", ">=", "->", ":=", "+=", "-=", "*=", "/=", "//=",
+    "%=", "**=", "&=", "|=", "^=", ">>=", "<<=", "@=",
+}
+
+
+def _operator_spacing(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    tokens = source.py_tokens
+    if tokens is None:
+        return None
+    depth, edits = 0, []
+    for i, token in enumerate(tokens):
+        if token.start[0] > line:
+            break
+        if token.type == tokenize.OP and token.string in "([{":
+            depth += 1
+        elif token.type == tokenize.OP and token.string in ")]}":
+            depth -= 1
+        if token.start[0] != line or token.type != tokenize.OP or token.string not in _ASSIGN_COMPARE_OPS:
+            continue
+        if token.string == "=" and depth:
+            continue  # Keyword argument / default: no spaces (E251)
+        before, after = tokens[i - 1], tokens[i + 1]
+        if before.end == token.start and before.type != tokenize.INDENT:
+            edits.append((token.start[1], token.start[1], " "))
+        if after.start == token.end and after.type not in (tokenize.NEWLINE, tokenize.NL):
+            edits.append((token.end[1], token.end[1], " "))
+    return _edit_line(source, line, edits)
+
+
+def _comma_spacing(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    after = re.search(r"after '(.)'", context)
+    chars = {after.group(1)} & {",", ";"} if after else {",", ";"}
+    tokens = _row_tokens(source, line)
+    if not tokens or not chars:
+        return None
+    edits = []
+    for token, following in zip(tokens, tokens[1:]):
+        if (token.type == tokenize.OP and token.string in chars and following.start == token.end
+                and following.string not in (")", "]", "}")):
+            edits.append((token.end[1], token.end[1], " "))
+    return _edit_line(source, line, edits)
+
+
+def _comment_style(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    tokens = _row_tokens(source, line)
+    if not tokens or tokens[-1].type != tokenize.COMMENT:
+        return None
+    comment = tokens[-1]
+    edits = []
+    body = comment.string.lstrip("#")
+    shebang = line == 1 and comment.string.startswith("#!")
+    if body.strip() and not shebang and not comment.string.startswith("#:"):
+        styled = "# " + body.lstrip()
+        if styled != comment.string:
+            edits.append((comment.start[1], comment.end[1], styled))
+    if len(tokens) > 1:  # Inline comment: two spaces before it
+        gap = comment.start[1] - tokens[-2].end[1]
+        if tokens[-2].end[0] == line and gap < 2:
+            edits.append((tokens[-2].end[1], comment.start[1], "  "))
+    return _edit_line(source, line, edits)
+
+
+def _none_comparison(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    tokens = _row_tokens(source, line)
+    if not tokens:
+        return None
+    text = source.line(line)
+    edits = []
+    for i, token in enumerate(tokens):
+        if token.string not in ("==", "!=") or token.type != tokenize.OP:
+            continue
+        neighbours = tokens[i - 1:i] + tokens[i + 1:i + 2]
+        if not any(t.string == "None" for t in neighbours):
+            continue
+        start, end = token.start[1], token.end[1]
+        new = "is" if token.string == "==" else "is not"
+        new = ("" if text[start - 1:start] == " " else " ") + new + ("" if text[end:end + 1] == " " else " ")
+        edits.append((start, end, new))
+    return _edit_line(source, line, edits)
+
+
+def _trailing_semicolon(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    tokens = [t for t in _row_tokens(source, line) or [] if t.type != tokenize.COMMENT]
+    if not tokens or tokens[-1].string != ";":
+        return None
+    text = source.line(line)
+    start = tokens[-1].start[1]
+    return _edit_line(source, line, [(len(text[:start].rstrip()), tokens[-1].end[1], "")])
+
+
+def _import_nodes(source: Source, line: int) -> list[ast.stmt]:
+    tree = source.tree
+    if tree is None:
+        return []
+    return [
+        node for node in ast.walk(tree)
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+        and node.lineno <= line <= (node.end_lineno or node.lineno)
+    ]
+
+
+def _whole_statement(source: Source, node: ast.stmt) -> Optional[str]:
+    """Trailing comment of a statement that owns its lines ("" if none); None if it shares them."""
+    first, last = source.line(node.lineno), source.line(node.end_lineno or node.lineno)
+    if first is None or last is None or first[:node.col_offset].strip():
+        return None
+    rest = last[node.end_col_offset:].strip()
+    if rest and not rest.startswith("#"):
+        return None
+    return "  " + rest if rest else ""
+
+
+def _render_import(node: ast.stmt, names: list[ast.alias], indent: str, multiline: bool) -> list[str]:
+    parts = [alias.name + (f" as {alias.asname}" if alias.asname else "") for alias in names]
+    if isinstance(node, ast.Import):
+        return [f"{indent}import {', '.join(parts)}"]
+    head = f"{indent}from {'.' * node.level}{node.module or ''} import "
+    if multiline:
+        return [head + "(", *(f"{indent}    {part}," for part in parts), f"{indent})"]
+    return [head + ", ".join(parts)]
+
+
+def _remove_statement(source: Source, node: ast.stmt, parents: dict) -> list[Hunk]:
+    start, end = node.lineno, node.end_lineno or node.lineno
+    parent = parents.get(node)
+    siblings = next(
+        (body for name in ("body", "orelse", "finalbody", "handlers")
+         if isinstance(body := getattr(parent, name, None), list) and node in body),
+        [],
+    )
+    if len(siblings) == 1:  # Keep the block non-empty
+        return [(start, end, [_indent(source.lines[start - 1]) + "pass"])]
+    return [(start, end, [])]
+
+
+_F401 = re.compile(r"'([\w.]+(?: as \w+)?)' imported but unused")
+_W0611 = re.compile(r"Unused (?:import )?([\w.]+)(?: imported from ([\w.]+))?(?: as (\w+))?")
+
+
+def _unused_import(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    if source.path.endswith("__init__.py"):
+        return None  # Imports there are the package's re-exports
+    flake8, pylint = _F401.search(context), _W0611.search(context)
+    if not (flake8 or pylint):
+        return None
+
+    def matches(node: ast.stmt, alias: ast.alias) -> bool:
+        module = "." * node.level + (node.module or "") if isinstance(node, ast.ImportFrom) else None
+        if flake8:
+            if module is None:
+                full = alias.name
+            else:
+                full = module + ("." if node.module else "") + alias.name
+            described = full + (f" as {alias.asname}" if alias.asname else "")
+            return flake8.group(1) in (described, full.lstrip("."))
+        name, origin, asname = pylint.groups()
+        if origin is not None:
+            return module is not None and module.lstrip(".") == origin.lstrip(".") and alias.name == name
+        return alias.name == name and (asname is None or alias.asname == asname)
+
+    tree = source.tree
+    for node in _import_nodes(source, line):
+        if isinstance(node, ast.ImportFrom) and node.module == "__future__":
+            continue
+        unused = [alias for alias in node.names if matches(node, alias)]
+        if len(unused) != 1 or unused[0].name == "*":
+            continue
+        bound = unused[0].asname or unused[0].name.split(".")[0]
+        if _exported(tree, bound):
+            return None
+        comment = _whole_statement(source, node)
+        if comment is None:
+            return None
+        kept = [alias for alias in node.names if alias is not unused[0]]
+        start, end = node.lineno, node.end_lineno or node.lineno
+        if not kept:
+            parents = {child: parent for parent in ast.walk(tree) for child in ast.iter_child_nodes(parent)}
+            return _remove_statement(source, node, parents)
+        lines = _render_import(node, kept, _indent(source.lines[start - 1]), multiline=end > start)
+        lines[-1] += comment
+        return [(start, end, lines)]
+    return None
+
+
+def _exported(tree: ast.Module, name: str) -> bool:
+    """Whether `name` is listed in the module's `__all__`."""
+    for node in tree.body:
+        if isinstance(node, (ast.Assign, ast.AugAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            if any(isinstance(t, ast.Name) and t.id == "__all__" for t in targets):
+                if any(isinstance(c, ast.Constant) and c.value == name for c in ast.walk(node.value)):
+                    return True
+    return False
+
+
+def _multiple_imports(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    for node in _import_nodes(source, line):
+        if not isinstance(node, ast.Import) or len(node.names) < 2 or node.end_lineno != node.lineno:
+            continue
+        comment = _whole_statement(source, node)
+        if comment is None:
+            return None
+        indent = _indent(source.lines[node.lineno - 1])
+        lines = [_render_import(node, [alias], indent, False)[0] for alias in node.names]
+        lines[0] += comment
+        return [(node.lineno, node.lineno, lines)]
+    return None
+
+
+_UNDEFINED_NAME = re.compile(
+    r"undefined name '(\w+)'|name '(\w+)' is not defined|Undefined variable '(\w+)'"
+)
+
+
+def _missing_import(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    match = _UNDEFINED_NAME.search(context)
+    tree = source.tree
+    if not match or tree is None:
+        return None
+    name = next(group for group in match.groups() if group)
+    if name in STDLIB_MODULES:
+        statement = f"import {name}"
+    elif name in KNOWN_IMPORTS:
+        statement = f"from {KNOWN_IMPORTS[name]} import {name}"
+    else:
+        return None
+    if _binds(tree, name):
+        return None  # Defined somewhere in the file: a scoping problem, not a missing import
+
+    if not source.lines:
+        return None
+
+    # After the leading imports, else after the docstring, else at the top
+    after = 0
+    for index, node in enumerate(tree.body):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            after = node.end_lineno or node.lineno
+        elif index == 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) \
+                and isinstance(node.value.value, str):
+            after = node.end_lineno or node.lineno
+        else:
+            break
+    if not after:
+        while after < len(source.lines) and source.lines[after].startswith("#"):
+            after += 1  # Shebang, encoding and licence comments stay first
+    if after == 0:
+        return [(1, 1, [statement, source.lines[0]])]
+    return [(after, after, [source.lines[after - 1], statement])]
+
+
+def _binds(tree: ast.Module, name: str) -> bool:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id == name and not isinstance(node.ctx, ast.Load):
+            return True
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node.name == name:
+            return True
+        if isinstance(node, ast.arg) and node.arg == name:
+            return True
+        if isinstance(node, ast.alias) and (node.asname or node.name.split(".")[0]) == name:
+            return True
+    return False
+
+
+_COMPOUND_HEADER = re.compile(
+    r"^\s*(?:if|elif|else|for|while|def|class|try|except|finally|with|async\s+(?:def|for|with))\b"
+)
+
+
+def _missing_colon(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    text = source.line(line)
+    if text is None or "#" in text or not _COMPOUND_HEADER.match(text) or text.rstrip().endswith(":"):
+        return None
+    hunks = [(line, line, [text.rstrip() + ":"])]
+    return hunks if _compiles(source, hunks) else None
+
+
+_RELATIVE_IMPORT = re.compile(r"^(\s*)from \.(?=\w)")
+
+
+def _relative_import(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    """`from .x import y` run as a top-level module: import x absolutely (every such line)."""
+    hunks = [
+        (number, number, [_RELATIVE_IMPORT.sub(r"\1from ", text)])
+        for number, text in enumerate(source.lines, 1) if _RELATIVE_IMPORT.match(text)
+    ]
+    return hunks or None
+
+
+# ── JavaScript / TypeScript ─────────────────────────────────────────────────
+
+_JS_TOKEN = re.compile(
+    r"(?P<ws>\s+)"
+    r"|(?P<comment>//[^\n]*|/\*.*?\*/)"
+    r"""|(?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')"""
+    r"|(?P<template>`(?:\\.|[^`\\])*`)"
+    r"|(?P<name>[A-Za-z_$][\w$]*)"
+    r"|(?P<number>\d[\w.]*|\.\d\w*)"
+    r"|(?P<punct>>>>=|\.\.\.|===|!==|\*\*=|<<=|>>=|>>>|=>|==|!=|<=|>=|&&|\|\||\?\?|\?\.|\+\+|--"
+    r"|[-+*/%&|^]=|<<|>>|\*\*|[{}()\[\];,.<>+\-*/%&|^!~?:=@#])"
+    r"|(?P<other>.)",
+    re.S,
+)
+_JS_REGEX = re.compile(r"/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[A-Za-z]*")
+# After these, "/" starts a regex literal rather than a division
+_JS_REGEX_AFTER_NAMES = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete",
+                         "void", "throw", "instanceof", "yield", "await"}
+
+
+def _js_tokenize(content: str) -> list[JsToken]:
+    """Significant tokens (comments included, whitespace not) with their 1-based line and column."""
+    tokens: list[JsToken] = []
+    pos, line, line_start = 0, 1, 0
+    while pos < len(content):
+        previous = next((t for t in reversed(tokens) if t.kind != "comment"), None)
+        regex = None
+        if content[pos] == "/" and content[pos:pos + 2] not in ("//", "/*") and (
+            previous is None
+            or previous.kind == "punct" and previous.text not in (")", "]", "}")
+            or previous.kind == "name" and previous.text in _JS_REGEX_AFTER_NAMES
+        ):
+            regex = _JS_REGEX.match(content, pos)
+        match = regex or _JS_TOKEN.match(content, pos)
+        kind = "regex" if regex else match.lastgroup
+        text = match.group()
+        if kind != "ws":
+            tokens.append(JsToken(kind, text, line, pos - line_start))
+        newlines = text.count("\n")
+        if newlines:
+            line += newlines
+            line_start = pos + text.rfind("\n") + 1
+        pos = match.end()
+    return tokens
+
+
+def _js_line_tokens(source: Source, line: int) -> list[tuple[int, JsToken]]:
+    return [(i, t) for i, t in enumerate(source.js_tokens) if t.line == line]
+
+
+def _js_pairs(code: list[JsToken]) -> Optional[dict[int, int]]:
+    """Index of each bracket's partner (both ways), or None if the brackets do not balance."""
+    pairs, stack = {}, []
+    for i, token in enumerate(code):
+        if token.kind != "punct":
+            continue
+        if token.text in _CLOSERS:
+            stack.append(i)
+        elif token.text in ")]}":
+            if not stack or _CLOSERS[code[stack[-1]].text] != token.text:
+                return None
+            opened = stack.pop()
+            pairs[opened], pairs[i] = i, opened
+    return None if stack else pairs
+
+
+def _js_block(code: list[JsToken], pairs: dict[int, int], brace: int) -> tuple[str, int]:
+    """What the `{` at `brace` opens (function | loop | switch | block), and where its head starts."""
+    before = code[brace - 1] if brace else None
+    if before is None:
+        return "block", brace
+    if before.text == "=>":
+        params = brace - 2
+        if params >= 0 and code[params].text == ")":
+            params = pairs[params]
+        return "function", max(params, 0)
+    if before.text == "do":
+        return "loop", brace - 1
+    if before.text == ")":
+        head = pairs[brace - 1]
+        keyword = code[head - 1] if head else None
+        if keyword is not None and keyword.text in ("for", "while"):
+            return "loop", head - 1
+        if keyword is not None and keyword.text == "switch":
+            return "switch", head - 1
+        if keyword is not None and keyword.kind == "name" and keyword.text not in ("if", "catch", "with"):
+            return "function", head  # function f(...), function(...), method(...)
+    return "block", brace
+
+
+def _js_mentions(token: JsToken, name: str) -> bool:
+    if token.kind == "template":
+        return re.search(rf"(?<![\w$]){re.escape(name)}(?![\w$])", token.text) is not None
+    return token.kind == "name" and token.text == name
+
+
+def _var_declarators(code: list[JsToken], pairs: dict[int, int], var: int) -> Optional[list[tuple[int, bool]]]:
+    """(name index, initialized) of each plain `name [= init]` declarator of the `var` at `var`."""
+    declarators, i = [], var + 1
+    while i < len(code) and code[i].kind == "name":
+        start = i
+        i += 1
+        initialized = i < len(code) and code[i].text == "="
+        if initialized:
+            i += 1
+            while i < len(code) and code[i].text not in (",", ";", ")", "}"):
+                if code[i].line != code[i - 1].line and code[i - 1].text not in ("=", ",") \
+                        and code[i - 1].kind != "punct" and code[i].kind != "punct":
+                    break  # Next statement, separated by a line break only
+                i = pairs.get(i, i) + 1 if code[i].text in _CLOSERS else i + 1
+        declarators.append((start, initialized))
+        if i < len(code) and code[i].text == ",":
+            i += 1
+        else:
+            return declarators
+    return None  # Destructuring, or not a declaration we understand
+
+
+def _let_safe(code: list[JsToken], pairs: dict[int, int], var: int, at: int, initialized: bool) -> bool:
+    """
+    Whether the var-declared name at `at` keeps its meaning as a `let`: it is
+    declared once in its function, not used before its declaration or outside
+    the declaring block, and not captured per-iteration differently in a loop.
+    """
+    name = code[at].text
+    enclosing = sorted(
+        (brace, pairs[brace]) for brace in pairs
+        if code[brace].text == "{" and brace < var < pairs[brace]
+    )
+    block_start, block_end = enclosing[-1] if enclosing else (0, len(code) - 1)
+    scope_start, scope_end = 0, len(code) - 1
+    in_loop = False
+    for brace, end in reversed(enclosing):
+        kind, head = _js_block(code, pairs, brace)
+        if kind == "switch" and (brace, end) == (block_start, block_end):
+            return False  # Cases share the block but may skip the initialization
+        if kind == "loop":
+            in_loop = True
+        if kind == "function":
+            scope_start, scope_end = head, end
+            break
+    if in_loop and not initialized:
+        return False  # A var keeps its value across iterations, a let starts undefined
+
+    for i in range(scope_start, scope_end + 1):
+        if i == at or not _js_mentions(code[i], name):
+            continue
+        if i and code[i - 1].text in (".", "?."):
+            continue  # Property access
+        if i < at or i > block_end:
+            return False
+        previous, following = code[i - 1].text, code[i + 1].text if i + 1 < len(code) else ""
+        if previous in ("var", "let", "const", "function", "class") or \
+                previous == "," and following in ("=", ",", ";"):
+            return False  # Declared again
+    if in_loop and any(code[i].text in ("function", "=>") for i in range(var, block_end)):
+        return False  # Closures in a loop would capture one binding per iteration
+    return True
+
+
+def _no_var(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    """`var` -> `let`, only where ESLint's own fixer would consider it safe."""
+    code = [t for t in source.js_tokens if t.kind != "comment"]
+    pairs = _js_pairs(code)
+    if pairs is None:
+        return None
+    for i, token in enumerate(code):
+        if token.line != line or token.kind != "name" or token.text != "var":
+            continue
+        if i and code[i - 1].text in (".", "?."):
+            continue
+        if i > 1 and code[i - 1].text == "(" and code[i - 2].text == "for":
+            return None  # Loop variable: closures would see one binding per iteration
+        declarators = _var_declarators(code, pairs, i)
+        if not declarators or not all(_let_safe(code, pairs, i, at, init) for at, init in declarators):
+            return None
+        return _edit_line(source, line, [(token.col, token.col + 3, "let")])
+    return None
+
+
+_CONSOLE_METHODS = {"log", "debug", "info", "trace"}
+
+
+def _no_console(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    """Delete a `console.log(...)` statement that starts on the line and stands on its own."""
+    tokens = [t for t in source.js_tokens if t.kind != "comment"]
+    for i, token in enumerate(tokens):
+        if token.line != line or token.text != "console":
+            continue
+        call = [t.text for t in tokens[i + 1:i + 4]]
+        if len(call) < 3 or call[0] != "." or call[1] not in _CONSOLE_METHODS or call[2] != "(":
+            continue
+        if i and tokens[i - 1].text not in (";", "{", "}"):
+            continue  # Part of an expression, or the body of a braceless if / loop
+        depth, end = 0, None
+        for j in range(i + 3, len(tokens)):
+            depth += {"(": 1, ")": -1}.get(tokens[j].text, 0)
+            if depth == 0:
+                end = j
+                break
+        if end is None:
+            return None
+        if end + 1 < len(tokens) and tokens[end + 1].text == ";":
+            end += 1
+        following = tokens[end + 1] if end + 1 < len(tokens) else None
+        if following is not None and following.line == tokens[end].line and following.text != "}":
+            return None
+        last_line = tokens[end].line + tokens[end].text.count("\n")
+        before = source.lines[line - 1][:token.col]
+        after = source.lines[last_line - 1][tokens[end].col + len(tokens[end].text.split("\n")[-1]):]
+        if not before.strip() and (not after.strip() or after.strip().startswith("//")):
+            return [(line, last_line, [])]
+        if last_line == line:
+            end_col = tokens[end].col + len(tokens[end].text)
+            return _edit_line(source, line, [(token.col, end_col, "")])
+        return None
+    return None
+
+
+# Tokens that continue the previous line's expression rather than start a statement
+_JS_CONTINUATION = {
+    ".", "?.", "(", "[", "=>", "?", ":", "=", "==", "===", "!=", "!==", "<", ">", "<=", ">=",
+    "+", "-", "*", "/", "%", "**", "&", "|", "^", "<<", ">>", ">>>", "&&", "||", "??", ",",
+    "+=", "-=", "*=", "/=", "%=", "&=", "|=", "^=", "**=", "<<=", ">>=", ">>>=",
+}
+
+
+def _missing_semicolon(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    code = [t for t in source.js_tokens if t.kind != "comment"]
+    on_line = [i for i, t in enumerate(code) if t.line == line]
+    if not on_line:
+        return None
+    last = code[on_line[-1]]
+    if "\n" in last.text or last.text in (";", "{", "}", ",") or \
+            last.kind == "punct" and last.text not in (")", "]", "++", "--"):
+        return None
+    following = code[on_line[-1] + 1] if on_line[-1] + 1 < len(code) else None
+    if following is not None and (
+        following.kind in ("template", "regex")
+        or following.text in _JS_CONTINUATION
+        or following.kind == "name" and following.text in ("in", "instanceof", "of")
+    ):
+        return None  # The statement goes on: `foo()` + newline + `.bar()`
+    end = last.col + len(last.text)
+    return _edit_line(source, line, [(end, end, ";")])
+
+
+_UNUSED_JS_NAME = re.compile(r"'([\w$]+)' is (?:defined|assigned a value|declared)")
+
+
+def _unused_js_import(source: Source, line: int, context: str) -> Optional[list[Hunk]]:
+    """Drop an unused binding from a one-line `import` / `require` statement."""
+    match = _UNUSED_JS_NAME.search(context)
+    if not match:
+        return None
+    name = match.group(1)
+    text = source.line(line)
+    code = [t for _, t in _js_line_tokens(source, line) if t.kind != "comment"]
+    if not code or text is None or code[0].col != len(_indent(text)):
+        return None
+    words = [t.text for t in code]
+    semi = ";" if words[-1] == ";" else ""
+    trailing = text[code[-1].col + len(code[-1].text):]
+    indent = _indent(text)
+
+    if words[0] == "import" and "from" in words:
+        from_at = words.index("from")
+        if from_at + 1 >= len(code) or code[from_at + 1].kind != "string":
+            return None
+        default, namespace, named = None, None, None
+        clause = words[1:from_at]
+        if "{" in clause:
+            open_at = clause.index("{")
+            if "}" not in clause:
+                return None
+            named = _specifiers(clause[open_at + 1:clause.index("}")], "as")
+            clause = clause[:open_at] + clause[clause.index("}") + 1:]
+        clause = [w for w in clause if w != ","]
+        if clause[:1] == ["*"] and len(clause) == 3:
+            namespace = clause[2]
+        elif clause:
+            default = clause[0]
+            if clause[1:2] == ["*"]:
+                namespace = clause[3]
+        if default == name:
+            default = None
+        elif namespace == name:
+            namespace = None
+        elif named and any(bound == name for _, bound in named):
+            named = [spec for spec in named if spec[1] != name]
+        else:
+            return None
+        parts = ([default] if default else []) + ([f"* as {namespace}"] if namespace else [])
+        if named:
+            parts.append("{ " + ", ".join(spec for spec, _ in named) + " }")
+        if not parts:
+            return [(line, line, [])]
+        return [(line, line, [f"{indent}import {', '.join(parts)} from {code[from_at + 1].text}{semi}{trailing}"])]
+
+    if words[0] in ("const", "let", "var") and "=" in words:
+        # const <target> = require("<module>")[;]
+        equals = words.index("=")
+        call = code[equals + 1:len(code) - bool(semi)]
+        if [t.text for t in call[:2]] != ["require", "("] or len(call) != 4 \
+                or call[2].kind != "string" or call[3].text != ")":
+            return None
+        target = words[1:equals]
+        if target == [name]:
+            return [(line, line, [])]
+        if target[:1] != ["{"] or target[-1:] != ["}"]:
+            return None
+        named = _specifiers(target[1:-1], ":")
+        if not any(bound == name for _, bound in named):
+            return None
+        named = [spec for spec in named if spec[1] != name]
+        if not named:
+            return [(line, line, [])]
+        specs = ", ".join(spec for spec, _ in named)
+        return [(line, line, [f"{indent}{words[0]} {{ {specs} }} = require({call[2].text}){semi}{trailing}"])]
+    return None
+
+
+def _specifiers(words: list[str], rename: str) -> list[tuple[str, str]]:
+    """`a, b as c` (or `b: c`) -> [(source text, bound name)]."""
+    specs, current = [], []
+    for word in words + [","]:
+        if word != ",":
+            current.append(word)
+        elif current:
+            text = " ".join(current) if rename == "as" else "".join(current).replace(":", ": ")
+            specs.append((text, current[-1]))
+            current = []
+    return specs
+
+
+RULES = [
+    Rule("trailing-whitespace", ("python", "js"),
+         re.compile(r"\bW29[13]\b|\bC0303\b|trailing whitespace|no-trailing-spaces|Trailing spaces", re.I),
+         _trailing_whitespace),
+    Rule("blank-lines-at-eof", ("python", "js"),
+         re.compile(r"\bW391\b|\bC0305\b|no-multiple-empty-lines|blank line at end of file"),
+         _blank_lines_at_eof),
+    Rule("unclosed-bracket", ("python", "js"),
+         re.compile(r"was never closed|unexpected EOF|Unexpected end of input|end of file|'[)\]}]' expected"),
+         _unclosed_brackets),
+    # Python
+    Rule("tab-indentation", ("python",),
+         re.compile(r"\bW191\b|\bE101\b|TabError|inconsistent use of tabs|IndentationError"),
+         _tabs),
+    Rule("blank-lines", ("python",), re.compile(r"\bE30[1-6]\b"), _blank_lines),
+    Rule("operator-spacing", ("python",), re.compile(r"\bE225\b|missing whitespace around operator"),
+         _operator_spacing),
+    Rule("comma-spacing", ("python",), re.compile(r"\bE231\b"), _comma_spacing),
+    Rule("comment-style", ("python",), re.compile(r"\bE26[1-6]\b"), _comment_style),
+    Rule("none-comparison", ("python",), re.compile(r"\bE711\b|comparison to None|singleton-comparison"),
+         _none_comparison),
+    Rule("trailing-semicolon", ("python",), re.compile(r"\bE703\b|\bW0301\b|unnecessary semicolon", re.I),
+         _trailing_semicolon),
+    Rule("unused-import", ("python",), re.compile(r"\bF401\b|\bW0611\b|imported but unused|Unused import"),
+         _unused_import),
+    Rule("multiple-imports", ("python",), re.compile(r"\bE401\b|\bC0410\b|multiple imports on one line", re.I),
+         _multiple_imports),
+    Rule("missing-import", ("python",), _UNDEFINED_NAME, _missing_import),
+    Rule("missing-colon", ("python",), re.compile(r"expected ':'|invalid syntax|\bE999\b"), _missing_colon),
+    Rule("relative-import", ("python",), re.compile(r"relative import", re.I), _relative_import),
+    # JavaScript / TypeScript
+    Rule("no-var", ("js",), re.compile(r"\bno-var\b|Unexpected var|instead of 'var'"), _no_var),
+    Rule("no-console", ("js",), re.compile(r"\bno-console\b|console\.log|Unexpected console statement"),
+         _no_console),
+    Rule("semicolon", ("js",), re.compile(r"\bsemi\b|Missing semicolon"), _missing_semicolon),
+    Rule("unused-import", ("js",),
+         re.compile(r"no-unused-vars|\bTS6133\b|\bTS6192\b|but never used|never read"),
+         _unused_js_import),
+]
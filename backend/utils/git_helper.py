@@ -1,58 +1,86 @@
 """
 Git Helper Utilities
 ====================
-Cloning repositories and pushing branches using GitPython.
+Cloning repositories (through the local mirror cache) and pushing branches
+via the git CLI.
 """
 
 import os
-import subprocess
+import shutil
 from typing import Optional
 
+from utils.mirror_cache import MIRROR_CACHE_ENABLED, sync_mirror
+from utils.process_runner import run_process
 
-def clone_repo(repo_url: str, work_dir: str, branch_name: str) -> str:
+
+async def clone_repo(repo_url: str, work_dir: str, branch_name: str) -> str:
     """
     Clone the repository into work_dir and create a new branch.
     Returns the path to the cloned repo.
     """
     repo_path = os.path.join(work_dir, "repo")
 
-    # Clone (shallow for speed)
-    result = subprocess.run(
-        ["git", "clone", "--depth=50", repo_url, repo_path],
-        capture_output=True, text=True
-    )
-    if result.returncode != 0:
-        raise RuntimeError(f"git clone failed: {result.stderr}")
+    # Clone from the local mirror when possible (hard-linked, ~1s)
+    cloned = False
+    mirror_path = await sync_mirror(repo_url) if MIRROR_CACHE_ENABLED else None
+    if mirror_path:
+        result = await run_process(["git", "clone", mirror_path, repo_path], timeout=300)
+        if result.ok:
+            await run_process(
+                ["git", "remote", "set-url", "origin", repo_url], cwd=repo_path, timeout=30
+            )
+            cloned = True
+        else:
+            print(f"[Git] Clone from mirror failed, cloning remote: {result.stderr}")
+            shutil.rmtree(repo_path, ignore_errors=True)
+
+    # Fallback: shallow network clone
+    if not cloned:
+        result = await run_process(
+            ["git", "clone", "--depth=50", repo_url, repo_path], timeout=600
+        )
+        if not result.ok:
+            raise RuntimeError(f"git clone failed: {result.stderr}")
 
     # Create and checkout new branch
-    result = subprocess.run(
-        ["git", "checkout", "-b", branch_name],
-        cwd=repo_path, capture_output=True, text=True
+    result = await run_process(
+        ["git", "checkout", "-b", branch_name], cwd=repo_path, timeout=60
     )
-    if result.returncode != 0:
+    if not result.ok:
         raise RuntimeError(f"git checkout failed: {result.stderr}")
 
     print(f"[Git] Cloned to {repo_path}, branch: {branch_name}")
     return repo_path
 
 
-def push_branch(repo_path: str, branch_name: str) -> bool:
+async def push_branch(repo_path: str, branch_name: str) -> bool:
     """Push the branch to origin."""
-    result = subprocess.run(
-        ["git", "push", "-u", "origin", branch_name],
-        cwd=repo_path, capture_output=True, text=True
+    result = await run_process(
+        ["git", "push", "-u", "origin", branch_name], cwd=repo_path, timeout=300
     )
-    if result.returncode != 0:
+    if not result.ok:
         print(f"[Git] Push warning: {result.stderr}")
         return False
     print(f"[Git] ✓ Pushed branch: {branch_name}")
     return True
 
 
-def get_current_commit(repo_path: str) -> Optional[str]:
+async def get_current_commit(repo_path: str) -> Optional[str]:
     """Return the current HEAD commit SHA."""
-    result = subprocess.run(
-        ["git", "rev-parse", "HEAD"],
-        cwd=repo_path, capture_output=True, text=True
+    result = await run_process(["git", "rev-parse", "HEAD"], cwd=repo_path, timeout=30)
+    return result.stdout.strip() if result.ok else None
+
+
+async def changed_files(repo_path: str, since: str, until: str = "HEAD") -> Optional[list[str]]:
+    """
+    Repo-relative paths that differ between two commits (both sides of a
+    rename). None if the diff cannot be computed, e.g. `since` is not in a
+    shallow clone's history.
+    """
+    result = await run_process(
+        ["git", "-c", "core.quotePath=false", "diff", "--name-only", "--no-renames", since, until],
+        cwd=repo_path, timeout=60,
     )
-    return result.stdout.strip() if result.returncode == 0 else None
+    if not result.ok:
+        return None
+    return [path for path in result.stdout.splitlines() if path]
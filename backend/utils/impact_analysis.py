@@ -0,0 +1,151 @@
+"""
+Impact Analysis
+===============
+Selects the tests affected by a fix iteration.
+
+Failed test IDs are read back from the runner output, and a cheap static
+import graph (Python `ast`, relative `import`/`require` for JS/TS) maps each
+modified file to the test files that import it, directly or transitively.
+"""
+
+import ast
+import os
+import re
+from typing import Optional
+
+
+PYTEST_FAILED_LINE = re.compile(r"^(?:FAILED|ERROR) (\S+)", re.MULTILINE)
+PYTEST_VERBOSE_FAILED = re.compile(r"^(\S+::\S+) (?:FAILED|ERROR)", re.MULTILINE)
+JEST_FAILED_FILE = re.compile(r"^\s*FAIL\s+(\S+)", re.MULTILINE)
+JS_IMPORT_PATTERN = re.compile(
+    r"""(?:from\s*|import\s*\(?\s*|require\s*\(\s*)['"](\.{1,2}/[^'"]+)['"]"""
+)
+JS_EXTENSIONS = ["", ".js", ".ts", ".jsx", ".tsx", ".mjs", ".cjs",
+                 "/index.js", "/index.ts", "/index.jsx", "/index.tsx"]
+
+
+def parse_failed_tests(output: str, project_type: str) -> list[str]:
+    """Return the failed test IDs (pytest node IDs, or test files for Node)."""
+    if project_type == "python":
+        found = PYTEST_FAILED_LINE.findall(output) + PYTEST_VERBOSE_FAILED.findall(output)
+    else:
+        found = JEST_FAILED_FILE.findall(output)
+    return list(dict.fromkeys(found))
+
+
+class ImpactAnalyzer:
+    """Static import graph over a repository, built lazily and memoized per file."""
+
+    def __init__(self, repo_path: str, project_type: str, test_files: list[str]):
+        self.repo_path = repo_path
+        self.project_type = project_type
+        self.test_files = test_files
+        self._imports: dict[str, set[str]] = {}
+        self._roots = [repo_path, os.path.join(repo_path, "src")]
+
+    def invalidate(self, paths: list[str]) -> None:
+        """Forget the parsed imports of files that were rewritten."""
+        for path in paths:
+            self._imports.pop(self._rel(path), None)
+
+    def affected_tests(self, modified: list[str]) -> list[str]:
+        """Test files that import (transitively) or are any of the modified files."""
+        targets = {self._rel(p) for p in modified}
+        return [t for t in self.test_files if self._closure(t) & targets]
+
+    def select(self, failed_ids: list[str], modified: list[str]) -> Optional[list[str]]:
+        """
+        Tests to re-run after a fix: previous failures plus tests importing the
+        modified files. Returns None when a full run is required instead.
+        """
+        if not failed_ids:
+            return None
+        self.invalidate(modified)
+        files = self.affected_tests(modified)
+        selected = set(files)
+        ids = [i for i in failed_ids if i.split("::", 1)[0] not in selected]
+        return files + ids
+
+    def _closure(self, start: str) -> set[str]:
+        seen = {start}
+        stack = [start]
+        while stack:
+            for dep in self._deps(stack.pop()):
+                if dep not in seen:
+                    seen.add(dep)
+                    stack.append(dep)
+        return seen
+
+    def _deps(self, rel_path: str) -> set[str]:
+        if rel_path not in self._imports:
+            full = os.path.join(self.repo_path, rel_path)
+            try:
+                with open(full, "r", encoding="utf-8", errors="ignore") as f:
+                    source = f.read()
+            except OSError:
+                source = ""
+            if rel_path.endswith(".py"):
+                deps = self._python_deps(rel_path, source)
+            else:
+                deps = self._js_deps(rel_path, source)
+            self._imports[rel_path] = deps
+        return self._imports[rel_path]
+
+    def _python_deps(self, rel_path: str, source: str) -> set[str]:
+        try:
+            tree = ast.parse(source)
+        except (SyntaxError, ValueError):
+            return set()
+
+        here = os.path.dirname(rel_path)
+        deps = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    deps.update(self._resolve_module(alias.name, here))
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    base = here
+                    for _ in range(node.level - 1):
+                        base = os.path.dirname(base)
+                    module = (node.module or "").replace(".", "/")
+                    candidates = [os.path.join(base, module)] if module else [base]
+                    for alias in node.names:
+                        candidates.append(os.path.join(base, module, alias.name))
+                    for candidate in candidates:
+                        deps.update(self._python_file(os.path.join(self.repo_path, candidate)))
+                elif node.module:
+                    deps.update(self._resolve_module(node.module, here))
+                    for alias in node.names:
+                        deps.update(self._resolve_module(f"{node.module}.{alias.name}", here))
+        return deps
+
+    def _resolve_module(self, module: str, here: str) -> set[str]:
+        path = module.replace(".", "/")
+        for root in self._roots + [os.path.join(self.repo_path, here)]:
+            found = self._python_file(os.path.join(root, path))
+            if found:
+                return found
+        return set()
+
+    def _python_file(self, base: str) -> set[str]:
+        for candidate in (base + ".py", os.path.join(base, "__init__.py")):
+            if os.path.isfile(candidate):
+                return {self._rel(candidate)}
+        return set()
+
+    def _js_deps(self, rel_path: str, source: str) -> set[str]:
+        here = os.path.join(self.repo_path, os.path.dirname(rel_path))
+        deps = set()
+        for spec in JS_IMPORT_PATTERN.findall(source):
+            base = os.path.normpath(os.path.join(here, spec))
+            for ext in JS_EXTENSIONS:
+                if os.path.isfile(base + ext):
+                    deps.add(self._rel(base + ext))
+                    break
+        return deps
+
+    def _rel(self, path: str) -> str:
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.repo_path)
+        return os.path.normpath(path)
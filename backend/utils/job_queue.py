@@ -0,0 +1,150 @@
+"""
+Job Queue
+=========
+Bounded in-process job queue that runs healing pipelines in the background.
+
+`/run-agent` submits a job and returns immediately; a fixed pool of worker
+tasks pulls jobs off the queue, so at most `max_workers` controllers run at
+once and at most `max_queue_size` jobs wait behind them.
+
+Job state is kept in this process only, so the API must run as a single
+server process (no `uvicorn --workers N`); concurrency comes from
+`max_workers` instead.
+"""
+
+import asyncio
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+
+
+MAX_WORKERS = int(os.getenv("AGENT_MAX_WORKERS", "2"))
+MAX_QUEUE_SIZE = int(os.getenv("AGENT_MAX_QUEUE", "100"))
+MAX_RETAINED_JOBS = int(os.getenv("AGENT_MAX_RETAINED_JOBS", "1000"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobQueue:
+    """Runs submitted payloads through `runner` on a bounded worker pool."""
+
+    def __init__(
+        self,
+        runner: Callable[[dict[str, Any]], Awaitable[dict[str, Any]]],
+        max_workers: int = MAX_WORKERS,
+        max_queue_size: int = MAX_QUEUE_SIZE,
+        max_retained: int = MAX_RETAINED_JOBS,
+    ):
+        self.runner = runner
+        self.max_workers = max(1, max_workers)
+        self.max_queue_size = max(1, max_queue_size)
+        self.max_retained = max(1, max_retained)
+        self.jobs: "OrderedDict[str, dict[str, Any]]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Spawn the worker tasks. Must be called from the running event loop."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.max_workers)
+        ]
+        print(f"[Jobs] Started {self.max_workers} workers (queue limit {self.max_queue_size})")
+
+    async def stop(self) -> None:
+        """Cancel all workers. Jobs still queued are marked failed."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for job in self.jobs.values():
+            if job["status"] in (JOB_QUEUED, JOB_RUNNING):
+                job["status"] = JOB_FAILED
+                job["error"] = "Server shut down before the job finished"
+                job["finished_at"] = datetime.utcnow().isoformat()
+
+    def submit(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Enqueue a payload and return its job record."""
+        if self._queue is None:
+            raise RuntimeError("JobQueue.start() has not been called")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": JOB_QUEUED,
+            "payload": payload,
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(
+                f"Job queue is full ({self.max_queue_size} pending jobs)"
+            )
+
+        self.jobs[job_id] = job
+        self._evict_finished()
+        print(f"[Jobs] Queued {job_id} ({self._queue.qsize()} pending)")
+        return job
+
+    def get(self, job_id: str) -> Optional[dict[str, Any]]:
+        return self.jobs.get(job_id)
+
+    def stats(self) -> dict[str, Any]:
+        counts = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_COMPLETED: 0, JOB_FAILED: 0}
+        for job in self.jobs.values():
+            counts[job["status"]] += 1
+        return {
+            "workers": self.max_workers,
+            "queue_limit": self.max_queue_size,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            **counts,
+        }
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self._queue.get()
+            job["status"] = JOB_RUNNING
+            job["started_at"] = datetime.utcnow().isoformat()
+            print(f"[Jobs] Worker {index} running {job['job_id']}")
+            try:
+                job["result"] = await self.runner(job["payload"])
+                job["status"] = JOB_COMPLETED
+            except asyncio.CancelledError:
+                job["status"] = JOB_FAILED
+                job["error"] = "Job cancelled"
+                raise
+            except Exception as e:
+                print(f"[Jobs] {job['job_id']} failed: {e}")
+                job["status"] = JOB_FAILED
+                job["error"] = str(e)
+            finally:
+                job["finished_at"] = datetime.utcnow().isoformat()
+                self._queue.task_done()
+
+    def _evict_finished(self) -> None:
+        """Drop the oldest finished jobs once more than `max_retained` are held."""
+        excess = len(self.jobs) - self.max_retained
+        if excess <= 0:
+            return
+        for job_id in list(self.jobs):
+            if excess <= 0:
+                break
+            if self.jobs[job_id]["status"] in (JOB_COMPLETED, JOB_FAILED):
+                del self.jobs[job_id]
+                excess -= 1
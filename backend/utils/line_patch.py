@@ -0,0 +1,119 @@
+"""
+Line Patches
+============
+Windowed views of a source file and line-range patches against them.
+
+Instead of sending a whole file to the LLM and asking for it back, only the
+region around each failing line is sent (the enclosing function / class for
+Python, found with `ast`, or a fixed line window), and the model answers
+with replacements for explicit line ranges:
+
+    @@ replace 12-14
+    <new lines>
+    @@ end
+"""
+
+import ast
+import os
+import re
+from typing import Optional
+
+
+WINDOW_RADIUS = int(os.getenv("AGENT_LLM_WINDOW_RADIUS", "25"))
+MAX_SCOPE_LINES = 150
+
+PATCH_BLOCK = re.compile(
+    r"^@@ replace (\d+)-(\d+)[ \t]*\n(.*?)^@@ end[ \t]*$", re.MULTILINE | re.DOTALL
+)
+
+Hunk = tuple[int, int, list[str]]
+
+
+def fix_windows(content: str, line_nums: list[int], path: str = "") -> list[tuple[int, int]]:
+    """
+    1-based inclusive line ranges to show for the given failing lines, merged
+    where they overlap. Python files use the innermost enclosing def/class.
+    """
+    total = max(1, len(content.splitlines()))
+    tree = None
+    if path.endswith(".py"):
+        try:
+            tree = ast.parse(content)
+        except (SyntaxError, ValueError):
+            tree = None
+
+    windows = []
+    for line in line_nums:
+        line = min(max(1, line), total)
+        scope = _enclosing_scope(tree, line) if tree else None
+        if scope:
+            windows.append(scope)
+        else:
+            windows.append((max(1, line - WINDOW_RADIUS), min(total, line + WINDOW_RADIUS)))
+
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _enclosing_scope(tree: ast.AST, line: int) -> Optional[tuple[int, int]]:
+    best = None
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        end = node.end_lineno or node.lineno
+        if start <= line <= end and end - start < MAX_SCOPE_LINES:
+            if best is None or end - start < best[1] - best[0]:
+                best = (start, end)
+    return best
+
+
+def render_windows(content: str, windows: list[tuple[int, int]]) -> str:
+    """The windowed lines prefixed with their line numbers, regions separated by '...'."""
+    lines = content.splitlines()
+    width = len(str(windows[-1][1])) if windows else 1
+    parts = []
+    for start, end in windows:
+        parts.append("\n".join(
+            f"{n:>{width}}| {lines[n - 1]}" for n in range(start, min(end, len(lines)) + 1)
+        ))
+    return "\n...\n".join(parts)
+
+
+def parse_line_patch(text: str, windows: list[tuple[int, int]]) -> Optional[list[Hunk]]:
+    """
+    Parse replace blocks. Returns None if there are none, a range falls outside
+    the windows that were shown, or two ranges overlap.
+    """
+    hunks = []
+    for match in PATCH_BLOCK.finditer(text):
+        start, end = int(match.group(1)), int(match.group(2))
+        body = match.group(3)
+        if start > end or not any(ws <= start and end <= we for ws, we in windows):
+            return None
+        hunks.append((start, end, body.splitlines()))
+    if not hunks:
+        return None
+    hunks.sort()
+    for (_, prev_end, _), (start, _, _) in zip(hunks, hunks[1:]):
+        if start <= prev_end:
+            return None
+    return hunks
+
+
+def apply_line_patch(content: str, hunks: list[Hunk]) -> str:
+    """Apply hunks (bottom-up, so earlier line numbers stay valid)."""
+    lines = content.splitlines()
+    for start, end, new_lines in sorted(hunks, reverse=True):
+        lines[start - 1:end] = new_lines
+    return "\n".join(lines) + ("\n" if content.endswith("\n") or not content else "")
+
+
+def shift_line(hunks: list[Hunk], line: int) -> int:
+    """Where `line` of the original content ends up once `hunks` above it are applied."""
+    return line + sum(len(new_lines) - (end - start + 1) for start, end, new_lines in hunks if end < line)
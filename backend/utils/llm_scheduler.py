@@ -0,0 +1,97 @@
+"""
+LLM Scheduler
+=============
+Rate-limited scheduler for LLM requests.
+
+Requests from every job share one scheduler, so the concurrency cap and the
+tokens-per-minute budget apply to the API key as a whole. Rate-limit and
+transient errors are retried with exponential backoff and jitter.
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+
+LLM_CONCURRENCY = int(os.getenv("AGENT_LLM_CONCURRENCY", "4"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("AGENT_LLM_TPM", "200000"))
+LLM_MAX_RETRIES = int(os.getenv("AGENT_LLM_MAX_RETRIES", "4"))
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMScheduler:
+    """Runs LLM calls under a concurrency limit and a token bucket."""
+
+    def __init__(
+        self,
+        concurrency: int = LLM_CONCURRENCY,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        max_retries: int = LLM_MAX_RETRIES,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.capacity = max(1, tokens_per_minute)
+        self.max_retries = max(0, max_retries)
+        self._tokens = float(self.capacity)
+        self._refilled_at = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket_lock: Optional[asyncio.Lock] = None
+
+    async def run(
+        self, call: Callable[[], Awaitable[Any]], estimated_tokens: int
+    ) -> Any:
+        """Await `call()` once the budget allows, retrying transient failures."""
+        self._bind_loop()
+        for attempt in range(self.max_retries + 1):
+            await self._acquire_tokens(estimated_tokens)
+            async with self._semaphore:
+                try:
+                    return await call()
+                except Exception as e:
+                    if attempt >= self.max_retries or not _is_retryable(e):
+                        raise
+                    delay = min(30.0, 2 ** attempt) * (0.5 + random.random())
+                    print(f"[LLM] {type(e).__name__}, retrying in {delay:.1f}s "
+                          f"({attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(delay)
+
+    async def _acquire_tokens(self, amount: int) -> None:
+        amount = min(max(1, amount), self.capacity)
+        rate = self.capacity / 60.0
+        async with self._bucket_lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._refilled_at) * rate
+                )
+                self._refilled_at = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / rate)
+
+    def _bind_loop(self) -> None:
+        """asyncio primitives belong to one loop; recreate them for a new one."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._bucket_lock = asyncio.Lock()
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """Rough token count of a request: ~4 characters per prompt token plus the completion budget."""
+    return len(prompt) // 4 + max_tokens
+
+
+def _is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+default_scheduler = LLMScheduler()
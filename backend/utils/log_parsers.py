@@ -0,0 +1,140 @@
+"""
+Log Parsers
+===========
+Registry of log formats the analyzer understands.
+
+Each format registers a regex and a handler that turns a match into a
+failure location. The registered patterns are compiled into a single
+alternation (one named group per format), so a log is tokenized in one
+linear pass no matter how many formats exist, and logs that mix several
+formats (lint output followed by test output, ...) yield all of them.
+
+Every format is line-oriented: a pattern is tried at the start of each line,
+after any indentation, and may continue over following lines. Patterns
+must use plain (unnamed) groups; the handler receives them as a tuple in
+the order they appear in its own pattern.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+
+# (file, line, error context) or None to ignore the match
+ParsedFailure = Optional[tuple[str, int, str]]
+Handler = Callable[[tuple, str, int, int], ParsedFailure]
+
+SOURCE_FILE = re.compile(r"\.(?:py|[cm]?[jt]sx?)$")
+# Frames in installed packages / the interpreter are never the code to fix
+LIBRARY_PATH = re.compile(r"site-packages|dist-packages|node_modules|/lib/python\d|^<|^node:")
+
+
+@dataclass
+class LogParser:
+    name: str
+    pattern: str
+    handler: Handler
+    groups: int = 0
+    offset: int = 0
+
+
+_parsers: list[LogParser] = []
+_scanner: Optional[re.Pattern] = None
+
+
+def register_parser(name: str, pattern: str) -> Callable[[Handler], Handler]:
+    """
+    Register a log format. Earlier registrations win when two formats match
+    the same line, so register the more specific ones first.
+    """
+    def decorator(handler: Handler) -> Handler:
+        global _scanner
+        if not name.isidentifier() or any(p.name == name for p in _parsers):
+            raise ValueError(f"Invalid or duplicate log parser name: {name!r}")
+        groups = re.compile(pattern).groups
+        _parsers.append(LogParser(name, pattern, handler, groups))
+        _scanner = None
+        return handler
+    return decorator
+
+
+def scanner() -> re.Pattern:
+    """The combined pattern of all registered formats (compiled once per registry change)."""
+    global _scanner
+    if _scanner is None:
+        offset = 1
+        for parser in _parsers:
+            parser.offset = offset + 1  # first inner group, after the named wrapper
+            offset += parser.groups + 1
+        alternatives = "|".join(f"(?P<{p.name}>{p.pattern})" for p in _parsers)
+        _scanner = re.compile(rf"^[ \t]*(?:{alternatives})", re.MULTILINE)
+    return _scanner
+
+
+def scan(text: str) -> Iterator[tuple[str, str, int, str, int, int]]:
+    """
+    Yield (parser name, file, line, context, start, end) for every recognised
+    failure, in log order, in one pass.
+    """
+    pattern = scanner()
+    by_name = {p.name: p for p in _parsers}
+    for match in pattern.finditer(text):
+        parser = by_name[match.lastgroup]
+        groups = tuple(match.group(i) for i in range(parser.offset, parser.offset + parser.groups))
+        parsed = parser.handler(groups, text, match.start(), match.end())
+        if parsed:
+            file_path, line_num, context = parsed
+            yield parser.name, file_path, line_num, context, match.start(), match.end()
+
+
+# ── Built-in formats ────────────────────────────────────────────────────────
+# Registered most specific first.
+
+@register_parser("jest", r"●\s+(.+?)\s+›\s+(.+?)\n\s+(.+?):(\d+):(\d+)")
+def _jest(groups: tuple, text: str, start: int, end: int) -> ParsedFailure:
+    # The location line is a stack frame: "at fn (path:line:col)" or "path:line:col"
+    file_path = groups[2].rsplit("(", 1)[-1].strip()
+    if file_path.startswith("at "):
+        file_path = file_path[3:]
+    return file_path, int(groups[3]), f"{groups[0]} › {groups[1]}"
+
+
+@register_parser("typescript", r"(\S.*?)\((\d+),(\d+)\):\s+error\s+TS\d+:\s+(.+)")
+def _typescript(groups: tuple, text: str, start: int, end: int) -> ParsedFailure:
+    return groups[0], int(groups[1]), groups[3]
+
+
+@register_parser("eslint", r"(\S.*?):(\d+):(\d+):\s+(error|warning)\s+(.+)")
+def _eslint(groups: tuple, text: str, start: int, end: int) -> ParsedFailure:
+    return groups[0], int(groups[1]), groups[4]
+
+
+@register_parser("python_traceback", r'File "(.+?)", line (\d+)')
+def _python_traceback(groups: tuple, text: str, start: int, end: int) -> ParsedFailure:
+    if LIBRARY_PATH.search(groups[0]):
+        return None
+    # The error message follows the frame; keep some of it as context
+    return groups[0], int(groups[1]), text[max(0, start - 50):end + 200]
+
+
+@register_parser("pytest_frame", r"([^\s:][^:\n]*?\.py):(\d+): ")
+def _pytest_frame(groups: tuple, text: str, start: int, end: int) -> ParsedFailure:
+    if LIBRARY_PATH.search(groups[0]):
+        return None
+    return groups[0], int(groups[1]), text[start:end + 200]
+
+
+@register_parser("node_frame", r"at .+? \((.+?):(\d+):\d+\)")
+def _node_frame(groups: tuple, text: str, start: int, end: int) -> ParsedFailure:
+    if LIBRARY_PATH.search(groups[0]):
+        return None
+    return groups[0], int(groups[1]), text[start:end]
+
+
+# pytest's short test summary: "FAILED tests/test_x.py::test_y - AssertionError"
+@register_parser("pytest_summary", r"(?:ERROR|FAILED|Error)\s+(.+?)(?::(\d+))?(?::|\s+)(.+?)(?:\n|$)")
+def _pytest_summary(groups: tuple, text: str, start: int, end: int) -> ParsedFailure:
+    file_path = groups[0].strip()
+    if not SOURCE_FILE.search(file_path):
+        return None
+    return file_path, int(groups[1] or 0), groups[2].lstrip(":").strip()
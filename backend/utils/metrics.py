@@ -0,0 +1,112 @@
+"""
+Metrics
+=======
+Timing spans around the pipeline phases (clone, install, test runs, LLM
+calls, ...), kept per job and aggregated process-wide into histograms that
+`/metrics` serves in the Prometheus text format.
+
+A job's `PhaseTimer` is made current with `with timer.active():`, and
+`span(phase)` anywhere below it (including tasks started inside) records
+into that job's breakdown as well as the global histograms. Concurrent
+spans of one phase (LLM calls, test shards) are summed.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+
+# Upper bounds (seconds) of the histogram buckets: from a cached LLM answer to a full test suite
+PHASE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, one series per label value."""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets: tuple[float, ...] = PHASE_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series: dict[str, tuple[list[int], list[float]]] = {}  # value -> (counts, [sum])
+
+    def observe(self, value: str, seconds: float) -> None:
+        counts, total = self._series.setdefault(value, ([0] * (len(self.buckets) + 1), [0.0]))
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                counts[i] += 1
+        counts[-1] += 1  # +Inf
+        total[0] += seconds
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for value, (counts, total) in sorted(self._series.items()):
+            label = f'{self.label}="{_escape(value)}"'
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {counts[-1]}')
+            lines.append(f"{self.name}_sum{{{label}}} {total[0]:.6f}")
+            lines.append(f"{self.name}_count{{{label}}} {counts[-1]}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+phase_seconds = Histogram(
+    "ci_healer_phase_seconds", "Duration of pipeline phases.", "phase"
+)
+job_seconds = Histogram(
+    "ci_healer_job_seconds", "Duration of whole pipeline runs, by final CI status.", "status"
+)
+
+
+class PhaseTimer:
+    """Per-job breakdown: phase -> number of spans and their total seconds."""
+
+    def __init__(self):
+        self.phases: dict[str, dict[str, float]] = {}
+
+    def record(self, phase: str, seconds: float) -> None:
+        entry = self.phases.setdefault(phase, {"count": 0, "seconds": 0.0})
+        entry["count"] += 1
+        entry["seconds"] += seconds
+
+    def breakdown(self) -> dict[str, dict[str, float]]:
+        return {
+            phase: {"count": int(entry["count"]), "seconds": round(entry["seconds"], 3)}
+            for phase, entry in self.phases.items()
+        }
+
+    @contextmanager
+    def active(self) -> Iterator["PhaseTimer"]:
+        """Within the block, `span` records into this timer (also from tasks started there)."""
+        token = _current_timer.set(self)
+        try:
+            yield self
+        finally:
+            _current_timer.reset(token)
+
+
+_current_timer: ContextVar[Optional[PhaseTimer]] = ContextVar("phase_timer", default=None)
+
+
+@contextmanager
+def span(phase: str) -> Iterator[None]:
+    """Time the enclosed block (sync or async) as one occurrence of `phase`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        phase_seconds.observe(phase, seconds)
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.record(phase, seconds)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    return "\n".join(phase_seconds.render() + job_seconds.render()) + "\n"
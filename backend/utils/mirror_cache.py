@@ -0,0 +1,94 @@
+"""
+Mirror Cache
+============
+Persistent bare mirrors of remote repositories, keyed by repository URL.
+
+The first run for a repository does a full bare clone into the cache; later
+runs only `git fetch` what changed. Working copies are then cloned from the
+local mirror, which git does with hard links, so they no longer depend on
+the mirror once created and a cold mirror can be evicted at any time.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import uuid
+from typing import Optional
+
+from utils.cache_paths import cache_dir, evict_lru, touch
+from utils.process_runner import run_process
+
+
+MIRROR_CACHE_ENABLED = os.getenv("AGENT_MIRROR_CACHE", "1") != "0"
+MIRROR_MAX_BYTES = int(os.getenv("AGENT_MIRROR_MAX_MB", "5120")) * 1024 * 1024
+FETCH_TIMEOUT = 600
+
+_locks: dict[str, asyncio.Lock] = {}
+
+
+def mirror_key(repo_url: str) -> str:
+    """Stable cache key for a repository URL (ignores trailing '/' and '.git')."""
+    normalized = repo_url.strip().rstrip("/")
+    if normalized.endswith(".git"):
+        normalized = normalized[:-4]
+    return hashlib.sha256(normalized.encode()).hexdigest()[:32]
+
+
+async def sync_mirror(repo_url: str) -> Optional[str]:
+    """
+    Create or incrementally update the mirror for `repo_url`.
+    Returns the mirror path, or None if the mirror could not be prepared.
+    """
+    key = mirror_key(repo_url)
+    mirrors_dir = cache_dir("mirrors")
+    path = os.path.join(mirrors_dir, f"{key}.git")
+    lock = _locks.setdefault(key, asyncio.Lock())
+
+    async with lock:
+        if os.path.isdir(path):
+            result = await run_process(
+                ["git", "fetch", "--prune", "--tags", "origin"],
+                cwd=path, timeout=FETCH_TIMEOUT
+            )
+            if result.ok:
+                print(f"[Mirror] Fetched updates for {repo_url}")
+            else:
+                print(f"[Mirror] Fetch failed, recreating mirror: {result.stderr.strip()}")
+                shutil.rmtree(path, ignore_errors=True)
+
+        if not os.path.isdir(path):
+            staging = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+            result = await run_process(
+                ["git", "clone", "--bare", repo_url, staging], timeout=FETCH_TIMEOUT
+            )
+            if not result.ok:
+                shutil.rmtree(staging, ignore_errors=True)
+                print(f"[Mirror] Mirror clone failed: {result.stderr.strip()}")
+                return None
+            # A bare clone has no fetch refspec; track branches one-to-one
+            await run_process(
+                ["git", "config", "remote.origin.fetch", "+refs/heads/*:refs/heads/*"],
+                cwd=staging, timeout=30
+            )
+            try:
+                os.rename(staging, path)
+            except OSError:
+                # Another worker process published the mirror first
+                shutil.rmtree(staging, ignore_errors=True)
+            print(f"[Mirror] Created mirror for {repo_url}")
+
+        touch(path)
+
+    await evict_mirrors(protected=[f"{key}.git"])
+    return path
+
+
+async def evict_mirrors(protected: list[str] = ()) -> None:
+    """Evict least recently used mirrors beyond MIRROR_MAX_BYTES."""
+    busy = [f"{k}.git" for k, lock in _locks.items() if lock.locked()]
+    evicted = await asyncio.to_thread(
+        evict_lru, cache_dir("mirrors"), MIRROR_MAX_BYTES, list(protected) + busy
+    )
+    for name in evicted:
+        print(f"[Mirror] Evicted {name}")
@@ -0,0 +1,84 @@
+"""
+Working-Tree Overlay
+====================
+In-memory view of the files a job reads and edits.
+
+Each file is read from disk once (and again only if it changes on disk).
+Fixes are layered on top of it in memory, checked for syntax before they
+are accepted, and written out together by `flush`, so a broken LLM answer
+never reaches the working tree and several fixes to one file see each
+other's changes.
+"""
+
+import json
+import os
+from typing import Optional
+
+
+def check_syntax(path: str, content: str) -> Optional[str]:
+    """Quick in-process check. Returns the error, or None if fine / not checkable."""
+    if path.endswith(".py"):
+        try:
+            compile(content, path, "exec", dont_inherit=True)
+        except (SyntaxError, ValueError) as e:
+            return f"{type(e).__name__}: {e}"
+    elif path.endswith(".json"):
+        try:
+            json.loads(content)
+        except ValueError as e:
+            return f"Invalid JSON: {e}"
+    return None
+
+
+class WorkingTreeOverlay:
+    """File contents by absolute path, with pending edits layered on top."""
+
+    def __init__(self):
+        self._base: dict[str, tuple[str, tuple[int, int]]] = {}  # path -> (content, (mtime, size))
+        self._layers: dict[str, list[str]] = {}
+
+    def read(self, path: str) -> str:
+        """Current content: the latest edit, else the (cached) disk content."""
+        layers = self._layers.get(path)
+        if layers:
+            return layers[-1]
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._base.get(path)
+        if cached is None or cached[1] != signature:
+            with open(path, "r", errors="ignore") as f:
+                cached = (f.read(), signature)
+            self._base[path] = cached
+        return cached[0]
+
+    def write(self, path: str, content: str) -> Optional[str]:
+        """
+        Layer an edit on top of the file. The edit is refused (and the error
+        returned) if it introduces a syntax error, or leaves the file's
+        existing one exactly as it was.
+        """
+        error = check_syntax(path, content)
+        if error and check_syntax(path, self.read(path)) in (None, error):
+            return error
+        self._layers.setdefault(path, []).append(content)
+        return None
+
+    @property
+    def dirty(self) -> list[str]:
+        return [
+            path for path, layers in self._layers.items()
+            if layers and layers[-1] != self._base[path][0]
+        ]
+
+    def flush(self) -> list[str]:
+        """Write every changed file to disk in one batch. Returns the written paths."""
+        written = []
+        for path in self.dirty:
+            content = self._layers[path][-1]
+            with open(path, "w") as f:
+                f.write(content)
+            stat = os.stat(path)
+            self._base[path] = (content, (stat.st_mtime_ns, stat.st_size))
+            written.append(path)
+        self._layers.clear()
+        return written
@@ -0,0 +1,151 @@
+"""
+Process Runner
+==============
+Shared async subprocess execution for every agent and utility.
+
+All external commands (git, pip, npm, linters, test runners) go through
+`run_process`, so none of them block the event loop. Each call gets a
+timeout, a cap on retained output and is killed together with its children
+when it times out or the awaiting task is cancelled. Callers that want to
+look at output while the process is still running can pass `on_output`,
+which receives stdout as complete lines and may ask for the process to stop.
+"""
+
+import asyncio
+import os
+import signal
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+DEFAULT_TIMEOUT = 300
+MAX_OUTPUT_BYTES = 2 * 1024 * 1024
+_READ_CHUNK = 64 * 1024
+
+
+@dataclass
+class ProcessResult:
+    """Outcome of a finished (or killed) subprocess."""
+
+    cmd: list[str]
+    returncode: int
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+    truncated: bool = False
+    stopped: bool = False  # killed because on_output asked for it
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out and not self.stopped
+
+
+async def run_process(
+    cmd: list[str],
+    cwd: Optional[str] = None,
+    timeout: Optional[float] = DEFAULT_TIMEOUT,
+    max_output: int = MAX_OUTPUT_BYTES,
+    merge_stderr: bool = False,
+    env: Optional[dict[str, str]] = None,
+    on_output: Optional[Callable[[str], bool]] = None,
+) -> ProcessResult:
+    """
+    Run `cmd` without blocking the event loop.
+
+    Only the last `max_output` bytes of each stream are retained. On timeout
+    the process group is killed and the partial output is returned with
+    `timed_out=True`. `on_output` is called with each batch of complete
+    stdout lines as it arrives; if it returns True the process group is
+    killed and the result has `stopped=True`. Raises FileNotFoundError if
+    the executable is missing.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        cwd=cwd,
+        env=env,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT if merge_stderr else asyncio.subprocess.PIPE,
+        start_new_session=True,
+    )
+
+    stdout_buf, stderr_buf = bytearray(), bytearray()
+    truncated = [False]
+    stopped = [False]
+    partial = bytearray()  # stdout after the last newline, not yet passed to on_output
+
+    def emit(data: bytes) -> None:
+        if stopped[0] or not data:
+            return
+        if on_output(data.decode(errors="ignore")):
+            stopped[0] = True
+            _kill(proc)
+
+    async def drain(
+        stream: Optional[asyncio.StreamReader], buf: bytearray, streamed: bool = False
+    ) -> None:
+        if stream is None:
+            return
+        while True:
+            chunk = await stream.read(_READ_CHUNK)
+            if not chunk:
+                if streamed:
+                    emit(bytes(partial))
+                return
+            buf.extend(chunk)
+            if len(buf) > max_output:
+                del buf[: len(buf) - max_output]
+                truncated[0] = True
+            if streamed:
+                partial.extend(chunk)
+                cut = partial.rfind(b"\n") + 1
+                if cut:
+                    emit(bytes(partial[:cut]))
+                    del partial[:cut]
+                elif len(partial) > max_output:
+                    # A single enormous line; pass it on rather than hold it
+                    emit(bytes(partial))
+                    partial.clear()
+
+    async def communicate() -> int:
+        await asyncio.gather(
+            drain(proc.stdout, stdout_buf, streamed=on_output is not None),
+            drain(proc.stderr, stderr_buf),
+        )
+        return await proc.wait()
+
+    timed_out = False
+    try:
+        returncode = await asyncio.wait_for(communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        _kill(proc)
+        returncode = await proc.wait()
+        print(f"[Process] Timed out after {timeout}s: {' '.join(cmd)}")
+    except BaseException:  # cancelled, or on_output raised
+        _kill(proc)
+        await proc.wait()
+        raise
+
+    return ProcessResult(
+        cmd=list(cmd),
+        returncode=returncode,
+        stdout=stdout_buf.decode(errors="ignore"),
+        stderr=stderr_buf.decode(errors="ignore"),
+        timed_out=timed_out,
+        truncated=truncated[0],
+        stopped=stopped[0],
+    )
+
+
+def _kill(proc: asyncio.subprocess.Process) -> None:
+    """Kill the process and everything it spawned (npm, pytest-xdist, ...)."""
+    if proc.returncode is not None:
+        return
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except ProcessLookupError:
+        pass
@@ -5,93 +5,65 @@ Detects Python vs Node.js projects and installs dependencies.
 """
 
 import os
-import subprocess
-import glob
 from typing import Optional
 
+from utils.process_runner import run_process
+from utils.repo_manifest import RepoManifest, scan_repo
 
-def detect_project_type(repo_path: str) -> str:
+INSTALL_TIMEOUT = 900
+
+
+def detect_project_type(repo_path: str, manifest: Optional[RepoManifest] = None) -> str:
     """
     Returns 'python', 'node', or 'node_yarn' based on project files.
     """
-    if os.path.exists(os.path.join(repo_path, "requirements.txt")):
-        return "python"
-    if os.path.exists(os.path.join(repo_path, "setup.py")):
+    root_files = (manifest or scan_repo(repo_path)).root_files
+    if root_files & {"requirements.txt", "setup.py", "pyproject.toml"}:
         return "python"
-    if os.path.exists(os.path.join(repo_path, "pyproject.toml")):
-        return "python"
-    if os.path.exists(os.path.join(repo_path, "yarn.lock")):
+    if "yarn.lock" in root_files:
         return "node_yarn"
-    if os.path.exists(os.path.join(repo_path, "package.json")):
+    if "package.json" in root_files:
         return "node"
     return "python"  # Default
 
 
-def install_dependencies(repo_path: str, project_type: str) -> bool:
-    """Install project dependencies."""
+async def install_dependencies(
+    repo_path: str, project_type: str, python: str = "python"
+) -> bool:
+    """Install project dependencies (Python ones with the given interpreter)."""
     print(f"[Deps] Installing {project_type} dependencies...")
 
     if project_type == "python":
         req_file = os.path.join(repo_path, "requirements.txt")
         if os.path.exists(req_file):
-            result = subprocess.run(
-                ["pip", "install", "-r", "requirements.txt", "--quiet"],
-                cwd=repo_path, capture_output=True
+            result = await run_process(
+                [python, "-m", "pip", "install", "-r", "requirements.txt", "--quiet"],
+                cwd=repo_path, timeout=INSTALL_TIMEOUT
             )
-            return result.returncode == 0
+            return result.ok
 
         # Try setup.py
         setup_file = os.path.join(repo_path, "setup.py")
         if os.path.exists(setup_file):
-            result = subprocess.run(
-                ["pip", "install", "-e", ".", "--quiet"],
-                cwd=repo_path, capture_output=True
+            result = await run_process(
+                [python, "-m", "pip", "install", "-e", ".", "--quiet"],
+                cwd=repo_path, timeout=INSTALL_TIMEOUT
             )
-            return result.returncode == 0
+            return result.ok
 
     elif project_type in ("node", "node_yarn"):
         cmd = ["yarn", "install"] if project_type == "node_yarn" else ["npm", "install"]
-        result = subprocess.run(cmd, cwd=repo_path, capture_output=True)
-        return result.returncode == 0
+        result = await run_process(cmd, cwd=repo_path, timeout=INSTALL_TIMEOUT)
+        return result.ok
 
     return True
 
 
-def discover_test_files(repo_path: str, project_type: str) -> list[str]:
+def discover_test_files(
+    repo_path: str, project_type: str, manifest: Optional[RepoManifest] = None
+) -> list[str]:
     """
-    Auto-discover test files without hardcoding paths.
+    Auto-discover test files without hardcoding paths (pytest / jest conventions,
+    classified by the repo scan).
     """
-    test_files = []
-
-    if project_type == "python":
-        # pytest conventions
-        patterns = [
-            "**/test_*.py",
-            "**/*_test.py",
-            "**/tests/*.py",
-            "**/test/*.py",
-        ]
-        for pattern in patterns:
-            found = glob.glob(os.path.join(repo_path, pattern), recursive=True)
-            test_files.extend(found)
-
-    elif project_type in ("node", "node_yarn"):
-        patterns = [
-            "**/*.test.js",
-            "**/*.test.ts",
-            "**/*.spec.js",
-            "**/*.spec.ts",
-            "**/tests/*.js",
-            "**/tests/*.ts",
-        ]
-        for pattern in patterns:
-            found = glob.glob(os.path.join(repo_path, pattern), recursive=True)
-            test_files.extend(found)
-
-    # Make paths relative to repo
-    test_files = [
-        os.path.relpath(f, repo_path) for f in test_files
-        if "node_modules" not in f and ".venv" not in f and "__pycache__" not in f
-    ]
-
-    return list(set(test_files))
+    return (manifest or scan_repo(repo_path)).test_files(project_type)
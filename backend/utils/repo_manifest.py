@@ -0,0 +1,102 @@
+"""
+Repository Manifest
+===================
+One pruned walk over a checkout, shared by everything that needs to know
+what is in it: project detection, test discovery, the basic static scan
+and the failure-path file index.
+
+Dependency and tool directories (node_modules, virtualenvs, caches, VCS
+metadata) are never entered, so a JS repo with a huge node_modules tree
+costs no more to scan than its own sources.
+"""
+
+import os
+from dataclasses import dataclass, field
+
+
+PRUNED_DIRS = {"node_modules", "__pycache__", "venv", "site-packages"}
+MANIFEST_FILES = {"requirements.txt", "setup.py", "pyproject.toml", "package.json"}
+LOCK_FILES = {"yarn.lock", "package-lock.json", "pnpm-lock.yaml", "poetry.lock", "Pipfile.lock"}
+
+PYTHON_EXTENSIONS = (".py",)
+NODE_EXTENSIONS = (".js", ".ts", ".jsx", ".tsx")
+NODE_TEST_SUFFIXES = (".test.js", ".test.ts", ".spec.js", ".spec.ts")
+TEST_DIRS = ("tests", "test")
+
+
+@dataclass
+class RepoManifest:
+    """Every file of a checkout (repo-relative, '/'-separated), classified."""
+
+    repo_path: str
+    files: list[str] = field(default_factory=list)
+    root_files: set[str] = field(default_factory=set)
+    python_sources: list[str] = field(default_factory=list)
+    node_sources: list[str] = field(default_factory=list)
+    python_tests: list[str] = field(default_factory=list)
+    node_tests: list[str] = field(default_factory=list)
+
+    @property
+    def manifests(self) -> set[str]:
+        return self.root_files & MANIFEST_FILES
+
+    @property
+    def lockfiles(self) -> set[str]:
+        return self.root_files & LOCK_FILES
+
+    def test_files(self, project_type: str) -> list[str]:
+        if project_type == "python":
+            return list(self.python_tests)
+        if project_type in ("node", "node_yarn"):
+            return list(self.node_tests)
+        return []
+
+    def sources(self, project_type: str) -> list[str]:
+        if project_type == "python":
+            return list(self.python_sources)
+        if project_type in ("node", "node_yarn"):
+            return list(self.node_sources)
+        return []
+
+    def _add(self, rel_path: str, parts: tuple[str, ...]) -> None:
+        name = parts[-1]
+        self.files.append(rel_path)
+        if len(parts) == 1:
+            self.root_files.add(name)
+        in_test_dir = len(parts) > 1 and parts[-2] in TEST_DIRS
+
+        if name.endswith(PYTHON_EXTENSIONS):
+            self.python_sources.append(rel_path)
+            # pytest conventions
+            if name.startswith("test_") or name.endswith("_test.py") or in_test_dir:
+                self.python_tests.append(rel_path)
+        elif name.endswith(NODE_EXTENSIONS):
+            self.node_sources.append(rel_path)
+            if name.endswith(NODE_TEST_SUFFIXES) or (in_test_dir and name.endswith((".js", ".ts"))):
+                self.node_tests.append(rel_path)
+
+
+def scan_repo(repo_path: str) -> RepoManifest:
+    """Walk the checkout once with os.scandir, skipping hidden and dependency directories."""
+    manifest = RepoManifest(repo_path)
+    stack: list[tuple[str, tuple[str, ...]]] = [(repo_path, ())]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                entries = sorted(entries, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            parts = prefix + (entry.name,)
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith(".") and entry.name not in PRUNED_DIRS:
+                        subdirs.append((entry.path, parts))
+                elif entry.is_file():
+                    manifest._add("/".join(parts), parts)
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))  # Depth-first, in name order
+    return manifest
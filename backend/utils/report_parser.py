@@ -0,0 +1,213 @@
+"""
+Test Report Parser
+==================
+Stream-parses machine-readable test reports into typed records.
+
+Supported formats: pytest JUnit XML (xunit1 family, which carries file/line
+attributes), Jest / Vitest `--json` output and Mocha's JSON reporter.
+"""
+
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+FAILED_STATUSES = ("failed", "error")
+
+TRACEBACK_FRAME = re.compile(r'File "(.+?)", line (\d+)')
+PYTEST_FRAME = re.compile(r"^([^\s:][^:\n]*?\.py):(\d+): ", re.MULTILINE)
+JS_FRAME = re.compile(r"\(?((?:/|\.{0,2}[\w@-])[^():\s]*\.[cm]?[jt]sx?):(\d+):\d+\)?")
+
+
+@dataclass
+class TestCaseResult:
+    """Outcome of a single test case."""
+
+    test_id: str
+    status: str  # passed | failed | error | skipped
+    file: str = ""
+    line: int = 0
+    message: str = ""
+    details: str = ""
+    duration: float = 0.0
+
+
+@dataclass
+class TestReport:
+    """All test case results of one (possibly sharded) run."""
+
+    cases: list[TestCaseResult] = field(default_factory=list)
+
+    @property
+    def failures(self) -> list[TestCaseResult]:
+        return [c for c in self.cases if c.status in FAILED_STATUSES]
+
+    @property
+    def passed(self) -> bool:
+        return bool(self.cases) and not self.failures
+
+    def failed_ids(self, files_only: bool = False) -> list[str]:
+        """IDs of failed cases, or just their test files (for runners without node IDs)."""
+        if files_only:
+            return list(dict.fromkeys(c.test_id.split("::", 1)[0] for c in self.failures))
+        return list(dict.fromkeys(c.test_id for c in self.failures))
+
+    @classmethod
+    def merge(cls, reports: list[Optional["TestReport"]]) -> Optional["TestReport"]:
+        """Combine shard reports. Returns None if any shard produced no report."""
+        if not reports or any(r is None for r in reports):
+            return None
+        return cls(cases=[c for r in reports for c in r.cases])
+
+
+def parse_junit_xml(path: str) -> Optional[TestReport]:
+    """Parse a pytest JUnit XML report without loading the whole tree."""
+    if not os.path.exists(path):
+        return None
+    report = TestReport()
+    try:
+        for _, elem in ET.iterparse(path, events=("end",)):
+            if elem.tag != "testcase":
+                continue
+            report.cases.append(_junit_case(elem))
+            elem.clear()
+    except ET.ParseError as e:
+        print(f"[Reports] Invalid JUnit XML: {e}")
+        return None
+    return report
+
+
+def _junit_case(elem: ET.Element) -> TestCaseResult:
+    file = elem.get("file", "")
+    name = elem.get("name", "")
+    classname = elem.get("classname", "")
+
+    # classname is "pkg.test_mod.TestClass"; rebuild the pytest node ID
+    module = file[:-3].replace("/", ".") if file.endswith(".py") else ""
+    parts = [file or classname]
+    if module and classname.startswith(module + "."):
+        parts.extend(classname[len(module) + 1:].split("."))
+    # Collection errors are reported with the module as the test name
+    test_id = file if module and name == module else "::".join(parts + [name])
+
+    case = TestCaseResult(
+        test_id=test_id,
+        status="passed",
+        file=file,
+        line=int(elem.get("line") or 0) + 1,
+        duration=float(elem.get("time") or 0.0),
+    )
+    for child in elem:
+        if child.tag in ("failure", "error"):
+            case.status = "failed" if child.tag == "failure" else "error"
+            case.details = child.text or ""
+            # pytest's "E   " lines carry the actual exception; the message attribute
+            # is often just "collection failure"
+            error_lines = [l[1:].strip() for l in case.details.splitlines() if l.startswith("E ")]
+            case.message = "\n".join([child.get("message", "")] + error_lines).strip()
+            frame = _last_frame(case.details, python=True)
+            if frame:
+                case.file, case.line = frame
+            break
+        if child.tag == "skipped":
+            case.status = "skipped"
+    return case
+
+
+def parse_jest_json(path: str) -> Optional[TestReport]:
+    """Parse Jest / Vitest `--json --outputFile` results."""
+    data = _load_json(path)
+    if data is None:
+        return None
+    report = TestReport()
+    for suite in data.get("testResults", []):
+        suite_file = suite.get("name", "")
+        assertions = suite.get("assertionResults", [])
+        for a in assertions:
+            status = a.get("status", "")
+            details = "\n".join(a.get("failureMessages") or [])
+            case = TestCaseResult(
+                test_id=f"{suite_file}::{a.get('fullName') or a.get('title', '')}",
+                status="failed" if status == "failed" else ("passed" if status == "passed" else "skipped"),
+                file=suite_file,
+                line=((a.get("location") or {}).get("line") or 0),
+                message=details.splitlines()[0] if details else "",
+                details=details,
+                duration=(a.get("duration") or 0) / 1000,
+            )
+            if case.status == "failed":
+                frame = _last_frame(details, python=False)
+                if frame:
+                    case.file, case.line = frame
+            report.cases.append(case)
+
+        # Suite failed to run at all (syntax error, missing module, ...)
+        if suite.get("status") == "failed" and not assertions:
+            message = suite.get("message", "")
+            frame = _last_frame(message, python=False)
+            report.cases.append(TestCaseResult(
+                test_id=suite_file,
+                status="error",
+                file=frame[0] if frame else suite_file,
+                line=frame[1] if frame else 0,
+                message=message.strip().splitlines()[0] if message.strip() else "Test suite failed to run",
+                details=message,
+            ))
+    return report
+
+
+def parse_mocha_json(path: str) -> Optional[TestReport]:
+    """Parse Mocha's JSON reporter output."""
+    data = _load_json(path)
+    if data is None:
+        return None
+    report = TestReport()
+    tests = data.get("tests", [])
+    # Hook failures ("before all" ...) only appear in "failures"
+    titles = {t.get("fullTitle") for t in tests}
+    hooks = [t for t in data.get("failures", []) if t.get("fullTitle") not in titles]
+    for t in tests + hooks:
+        err = t.get("err") or {}
+        case = TestCaseResult(
+            test_id=f"{t.get('file', '')}::{t.get('fullTitle', t.get('title', ''))}",
+            status="failed" if err else "passed",
+            file=t.get("file", ""),
+            message=err.get("message", ""),
+            details=err.get("stack", ""),
+            duration=(t.get("duration") or 0) / 1000,
+        )
+        if err:
+            frame = _last_frame(case.details, python=False)
+            if frame:
+                case.file, case.line = frame
+        report.cases.append(case)
+    return report
+
+
+def _last_frame(text: str, python: bool) -> Optional[tuple[str, int]]:
+    """
+    Innermost user-code frame of a failure. Python: the last traceback /
+    pytest frame; JS: the first stack frame outside node_modules.
+    """
+    if python:
+        matches = TRACEBACK_FRAME.findall(text) or PYTEST_FRAME.findall(text)
+        matches = [m for m in matches if "site-packages" not in m[0]]
+        return (matches[-1][0], int(matches[-1][1])) if matches else None
+    for file, line in JS_FRAME.findall(text):
+        if "node_modules" not in file and not file.startswith("node:"):
+            return file, int(line)
+    return None
+
+
+def _load_json(path: str) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            return json.load(f)
+    except ValueError as e:
+        print(f"[Reports] Invalid JSON report: {e}")
+        return None
@@ -0,0 +1,317 @@
+"""
+Sandbox Pool
+============
+Warm, long-lived pytest workers for one job's dependency environment.
+
+A worker (`utils/sandbox_worker.py`) is started once with the project's
+interpreter, imports pytest and its plugins, and then receives "run these
+tests in this tree" jobs over its stdin pipe. Each job runs in a forked,
+memory-limited child of the worker, so repeated runs (fix iterations,
+shards, targeted re-runs) skip interpreter start-up and plugin imports
+while still seeing every fix. When AGENT_SANDBOX_DOCKER_IMAGE is set and
+Docker is installed, workers run inside containers of that image instead
+(same paths mounted, memory and process limits applied by Docker).
+
+Results are `ProcessResult`s, exactly as from `run_process`: output is
+streamed to `on_output`, capped, and the run is killed on timeout or when
+`on_output` asks for it. A worker whose stream is out of sync afterwards
+is discarded rather than reused.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import signal
+import tempfile
+import uuid
+from typing import Callable, Optional
+
+from utils.process_runner import MAX_OUTPUT_BYTES, ProcessResult, run_process
+
+
+SANDBOX_ENABLED = os.getenv("AGENT_SANDBOX", "1") != "0"
+SANDBOX_MEMORY_MB = int(os.getenv("AGENT_SANDBOX_MEMORY_MB", "4096"))  # Per run; 0 = no limit
+SANDBOX_DOCKER_IMAGE = os.getenv("AGENT_SANDBOX_DOCKER_IMAGE", "")
+SANDBOX_START_TIMEOUT = 60
+SANDBOX_KILL_GRACE = 10  # Seconds for a killed run to report back before the worker is dropped
+_READ_CHUNK = 64 * 1024
+
+_worker_source: Optional[str] = None
+
+
+class SandboxError(Exception):
+    """A worker could not be started, or died."""
+
+
+def sandbox_available() -> bool:
+    if not SANDBOX_ENABLED:
+        return False
+    if SANDBOX_DOCKER_IMAGE:
+        return shutil.which("docker") is not None
+    return hasattr(os, "fork")
+
+
+def _source() -> str:
+    global _worker_source
+    if _worker_source is None:
+        with open(os.path.join(os.path.dirname(__file__), "sandbox_worker.py")) as f:
+            _worker_source = f.read()
+    return _worker_source
+
+
+class SandboxWorker:
+    """One warm worker process and the pipe protocol to it."""
+
+    def __init__(self, proc: asyncio.subprocess.Process, token: str, container: Optional[str]):
+        self.proc = proc
+        self.container = container
+        self.broken = False
+        self._start = f"{token} START ".encode()
+        self._done = f"{token} DONE ".encode()
+        self._kill_tasks: set[asyncio.Task] = set()
+
+    @property
+    def alive(self) -> bool:
+        return not self.broken and self.proc.returncode is None
+
+    @classmethod
+    async def start(cls, cwd: str, env: Optional[dict[str, str]] = None) -> "SandboxWorker":
+        token = uuid.uuid4().hex
+        venv = (env or {}).get("VIRTUAL_ENV")
+        container = None
+        if SANDBOX_DOCKER_IMAGE:
+            container = f"ci-healer-sandbox-{token[:12]}"
+            python = os.path.join(venv, "bin", "python") if venv else "python"
+            cmd = ["docker", "run", "-i", "--rm", "--name", container,
+                   "--user", f"{os.getuid()}:{os.getgid()}", "--pids-limit", "1024", "-w", cwd]
+            if SANDBOX_MEMORY_MB:
+                cmd += ["--memory", f"{SANDBOX_MEMORY_MB}m"]
+            if venv:
+                cmd += ["-e", f"VIRTUAL_ENV={venv}"]
+            for path in _mount_roots([tempfile.gettempdir(), cwd, venv]):
+                cmd += ["-v", f"{path}:{path}"]
+            cmd += [SANDBOX_DOCKER_IMAGE, python, "-u", "-c", _source(), token]
+        else:
+            cmd = ["python", "-u", "-c", _source(), token]
+
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            cwd=cwd,
+            env=env,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True,
+        )
+        worker = cls(proc, token, container)
+        ready = f"{token} READY".encode()
+        output = bytearray()
+
+        async def wait_ready() -> None:
+            while ready not in output:
+                chunk = await proc.stdout.read(_READ_CHUNK)
+                if not chunk:
+                    raise SandboxError(
+                        f"worker exited: {output.decode(errors='ignore').strip()[-500:]}"
+                    )
+                output.extend(chunk)
+
+        try:
+            await asyncio.wait_for(wait_ready(), timeout=SANDBOX_START_TIMEOUT)
+        except asyncio.TimeoutError:
+            await worker.close()
+            raise SandboxError(f"worker not ready after {SANDBOX_START_TIMEOUT}s")
+        except BaseException:
+            await worker.close()
+            raise
+        print(f"[Sandbox] Worker ready{' in ' + container if container else ''}")
+        return worker
+
+    async def run(
+        self,
+        args: list[str],
+        cwd: str,
+        timeout: Optional[float],
+        on_output: Optional[Callable[[str], bool]] = None,
+        max_output: int = MAX_OUTPUT_BYTES,
+    ) -> ProcessResult:
+        """Run pytest with `args` in `cwd` in a fresh child of this worker."""
+        cmd = ["pytest", *args]
+        job = {"cwd": cwd, "args": args, "memory_mb": SANDBOX_MEMORY_MB}
+        try:
+            self.proc.stdin.write(json.dumps(job).encode() + b"\n")
+            await self.proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            self.broken = True
+            raise SandboxError(f"worker gone: {e}") from e
+
+        output, pending = bytearray(), bytearray()
+        state = {"pid": None, "stopped": False, "truncated": False}
+
+        def emit(data: bytes) -> None:
+            if not data:
+                return
+            output.extend(data)
+            if len(output) > max_output:
+                del output[: len(output) - max_output]
+                state["truncated"] = True
+            if on_output and not state["stopped"] and on_output(data.decode(errors="ignore")):
+                state["stopped"] = True
+                self._kill_child(state["pid"])
+
+        async def collect() -> int:
+            while True:
+                chunk = await self.proc.stdout.read(_READ_CHUNK)
+                if not chunk:
+                    self.broken = True
+                    raise SandboxError("worker exited during a run")
+                pending.extend(chunk)
+                if state["pid"] is None:
+                    start = pending.find(self._start)
+                    eol = pending.find(b"\n", start) if start >= 0 else -1
+                    if eol < 0:
+                        continue
+                    state["pid"] = int(pending[start + len(self._start):eol])
+                    del pending[:eol + 1]
+                done = pending.find(self._done)
+                if done >= 0:
+                    eol = pending.find(b"\n", done)
+                    if eol < 0:
+                        continue
+                    code = int(pending[done + len(self._done):eol])
+                    emit(bytes(pending[:done]))
+                    del pending[:eol + 1]
+                    return code
+                # Hold back the last partial line: it may be the start of a marker
+                cut = pending.rfind(b"\n") + 1
+                if cut:
+                    emit(bytes(pending[:cut]))
+                    del pending[:cut]
+
+        timed_out = False
+        try:
+            try:
+                returncode = await asyncio.wait_for(collect(), timeout=timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                print(f"[Sandbox] Timed out after {timeout}s: {' '.join(cmd)}")
+                self._kill_child(state["pid"])
+                try:
+                    returncode = await asyncio.wait_for(collect(), timeout=SANDBOX_KILL_GRACE)
+                except (asyncio.TimeoutError, SandboxError):
+                    self.broken = True
+                    returncode = -signal.SIGKILL
+        except SandboxError:
+            raise
+        except BaseException:  # cancelled, or on_output raised: the stream is out of sync
+            self._kill_child(state["pid"])
+            self.broken = True
+            raise
+
+        return ProcessResult(
+            cmd=cmd,
+            returncode=returncode,
+            stdout=output.decode(errors="ignore"),
+            stderr="",
+            timed_out=timed_out,
+            truncated=state["truncated"],
+            stopped=state["stopped"],
+        )
+
+    def _kill_child(self, pid: Optional[int]) -> None:
+        if self.container:
+            # The child's pid is the container's; stop the whole container
+            self.broken = True
+            task = asyncio.ensure_future(
+                run_process(["docker", "kill", self.container], timeout=30)
+            )
+            self._kill_tasks.add(task)
+            task.add_done_callback(self._kill_tasks.discard)
+            return
+        if pid is None:
+            return
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    async def close(self) -> None:
+        """Stop the worker (it exits when its stdin closes)."""
+        if self.proc.returncode is None:
+            try:
+                self.proc.stdin.close()
+                await asyncio.wait_for(self.proc.wait(), timeout=5)
+            except (asyncio.TimeoutError, OSError):
+                pass
+        if self.proc.returncode is None:
+            try:
+                os.killpg(self.proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await self.proc.wait()
+        if self.container:
+            try:
+                await run_process(["docker", "rm", "-f", self.container], timeout=30)
+            except FileNotFoundError:
+                pass
+
+
+def _mount_roots(paths: list[Optional[str]]) -> list[str]:
+    """The given paths minus those already inside another one."""
+    roots: list[str] = []
+    for path in sorted({os.path.abspath(p) for p in paths if p}):
+        if not any(path == root or path.startswith(root + os.sep) for root in roots):
+            roots.append(path)
+    return roots
+
+
+class SandboxPool:
+    """Idle warm workers of one environment, started ahead of use and reused across runs."""
+
+    def __init__(self, cwd: str, env: Optional[dict[str, str]] = None):
+        self.cwd = cwd
+        self.env = env
+        self._idle: list[SandboxWorker] = []
+        self._starting: list[asyncio.Task] = []
+        self._closed = False
+
+    def prestart(self, count: int) -> None:
+        """Start workers in the background until `count` are idle or starting."""
+        for _ in range(count - len(self._idle) - len(self._starting)):
+            self._starting.append(asyncio.create_task(SandboxWorker.start(self.cwd, self.env)))
+
+    async def _acquire(self) -> SandboxWorker:
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.alive:
+                return worker
+            await worker.close()
+        if self._starting:
+            return await self._starting.pop(0)
+        return await SandboxWorker.start(self.cwd, self.env)
+
+    async def run(
+        self,
+        args: list[str],
+        timeout: Optional[float],
+        on_output: Optional[Callable[[str], bool]] = None,
+    ) -> ProcessResult:
+        """Run pytest on a warm worker (started now if none is idle). Raises SandboxError."""
+        worker = await self._acquire()
+        try:
+            return await worker.run(args, self.cwd, timeout, on_output)
+        finally:
+            if worker.alive and not self._closed:
+                self._idle.append(worker)
+            else:
+                await asyncio.shield(worker.close())
+
+    async def close(self) -> None:
+        self._closed = True
+        for task in self._starting:
+            task.cancel()
+        started = await asyncio.gather(*self._starting, return_exceptions=True)
+        workers = self._idle + [w for w in started if isinstance(w, SandboxWorker)]
+        self._idle, self._starting = [], []
+        await asyncio.gather(*(w.close() for w in workers), return_exceptions=True)
@@ -0,0 +1,130 @@
+"""
+Sandbox Worker
+==============
+Long-lived pytest host, started by `utils.sandbox` with the project's own
+interpreter. Standalone: it only needs the standard library and pytest.
+
+pytest and its plugins are imported once, at startup. Each job line read
+from stdin ({"cwd", "args", "memory_mb"}) runs in a forked child, so every
+run starts from the warm imports but with fresh state: the repository's own
+modules are never imported by the worker itself and are always re-read
+after a fix. Third-party packages a run imported are preloaded for the
+next one.
+
+Protocol markers on stdout are prefixed with the token given as argv[1]:
+READY once started, START <pid> when a child begins, DONE <exit code>
+after it finished.
+"""
+
+import importlib
+import json
+import os
+import sys
+
+
+MAX_PRELOAD = 200  # Third-party packages imported ahead of the next run
+
+
+def _write(text: str) -> None:
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+def _preload_plugins() -> None:
+    import pytest  # noqa: F401  (fails the worker early if pytest is missing)
+    try:
+        from importlib.metadata import entry_points
+        plugins = entry_points(group="pytest11")
+    except Exception:
+        return
+    for plugin in plugins:
+        try:
+            plugin.load()
+        except Exception:
+            pass
+
+
+def _third_party_modules(cwd: str) -> list[str]:
+    """Top-level installed packages loaded by a run (never the repo's own code)."""
+    names = set()
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None) or ""
+        if "." in name or not path:
+            continue
+        path = os.path.abspath(path)
+        if ("site-packages" in path or "dist-packages" in path) and not path.startswith(cwd + os.sep):
+            names.add(name)
+    return sorted(names)
+
+
+def _run_child(job: dict, token: str, report_fd: int) -> None:
+    os.setsid()  # Own process group: the agent kills it as a whole
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(1, 2)
+    if job.get("memory_mb"):
+        try:
+            import resource
+            limit = job["memory_mb"] * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+            resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        except (ImportError, ValueError, OSError):
+            pass
+    _write(f"{token} START {os.getpid()}\n")
+
+    code = 1
+    try:
+        import pytest
+        cwd = os.path.abspath(job["cwd"])
+        os.chdir(cwd)
+        sys.path.insert(0, cwd)  # As `python -m pytest` run from the repo
+        sys.argv = ["pytest", *job["args"]]
+        code = int(pytest.main(job["args"]))
+        with os.fdopen(report_fd, "w") as f:
+            json.dump(_third_party_modules(cwd), f)
+    except BaseException as e:
+        print(f"[Sandbox] {type(e).__name__}: {e}")
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def main() -> None:
+    token = sys.argv[1]
+    # Started with -c: never resolve imports against the agent's own directory
+    if sys.path and sys.path[0] in ("", os.getcwd()):
+        sys.path.pop(0)
+    _preload_plugins()
+    _write(f"{token} READY\n")
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        job = json.loads(line)
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            _run_child(job, token, write_fd)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as f:
+            data = f.read()
+        _, status = os.waitpid(pid, 0)
+        code = os.waitstatus_to_exitcode(status)
+
+        try:
+            modules = json.loads(data) if data else []
+        except ValueError:
+            modules = []
+        for name in modules[:MAX_PRELOAD]:
+            if name not in sys.modules:
+                try:
+                    importlib.import_module(name)
+                except BaseException:
+                    pass
+        _write(f"{token} DONE {code}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""
+Static Analysis
+===============
+Runs every available linter of a project concurrently and merges their
+diagnostics.
+
+Linters that accept file lists get the project's sources split into
+chunks, one subprocess per chunk, so a large repo is linted on all cores;
+project-wide checkers (tsc, `npm run lint`) run once, alongside. A linter
+that is not installed simply reports nothing. Diagnostics from all tools
+are deduplicated by (file, line, code). The tool-less basic scan reads
+files in a process pool the same way.
+
+Results are cached per repository together with the commit they were
+computed for. The next run of the same repository only lints the files
+changed since that commit (`git diff --name-only`) and reuses the cached
+diagnostics of all the others; a change to a linter config re-lints
+everything.
+"""
+
+import asyncio
+import json
+import os
+import re
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+from utils.cache_paths import cache_dir
+from utils.failures import Failure, LogBuffer
+from utils.git_helper import changed_files, get_current_commit
+from utils.log_parsers import scan as scan_log
+from utils.process_runner import run_process
+
+
+LINT_TIMEOUT = 60
+LINT_CHUNK_FILES = 200  # Max files per linter invocation (command line length)
+BASIC_SCAN_POOL_MIN_FILES = 200  # Below this, a process pool costs more than it saves
+
+
+def _available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+LINT_CONCURRENCY = int(os.getenv("AGENT_LINT_CONCURRENCY", "0")) or max(2, _available_cores())
+LINT_CACHE_ENABLED = os.getenv("AGENT_LINT_CACHE", "1") != "0"
+LINT_CACHE_VERSION = 1  # Bump when linter commands or parsing change
+
+# Files whose change can alter the diagnostics of every other file
+LINT_CONFIG_FILE = re.compile(
+    r"(?:^|/)(?:setup\.cfg|tox\.ini|\.flake8|\.?pylintrc|pyproject\.toml|package\.json"
+    r"|tsconfig[^/]*\.json|\.eslintrc[^/]*|\.eslintignore|eslint\.config\.[^/]+)$"
+)
+
+# path:line:col: CODE message  (flake8, and pylint with the template below)
+PYTHON_DIAGNOSTIC = re.compile(r"^(.+?):(\d+):\d+: ([A-Z]+\d+) (.*)$", re.MULTILINE)
+# path:line:col: message [Error/rule-id]  (eslint --format=unix)
+ESLINT_DIAGNOSTIC = re.compile(r"^(.+?):(\d+):\d+: (.*) \[(?:Error|Warning)/(.+?)\]$", re.MULTILINE)
+# path(line,col): error TSxxxx: message
+TSC_DIAGNOSTIC = re.compile(r"^(.+?)\((\d+),\d+\): error (TS\d+): (.*)$", re.MULTILINE)
+
+
+@dataclass(slots=True)
+class Diagnostic:
+    """One finding of one tool."""
+
+    file: str
+    line: int
+    code: str
+    message: str
+    tool: str
+
+    def to_failure(self) -> Failure:
+        log = LogBuffer(f"{self.tool}: {self.file}:{self.line}: {self.code} {self.message}")
+        return Failure(
+            file=self.file, line=self.line, error_context=f"{self.code} {self.message}",
+            log=log, end=len(log),
+        )
+
+
+@dataclass
+class Linter:
+    name: str
+    project_types: tuple[str, ...]
+    command: Callable[[list[str]], list[str]]  # Files (empty for project-wide tools) -> argv
+    parse: Callable[[str], list[tuple[str, int, str, str]]]  # -> (file, line, code, message)
+    per_file: bool = True  # Accepts an explicit file list (and can be chunked)
+
+
+def _parse_python(output: str) -> list[tuple[str, int, str, str]]:
+    return [(f, int(l), code, msg) for f, l, code, msg in PYTHON_DIAGNOSTIC.findall(output)]
+
+
+def _parse_eslint(output: str) -> list[tuple[str, int, str, str]]:
+    return [(f, int(l), rule, msg) for f, l, msg, rule in ESLINT_DIAGNOSTIC.findall(output)]
+
+
+def _parse_tsc(output: str) -> list[tuple[str, int, str, str]]:
+    return [(f, int(l), code, msg) for f, l, code, msg in TSC_DIAGNOSTIC.findall(output)]
+
+
+def _parse_generic(output: str) -> list[tuple[str, int, str, str]]:
+    """Unknown lint output: whatever the analyzer's log formats recognise."""
+    return [(f, l, "lint", ctx.splitlines()[0] if ctx else "") for _, f, l, ctx, _, _ in scan_log(output)]
+
+
+LINTERS = [
+    Linter(
+        "flake8", ("python",),
+        lambda files: ["python", "-m", "flake8", "--exit-zero", "--max-line-length=120", *files],
+        _parse_python,
+    ),
+    Linter(
+        "pylint", ("python",),
+        lambda files: ["python", "-m", "pylint", "--exit-zero", "--score=n",
+                       "--msg-template={path}:{line}:{column}: {msg_id} {msg}", *files],
+        _parse_python,
+    ),
+    Linter(
+        "eslint", ("node", "node_yarn"),
+        lambda files: ["npx", "eslint", "--format=unix", "--no-error-on-unmatched-pattern", *files],
+        _parse_eslint,
+    ),
+    Linter(
+        "tsc", ("node", "node_yarn"),
+        lambda files: ["npx", "tsc", "--noEmit", "--pretty", "false"],
+        _parse_tsc,
+        per_file=False,
+    ),
+    Linter(
+        "npm-lint", ("node", "node_yarn"),
+        lambda files: ["npm", "run", "lint"],
+        _parse_generic,
+        per_file=False,
+    ),
+]
+
+
+def _chunks(files: list[str], count: int) -> list[list[str]]:
+    size = min(LINT_CHUNK_FILES, max(1, -(-len(files) // count)))
+    return [files[i:i + size] for i in range(0, len(files), size)]
+
+
+def _node_tool(repo_path: str, tool: str) -> bool:
+    """Whether `npx tool` resolves without a download (which can hang until the timeout offline)."""
+    return (
+        os.path.exists(os.path.join(repo_path, "node_modules", ".bin", tool))
+        or shutil.which(tool) is not None
+    )
+
+
+def _applicable(linter: Linter, repo_path: str) -> bool:
+    if linter.name == "tsc":
+        return (
+            os.path.exists(os.path.join(repo_path, "tsconfig.json"))
+            and _node_tool(repo_path, "tsc")
+        )
+    if linter.name == "eslint":
+        return _node_tool(repo_path, "eslint")
+    if linter.name == "npm-lint":
+        try:
+            with open(os.path.join(repo_path, "package.json")) as f:
+                return "lint" in json.load(f).get("scripts", {})
+        except (OSError, ValueError, AttributeError):
+            return False
+    return True
+
+
+def _relative(repo_path: str, file_path: str) -> str:
+    if os.path.isabs(file_path):
+        file_path = os.path.relpath(file_path, repo_path)
+    return os.path.normpath(file_path)
+
+
+def _merge(diagnostics: Iterable[Diagnostic]) -> list[Diagnostic]:
+    merged: dict[tuple[str, int, str], Diagnostic] = {}
+    for diagnostic in diagnostics:
+        merged.setdefault((diagnostic.file, diagnostic.line, diagnostic.code), diagnostic)
+    return sorted(merged.values(), key=lambda d: (d.file, d.line, d.code))
+
+
+async def run_linters(
+    repo_path: str,
+    project_type: str,
+    files: list[str],
+    env: Optional[dict[str, str]] = None,
+    project_wide: bool = True,
+) -> list[Diagnostic]:
+    """
+    Lint `files` (repo-relative) with every linter for the project type at
+    once (and the project-wide checkers, unless `project_wide` is False).
+    Returns the merged diagnostics, deduplicated and sorted by location.
+    """
+    semaphore = asyncio.Semaphore(LINT_CONCURRENCY)
+
+    async def run(linter: Linter, chunk: list[str]) -> list[Diagnostic]:
+        async with semaphore:
+            try:
+                result = await run_process(
+                    linter.command(chunk), cwd=repo_path, timeout=LINT_TIMEOUT, env=env
+                )
+            except FileNotFoundError:
+                return []
+        return [
+            Diagnostic(_relative(repo_path, file), line, code, message.strip(), linter.name)
+            for file, line, code, message in linter.parse(result.stdout)
+        ]
+
+    jobs = []
+    for linter in LINTERS:
+        if project_type not in linter.project_types or not _applicable(linter, repo_path):
+            continue
+        if linter.per_file:
+            jobs.extend(run(linter, chunk) for chunk in _chunks(files, LINT_CONCURRENCY))
+        elif project_wide:
+            jobs.append(run(linter, []))
+
+    results = await asyncio.gather(*jobs, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"[Static] Linter error: {result}")
+    diagnostics = _merge(d for result in results if not isinstance(result, Exception) for d in result)
+    tools = sorted({d.tool for d in diagnostics})
+    if tools:
+        print(f"[Static] {', '.join(tools)} found {len(diagnostics)} issues")
+    return diagnostics
+
+
+# ── Incremental runs ────────────────────────────────────────────────────────
+
+class LintCache:
+    """The last analyzed commit of one repository and its diagnostics, as JSON."""
+
+    def __init__(self, key: str):
+        self.path = os.path.join(cache_dir("lint"), f"{key}.json")
+
+    def load(self, project_type: str) -> Optional[tuple[str, set[str], list[Diagnostic]]]:
+        """(commit, linted files, diagnostics), or None if nothing usable is cached."""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data["version"] != LINT_CACHE_VERSION or data["project_type"] != project_type:
+                return None
+            return (
+                data["commit"],
+                set(data["files"]),
+                [Diagnostic(*entry) for entry in data["diagnostics"]],
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, project_type: str, commit: str, files: list[str],
+             diagnostics: list[Diagnostic]) -> None:
+        data = {
+            "version": LINT_CACHE_VERSION,
+            "project_type": project_type,
+            "commit": commit,
+            "files": files,
+            "diagnostics": [[d.file, d.line, d.code, d.message, d.tool] for d in diagnostics],
+        }
+        # Write-then-rename: concurrent jobs of one repo never see a partial file
+        staging = f"{self.path}.tmp-{uuid.uuid4().hex[:8]}"
+        try:
+            with open(staging, "w") as f:
+                json.dump(data, f)
+            os.replace(staging, self.path)
+        except OSError as e:
+            print(f"[Static] Could not save lint cache: {e}")
+            try:
+                os.remove(staging)
+            except OSError:
+                pass
+
+
+async def run_linters_incremental(
+    repo_path: str,
+    project_type: str,
+    files: list[str],
+    cache_key: str,
+    env: Optional[dict[str, str]] = None,
+) -> list[Diagnostic]:
+    """
+    `run_linters` over the files changed since the repository's last
+    analyzed commit; cached diagnostics are reused for all other files.
+    Falls back to a full run when there is no usable cache.
+    """
+    commit = await get_current_commit(repo_path) if LINT_CACHE_ENABLED else None
+    if not commit:
+        return await run_linters(repo_path, project_type, files, env=env)
+
+    cache = LintCache(cache_key)
+    cached = cache.load(project_type)
+    changed = None
+    if cached:
+        cached_commit, linted, cached_diagnostics = cached
+        changed = [] if cached_commit == commit else await changed_files(repo_path, cached_commit, commit)
+    if changed is None or any(LINT_CONFIG_FILE.search(path) for path in changed):
+        diagnostics = await run_linters(repo_path, project_type, files, env=env)
+    else:
+        changed = set(changed)
+        stale = [f for f in files if f in changed or f not in linted]
+        unchanged = set(files) - set(stale)
+        per_file_tools = {linter.name for linter in LINTERS if linter.per_file}
+        # Project-wide checkers see every file, so they rerun on any source change
+        reused = [
+            d for d in cached_diagnostics
+            if (d.file in unchanged if d.tool in per_file_tools else not stale and d.file not in changed)
+        ]
+        print(f"[Static] Incremental: linting {len(stale)} of {len(files)} files "
+              f"changed since {cached_commit[:8]}")
+        fresh = await run_linters(repo_path, project_type, stale, env=env, project_wide=bool(stale))
+        diagnostics = _merge(reused + fresh)
+
+    cache.save(project_type, commit, files, diagnostics)
+    return diagnostics
+
+
+# ── Basic scan (no tools installed) ─────────────────────────────────────────
+
+def _scan_file(repo_path: str, rel_path: str, project_type: str) -> Optional[Diagnostic]:
+    """First basic issue in a file, if any."""
+    try:
+        with open(os.path.join(repo_path, rel_path), 'r', encoding='utf-8', errors='ignore') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    for i, line in enumerate(lines, 1):
+        if project_type == "python":
+            if line.rstrip() != line:
+                return Diagnostic(rel_path, i, "W291", "Trailing whitespace", "basic")
+            continue
+
+        # Unused variables (var keyword)
+        if 'var ' in line and not line.strip().startswith('//'):
+            return Diagnostic(rel_path, i, "no-var", "Use 'let' or 'const' instead of 'var'", "basic")
+        # Console.log statements
+        if 'console.log' in line and not line.strip().startswith('//'):
+            return Diagnostic(rel_path, i, "no-console", "Remove console.log statement", "basic")
+        # Trailing whitespace
+        if line.endswith(' ') or line.endswith('\t'):
+            return Diagnostic(rel_path, i, "no-trailing-spaces", "Trailing whitespace", "basic")
+    return None
+
+
+def _scan_chunk(repo_path: str, rel_paths: list[str], project_type: str) -> list[Diagnostic]:
+    return [d for d in (_scan_file(repo_path, p, project_type) for p in rel_paths) if d]
+
+
+async def basic_scan(repo_path: str, project_type: str, files: list[str]) -> list[Diagnostic]:
+    """Scan files without external tools; large file lists are split across a process pool."""
+    if len(files) < BASIC_SCAN_POOL_MIN_FILES:
+        return _scan_chunk(repo_path, files, project_type)
+
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=LINT_CONCURRENCY) as pool:
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, _scan_chunk, repo_path, chunk, project_type)
+            for chunk in _chunks(files, LINT_CONCURRENCY)
+        ))
+    return [d for chunk in results for d in chunk]
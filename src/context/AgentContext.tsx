@@ -4,6 +4,9 @@ import type { AgentContextState, AgentRequest, AgentResult } from "@/types/agent
 
 const AgentContext = createContext<AgentContextState | null>(null);
 
+const JOB_POLL_INTERVAL_MS = 2000;
+const JOB_TIMEOUT_MS = 900000;
+
 const MOCK_RESULT: AgentResult = {
   repo_url: "https://github.com/example/demo-repo",
   branch_name: "DEVTEAM_ALICE_AI_Fix",
@@ -93,11 +96,21 @@ export function AgentProvider({ children }: { children: React.ReactNode }) {
 
     try {
       // Try to call the real API; fall back to mock data for demo
-      const response = await axios.post<AgentResult>(
-        `${import.meta.env.VITE_API_URL || "http://localhost:8000"}/run-agent`,
-        request,
-        { timeout: 300000 }
-      );
+      const apiUrl = import.meta.env.VITE_API_URL || "http://localhost:8000";
+      const submitted = await axios.post<{ job_id: string }>(`${apiUrl}/run-agent`, request);
+      const jobId = submitted.data.job_id;
+
+      // Poll the job until the pipeline finishes
+      const deadline = Date.now() + JOB_TIMEOUT_MS;
+      let status = "queued";
+      while (status === "queued" || status === "running") {
+        if (Date.now() > deadline) throw new Error("Agent job timed out");
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        const job = await axios.get<{ status: string }>(`${apiUrl}/jobs/${jobId}`);
+        status = job.data.status;
+      }
+
+      const response = await axios.get<AgentResult>(`${apiUrl}/jobs/${jobId}/result`);
       setResult(response.data);
     } catch {
       // For demo purposes, simulate agent run with mock data